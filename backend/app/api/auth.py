@@ -1,8 +1,14 @@
 """
 Authentication API endpoints
 """
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Optional, Tuple
 
 import os
 from dotenv import load_dotenv
@@ -10,11 +16,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.medical_worker import MedicalWorker
 from app.schemas.auth import Token, LoginRequest
+from app.utils.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_QUEUE_TIME, PASSWORD_HASH_REJECTED
 
 load_dotenv()
 
@@ -27,11 +35,97 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(
     os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
 )
 
+# Authenticated user cache (seconds a principal is reused, max entries)
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+# bcrypt runs on its own threads so login bursts don't block the event loop
+# or take over the default threadpool; requests beyond the queue get a 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user as seen by authorization checks"""
+    id: int
+    email: str
+    role: Any
+    institution_id: int
+    is_active: bool = True
+
+    @classmethod
+    def from_user(cls, user: MedicalWorker) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            institution_id=user.institution_id,
+            is_active=getattr(user, "is_active", True),
+        )
+
+
+class PrincipalCache:
+    """Size-bounded LRU cache of principals with a TTL, keyed by (user_id, token iat)"""
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL, max_size: int = AUTH_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, Any], Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, issued_at: Any) -> Optional[Principal]:
+        key = (user_id, issued_at)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, issued_at: Any, principal: Principal):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[(principal.id, issued_at)] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end((principal.id, issued_at))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Drop every cached token of a user"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+@event.listens_for(MedicalWorker, "after_update")
+@event.listens_for(MedicalWorker, "after_delete")
+def _invalidate_cached_principal(mapper, connection, target):
+    """Role, institution or activation changes take effect on the next request"""
+    principal_cache.invalidate(target.id)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -40,6 +134,41 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_hashing(operation: str, func, *args):
+    """Run bcrypt work on the password executor, recording queue time and duration"""
+    if not _password_slots.acquire(blocking=False):
+        PASSWORD_HASH_REJECTED.labels(operation=operation).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent login attempts, please retry",
+            headers={"Retry-After": "1"},
+        )
+
+    submitted_at = time.perf_counter()
+
+    def timed():
+        started_at = time.perf_counter()
+        PASSWORD_HASH_QUEUE_TIME.labels(operation=operation).observe(started_at - submitted_at)
+        try:
+            return func(*args)
+        finally:
+            PASSWORD_HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started_at)
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, timed)
+    finally:
+        _password_slots.release()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_hashing("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_hashing("hash", get_password_hash, password)
+
+
 def get_user_by_email(db: Session, email: str) -> Optional[MedicalWorker]:
     return (
         db.query(MedicalWorker)
@@ -48,11 +177,11 @@ def get_user_by_email(db: Session, email: str) -> Optional[MedicalWorker]:
     )
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[MedicalWorker]:
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[MedicalWorker]:
     user = get_user_by_email(db, email=email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     if hasattr(user, "is_active") and not user.is_active:
         return None
@@ -64,7 +193,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     expire = datetime.utcnow() + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
+    # iat keys the principal cache, so a new login never reuses a stale entry
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(
         to_encode,
         SECRET_KEY,
@@ -76,7 +206,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db),
-) -> MedicalWorker:
+) -> Principal:
+    """Resolve the bearer token to a principal
+
+    Principals are cached for AUTH_CACHE_TTL seconds per (user_id, iat), so
+    most requests are authorized without a database round trip.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -86,15 +221,23 @@ async def get_current_user(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: Optional[int] = payload.get("user_id")
+        issued_at = payload.get("iat")
         if user_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = db.query(MedicalWorker).get(user_id)
-    if user is None:
+    principal = principal_cache.get(user_id, issued_at)
+    if principal is None:
+        user = db.query(MedicalWorker).get(user_id)
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.put(issued_at, principal)
+
+    if not principal.is_active:
         raise credentials_exception
-    return user
+    return principal
 
 
 @router.post("/login", response_model=Token)
@@ -103,7 +246,7 @@ async def login(
     db: Session = Depends(get_db),
 ):
 
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -122,6 +265,6 @@ async def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/logout")
-async def logout(current_user: MedicalWorker = Depends(get_current_user)):
+async def logout(current_user: Principal = Depends(get_current_user)):
     """Logout endpoint"""
     return {"message": "Successfully logged out"}
@@ -4,10 +4,9 @@ Model management API endpoints
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models.medical_worker import MedicalWorker
 from app.models.model_version import ModelVersion
 from app.models.training_round import TrainingRound
-from app.api.auth import get_current_user
+from app.api.auth import Principal, get_current_user
 
 router = APIRouter()
 
@@ -15,7 +14,7 @@ router = APIRouter()
 @router.get("/status")
 async def get_model_status(
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get current model status"""
     active_model = db.query(ModelVersion).filter(ModelVersion.is_active == True).first()
@@ -36,7 +35,7 @@ async def get_model_status(
 async def get_model_metrics(
     limit: int = 10,
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Get training round metrics"""
     rounds = db.query(TrainingRound).order_by(TrainingRound.round_number.desc()).limit(limit).all()
@@ -1,36 +1,231 @@
 """
 Patient management API endpoints
 """
-from typing import List
+import base64
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models.medical_worker import MedicalWorker
+from app.database import get_db, SessionLocal
 from app.models.patient import Patient
 from app.schemas.patient import (
     PatientCreate,
     PatientUpdate,
     PatientResponse,
+    PatientPage,
 )
-from app.api.auth import get_current_user
+from app.api.auth import Principal, get_current_user
 
 router = APIRouter()
 
+# Default and maximum page size of the patient listing
+PATIENTS_PAGE_SIZE = int(os.getenv("PATIENTS_PAGE_SIZE", "50"))
+PATIENTS_MAX_PAGE_SIZE = int(os.getenv("PATIENTS_MAX_PAGE_SIZE", "500"))
+# Rows fetched per round trip from the server-side cursor of an export
+PATIENTS_EXPORT_BATCH_SIZE = int(os.getenv("PATIENTS_EXPORT_BATCH_SIZE", "1000"))
 
-@router.get("/", response_model=List[PatientResponse])
+# Columns that can be requested with ``fields=``
+PATIENT_FIELDS = list(PatientResponse.model_fields)
+
+
+def _encode_cursor(institution_id: int, patient_id: int) -> str:
+    """Opaque cursor for the position after (institution_id, id)"""
+    return base64.urlsafe_b64encode(f"{institution_id}:{patient_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, int]:
+    """Decode a cursor into (institution_id, id)"""
+    try:
+        institution_id, patient_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(institution_id), int(patient_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def _select_fields(fields: Optional[str]) -> List[str]:
+    """Parse ``fields=`` into column names (id is always included)"""
+    if not fields:
+        return list(PATIENT_FIELDS)
+
+    selected = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in PATIENT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    if "id" not in selected:
+        selected.insert(0, "id")
+    return selected
+
+
+def _scope_institution(current_user: Principal, institution_id: Optional[int]) -> Optional[int]:
+    """Institution a listing is restricted to (non-admins only see their own)"""
+    if current_user.role.value != "admin":
+        return current_user.institution_id
+    return institution_id
+
+
+def _filter_patients(
+    query,
+    institution_id: Optional[int],
+    age_min: Optional[int],
+    age_max: Optional[int],
+    sex: Optional[str],
+    region: Optional[str],
+    smoker: Optional[str],
+):
+    """Apply institution scoping and listing filters to a patient query"""
+    if institution_id is not None:
+        query = query.filter(Patient.institution_id == institution_id)
+    if age_min is not None:
+        query = query.filter(Patient.age >= age_min)
+    if age_max is not None:
+        query = query.filter(Patient.age <= age_max)
+    if sex is not None:
+        query = query.filter(Patient.sex == sex)
+    if region is not None:
+        query = query.filter(Patient.region == region)
+    if smoker is not None:
+        query = query.filter(Patient.smoker == smoker)
+    return query
+
+
+@router.get("/", response_model=PatientPage)
 async def list_patients(
+    limit: int = Query(PATIENTS_PAGE_SIZE, ge=1, le=PATIENTS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    age_min: Optional[int] = Query(None, ge=0, le=150),
+    age_max: Optional[int] = Query(None, ge=0, le=150),
+    sex: Optional[str] = Query(None, pattern="^(male|female)$"),
+    region: Optional[str] = None,
+    smoker: Optional[str] = Query(None, pattern="^(yes|no)$"),
+    institution_id: Optional[int] = Query(None, description="Filter by institution (admins only)"),
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    query = db.query(Patient)
-    if current_user.role.value != "admin":
+    """List patients in pages ordered by (institution_id, id)
+
+    Pages are fetched with keyset pagination on (institution_id, id), served
+    by idx_patients_institution, and only the requested columns are loaded.
+    """
+    selected = _select_fields(fields)
+
+    # institution_id and id are always loaded for the cursor
+    columns = list(dict.fromkeys(selected + ["institution_id", "id"]))
+    query = _filter_patients(
+        db.query(*[getattr(Patient, name) for name in columns]),
+        _scope_institution(current_user, institution_id),
+        age_min, age_max, sex, region, smoker,
+    )
+
+    if cursor:
+        last_institution_id, last_id = _decode_cursor(cursor)
         query = query.filter(
-            Patient.institution_id == current_user.institution_id
+            tuple_(Patient.institution_id, Patient.id) > tuple_(last_institution_id, last_id)
         )
-    patients = query.all()
-    return patients
+
+    # One extra row tells whether there is a next page
+    rows = query.order_by(Patient.institution_id, Patient.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].institution_id, rows[-1].id)
+
+    return PatientPage(
+        items=[{name: getattr(row, name) for name in selected} for row in rows],
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+def _json_default(value):
+    """JSON encoding of column types not handled by json.dumps"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _export_rows(selected: List[str], export_format: str, filters: tuple) -> Iterator[str]:
+    """Stream patients from a server-side cursor as NDJSON lines or CSV rows
+
+    Runs in FastAPI's threadpool with its own session, which is closed when
+    the stream ends or the client disconnects.
+    """
+    db = SessionLocal()
+    try:
+        query = _filter_patients(db.query(*[getattr(Patient, name) for name in selected]), *filters)
+        rows = query.order_by(Patient.institution_id, Patient.id).yield_per(PATIENTS_EXPORT_BATCH_SIZE)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(selected)
+
+        for count, row in enumerate(rows, start=1):
+            if export_format == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(selected, row)), default=_json_default))
+                buffer.write("\n")
+
+            # Send one chunk per fetched batch
+            if count % PATIENTS_EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/export")
+async def export_patients(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    age_min: Optional[int] = Query(None, ge=0, le=150),
+    age_max: Optional[int] = Query(None, ge=0, le=150),
+    sex: Optional[str] = Query(None, pattern="^(male|female)$"),
+    region: Optional[str] = None,
+    smoker: Optional[str] = Query(None, pattern="^(yes|no)$"),
+    institution_id: Optional[int] = Query(None, description="Filter by institution (admins only)"),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Export all matching patients as NDJSON or CSV
+
+    Same scoping, filters and ``fields=`` as the listing, ordered by
+    (institution_id, id). Rows are streamed from a server-side cursor, so
+    memory use does not depend on the number of patients.
+    """
+    selected = _select_fields(fields)
+    filters = (
+        _scope_institution(current_user, institution_id),
+        age_min, age_max, sex, region, smoker,
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(selected, format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="patients.{format}"'},
+    )
 
 
 @router.post(
@@ -41,7 +236,7 @@ async def list_patients(
 async def create_patient(
     patient_in: PatientCreate,
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     data = patient_in.dict()
     data["institution_id"] = current_user.institution_id
@@ -57,7 +252,7 @@ async def create_patient(
 async def get_patient(
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
@@ -83,7 +278,7 @@ async def update_patient(
     patient_id: int,
     patient_update: PatientUpdate,
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
     if not patient:
@@ -114,7 +309,7 @@ async def update_patient(
 async def delete_patient(
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     
     patient = db.query(Patient).filter(Patient.id == patient_id).first()
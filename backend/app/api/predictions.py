@@ -1,16 +1,17 @@
 """
 Prediction API endpoints
 """
+import time
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models.medical_worker import MedicalWorker
 from app.schemas.prediction import PredictionRequest, PredictionResponse
-from app.api.auth import get_current_user
-from app.services.prediction_service import PredictionService
+from app.api.auth import Principal, get_current_user
+from app.services.prediction_service import get_prediction_service
+from app.services.prediction_log import get_prediction_log_sink
 
 router = APIRouter()
 
@@ -19,18 +20,33 @@ router = APIRouter()
 async def predict_insurance_cost(
     prediction_request: PredictionRequest,
     db: Session = Depends(get_db),
-    current_user: MedicalWorker = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     try:
-        prediction_service = PredictionService()
+        prediction_service = get_prediction_service()
+        features = prediction_request.dict()
 
-        predicted_cost = await prediction_service.predict(
-            prediction_request.dict()
+        start_time = time.perf_counter()
+        # Stored patient features are only read within the user's institution
+        institution_id = None if current_user.role.value == "admin" else current_user.institution_id
+        predicted_cost = await prediction_service.predict(features, institution_id=institution_id)
+        latency = time.perf_counter() - start_time
+        model_version = prediction_service.get_active_model_version()
+
+        # Written asynchronously in batches by the prediction log sink
+        await get_prediction_log_sink().record(
+            features,
+            predicted_cost,
+            model_version,
+            latency,
+            patient_id=prediction_request.patient_id,
+            requested_by=current_user.id,
+            institution_id=current_user.institution_id,
         )
 
         return PredictionResponse(
             predicted_cost=predicted_cost,
-            model_version=prediction_service.get_active_model_version(),
+            model_version=model_version,
             prediction_timestamp=datetime.utcnow(),
             patient_id=prediction_request.patient_id,
         )
@@ -1,24 +1,39 @@
 """
 Main FastAPI application
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.api import auth, patients, predictions, model
-from app.database import engine, Base
+from app.database import engine, Base, get_pool_stats
+from app.services.prediction_log import get_prediction_log_sink
+from app.utils.metrics import record_request_metrics, update_pool_metrics
 
 
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the prediction log writer for the lifetime of the app"""
+    sink = get_prediction_log_sink()
+    sink.start()
+    yield
+    # Flush pending prediction logs before the worker exits
+    await sink.stop()
+
+
 app = FastAPI(
     title="Federated Medical Insurance API",
     description="API for federated learning medical insurance cost prediction",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
-app.include_router(api_router, prefix="/api")
-
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +43,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency per route template
+app.middleware("http")(record_request_metrics)
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(patients.router, prefix="/api/patients", tags=["Patients"])
@@ -50,3 +69,15 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+
+@app.get("/health/db")
+async def database_pool_health():
+    """Database connection pool statistics"""
+    return get_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint"""
+    update_pool_metrics(engine)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
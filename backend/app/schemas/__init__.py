@@ -2,7 +2,7 @@
 Pydantic schemas for request/response validation
 """
 from app.schemas.auth import Token, TokenData, LoginRequest
-from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse
+from app.schemas.patient import PatientCreate, PatientUpdate, PatientResponse, PatientPage
 from app.schemas.prediction import PredictionRequest, PredictionResponse
 
 __all__ = [
@@ -12,6 +12,7 @@ __all__ = [
     "PatientCreate",
     "PatientUpdate",
     "PatientResponse",
+    "PatientPage",
     "PredictionRequest",
     "PredictionResponse"
 ]
@@ -2,7 +2,7 @@
 Patient schemas
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -49,3 +49,10 @@ class PatientResponse(PatientBase):
     class Config:
         from_attributes = True
 
+
+
+class PatientPage(BaseModel):
+    """One page of a patient listing"""
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None  # Pass as ``cursor`` to get the next page
+    limit: int
@@ -0,0 +1,167 @@
+"""
+Asynchronous audit log of served predictions
+
+Requests enqueue one record per prediction; a background task writes them to
+the ``prediction_logs`` table in multi-row inserts, so logging adds no
+database round trip to the request.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import BigInteger, Column, DateTime, Float, Integer, Numeric, String, Table, insert
+
+from app.database import Base, engine
+from app.utils.metrics import PREDICTION_LOG_DROPPED, PREDICTION_LOG_QUEUE_DEPTH, PREDICTION_LOG_WRITTEN
+
+# Records held in memory before requests wait for the writer
+PREDICTION_LOG_QUEUE_SIZE = int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "10000"))
+# Rows per INSERT and maximum seconds a record waits to be written
+PREDICTION_LOG_BATCH_SIZE = int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "500"))
+PREDICTION_LOG_FLUSH_INTERVAL = float(os.getenv("PREDICTION_LOG_FLUSH_INTERVAL", "1.0"))
+# Seconds a request waits for queue space before its record is dropped
+PREDICTION_LOG_PUT_TIMEOUT = float(os.getenv("PREDICTION_LOG_PUT_TIMEOUT", "0.5"))
+
+# Queued by stop(): the writer flushes the records ahead of it and exits
+_STOP = object()
+
+prediction_logs = Table(
+    "prediction_logs",
+    Base.metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("patient_id", Integer, nullable=True),
+    Column("requested_by", Integer, nullable=True),
+    Column("institution_id", Integer, nullable=True),
+    Column("input_hash", String(64), nullable=False),
+    Column("predicted_cost", Numeric(12, 2), nullable=False),
+    Column("model_version", String(50), nullable=True),
+    Column("latency_ms", Float, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def hash_features(features: Dict) -> str:
+    """Stable SHA-256 of prediction inputs (patient data is not stored verbatim)"""
+    payload = json.dumps(features, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PredictionLogSink:
+    """Bounded in-process queue of prediction records flushed in batches"""
+
+    def __init__(
+        self,
+        queue_size: int = PREDICTION_LOG_QUEUE_SIZE,
+        batch_size: int = PREDICTION_LOG_BATCH_SIZE,
+        flush_interval: float = PREDICTION_LOG_FLUSH_INTERVAL,
+    ):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def start(self):
+        """Start the writer task on the running event loop (not after stop())"""
+        if self._closed:
+            return
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Write all pending records and stop the writer task; later records are dropped"""
+        self._closed = True
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        # Records enqueued behind the sentinel by requests already in record()
+        PREDICTION_LOG_DROPPED.inc(self._queue.qsize())
+        PREDICTION_LOG_QUEUE_DEPTH.set(0)
+
+    async def record(
+        self,
+        features: Dict,
+        predicted_cost: float,
+        model_version: Optional[str],
+        latency: float,
+        patient_id: Optional[int] = None,
+        requested_by: Optional[int] = None,
+        institution_id: Optional[int] = None,
+    ):
+        """Enqueue a prediction, waiting briefly for space when the queue is full"""
+        if self._closed:
+            PREDICTION_LOG_DROPPED.inc()
+            return
+        self.start()
+        record = {
+            "patient_id": patient_id,
+            "requested_by": requested_by,
+            "institution_id": institution_id,
+            "input_hash": hash_features(features),
+            "predicted_cost": round(float(predicted_cost), 2),
+            "model_version": model_version,
+            "latency_ms": latency * 1000,
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            await asyncio.wait_for(self._queue.put(record), timeout=PREDICTION_LOG_PUT_TIMEOUT)
+        except asyncio.TimeoutError:
+            PREDICTION_LOG_DROPPED.inc()
+        PREDICTION_LOG_QUEUE_DEPTH.set(self._queue.qsize())
+
+    async def _run(self):
+        """Collect records into batches and write them until the stop sentinel"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await self._queue.get()
+            if record is _STOP:
+                break
+            batch: List[Dict] = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is _STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+            await asyncio.to_thread(self._write, batch)
+            PREDICTION_LOG_QUEUE_DEPTH.set(self._queue.qsize())
+
+    @staticmethod
+    def _write(batch: List[Dict]):
+        """Insert a batch of records in one statement"""
+        if not batch:
+            return
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(prediction_logs), batch)
+            PREDICTION_LOG_WRITTEN.inc(len(batch))
+        except Exception as e:
+            PREDICTION_LOG_DROPPED.inc(len(batch))
+            print(f"Error writing prediction logs: {e}")
+
+
+_prediction_log_sink: Optional[PredictionLogSink] = None
+
+
+def get_prediction_log_sink() -> PredictionLogSink:
+    """Process-wide prediction log sink"""
+    global _prediction_log_sink
+    if _prediction_log_sink is None:
+        _prediction_log_sink = PredictionLogSink()
+    return _prediction_log_sink
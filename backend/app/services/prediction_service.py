@@ -1,12 +1,88 @@
 """
 Prediction service for insurance cost prediction
 """
+import asyncio
 import torch
 import numpy as np
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 import os
+import sys
+import threading
+import time
 from pathlib import Path
 
+from sqlalchemy import text
+
+from app.database import engine
+from app.utils.metrics import PREDICTION_CACHE, PREDICTION_LATENCY, PREDICTIONS
+
+# Cached predictions (entries, seconds); 0 disables the cache
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))
+# Seconds between checks of the model file for a new version
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "10"))
+
+# Model architecture from the Flower server directory (not shipped in the
+# backend image, where predictions use the rule-based fallback)
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "flower_server"))
+try:
+    from model import InsuranceCostModel
+except ImportError:
+    InsuranceCostModel = None
+
+# Model inputs stored per patient in the patient_features table, in model order
+FEATURE_COLUMNS = [
+    "age_norm", "sex_encoded", "bmi_norm", "children_norm", "smoker_encoded",
+    "height_norm", "weight_norm", "bp_systolic_norm", "bp_diastolic_norm",
+    "heart_rate_norm", "cholesterol_norm", "glucose_norm", "activity_encoded",
+    "region_northeast", "region_northwest", "region_southeast", "region_southwest",
+]
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of predictions with a TTL"""
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                PREDICTION_CACHE.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            PREDICTION_CACHE.labels(result="hit").inc()
+            return entry[1]
+
+    def put(self, key: Tuple, value: float):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
 
 class PredictionService:
     """Service for making predictions using trained model"""
@@ -15,23 +91,71 @@ class PredictionService:
         self.model = None
         self.model_version = None
         self.model_path = os.getenv("MODEL_PATH", "./models/active_model.pt")
+        self.cache = PredictionCache()
+        self._model_mtime = None
+        self._last_reload_check = time.monotonic()
+        self._reload_lock = threading.Lock()
         self._load_model()
     
     def _load_model(self):
         """Load the active model"""
         model_path = Path(self.model_path)
         if model_path.exists():
+            self._model_mtime = model_path.stat().st_mtime
+            if InsuranceCostModel is None:
+                print("Warning: model architecture not available, using fallback predictions")
+                return
             try:
-                # Load model architecture and weights
-                # This will be implemented with actual model loading
+                # State dict saved by SaveModelStrategy
+                model = InsuranceCostModel(input_size=len(FEATURE_COLUMNS))
+                model.load_state_dict(torch.load(model_path, map_location="cpu"))
+                model.eval()
+                self.model = model
                 self.model_version = "v1.0.0"
-                # self.model = torch.load(model_path)
-                # self.model.eval()
             except Exception as e:
                 print(f"Error loading model: {e}")
+
+    def reload_if_changed(self):
+        """Hot-swap the model when the model file changes; cached predictions are dropped"""
+        now = time.monotonic()
+        if now - self._last_reload_check < MODEL_RELOAD_INTERVAL:
+            return
+        with self._reload_lock:
+            if now - self._last_reload_check < MODEL_RELOAD_INTERVAL:
+                return
+            self._last_reload_check = now
+            model_path = Path(self.model_path)
+            mtime = model_path.stat().st_mtime if model_path.exists() else None
+            if mtime != self._model_mtime:
+                self._load_model()
+                self._model_mtime = mtime
+                self.cache.clear()
+
+    def _cache_key(self, vector: np.ndarray) -> Tuple:
+        """Model version plus the encoded feature vector, rounded to absorb float noise"""
+        return (self.model_version,) + tuple(np.round(vector, 6).tolist())
+    
+    def _stored_features(self, patient_id: int, institution_id: Optional[int] = None) -> Optional[np.ndarray]:
+        """Patient's model-ready features from the feature store (primary key lookup)"""
+        query = f"SELECT {', '.join(FEATURE_COLUMNS)} FROM patient_features WHERE patient_id = :patient_id"
+        params = {"patient_id": patient_id}
+        if institution_id is not None:
+            query += " AND institution_id = :institution_id"
+            params["institution_id"] = institution_id
+        try:
+            with engine.connect() as conn:
+                row = conn.execute(text(query), params).first()
+        except Exception as e:
+            print(f"Error reading patient features: {e}")
+            return None
+        return None if row is None else np.array(tuple(row), dtype=np.float64)
     
     def _preprocess_features(self, features: Dict) -> np.ndarray:
-        """Preprocess input features for model"""
+        """Preprocess input features for model (FEATURE_COLUMNS order)
+        
+        Same encodings as refresh_patient_features(); measurements the request
+        does not carry take its reference values.
+        """
         # Encode categorical features
         sex_encoded = 1.0 if features["sex"] == "male" else 0.0
         smoker_encoded = 1.0 if features["smoker"] == "yes" else 0.0
@@ -41,10 +165,10 @@ class PredictionService:
                      "southeast": [0, 0, 1, 0], "southwest": [0, 0, 0, 1]}
         region_encoded = region_map.get(features.get("region", "northeast"), [1, 0, 0, 0])
         
-        # Normalize features (using simple normalization)
-        age_norm = features["age"] / 100.0
-        bmi_norm = (features.get("bmi", 25.0) or 25.0) / 50.0
-        children_norm = features["children"] / 10.0
+        # Normalize features to the training ranges
+        age_norm = (features["age"] - 18) / (64 - 18)
+        bmi_norm = (float(features.get("bmi") or 26.5) - 15) / (50 - 15)
+        children_norm = features["children"] / 5.0
         
         # Combine features
         feature_vector = np.array([
@@ -53,21 +177,55 @@ class PredictionService:
             bmi_norm,
             children_norm,
             smoker_encoded,
+            (170 - 140) / (210 - 140),  # height
+            (75 - 40) / (200 - 40),  # weight
+            (120 - 90) / (180 - 90),  # systolic blood pressure
+            (80 - 60) / (120 - 60),  # diastolic blood pressure
+            (72 - 50) / (100 - 50),  # resting heart rate
+            (190 - 100) / (300 - 100),  # cholesterol
+            (95 - 70) / (120 - 70),  # glucose
+            0.5,  # activity level
             *region_encoded
         ])
         
         return feature_vector
     
-    async def predict(self, features: Dict) -> float:
-        """Make prediction for given features"""
+    async def predict(self, features: Dict, institution_id: Optional[int] = None) -> float:
+        """Make prediction for given features (served from the cache when possible)
+        
+        With a loaded model and a ``patient_id``, the patient's row in the
+        patient_features store (restricted to ``institution_id`` if given)
+        is the model input instead of features encoded from the request.
+        """
+        start_time = time.perf_counter()
+        self.reload_if_changed()
+        source = "model" if self.model is not None else "fallback"
+        try:
+            vector = None
+            if self.model is not None and features.get("patient_id") is not None:
+                vector = await asyncio.to_thread(self._stored_features, features["patient_id"], institution_id)
+            if vector is None:
+                vector = self._preprocess_features(features)
+            
+            key = self._cache_key(vector)
+            prediction = self.cache.get(key)
+            if prediction is None:
+                prediction = await self._predict(features, vector)
+                self.cache.put(key, prediction)
+            return prediction
+        finally:
+            PREDICTIONS.labels(source=source).inc()
+            PREDICTION_LATENCY.labels(model_version=self.model_version or "none").observe(
+                time.perf_counter() - start_time
+            )
+    
+    async def _predict(self, features: Dict, feature_vector: np.ndarray) -> float:
+        """Model prediction with rule-based fallback"""
         if self.model is None:
             # Fallback to simple rule-based prediction
             return self._fallback_prediction(features)
         
         try:
-            # Preprocess features
-            feature_vector = self._preprocess_features(features)
-            
             # Convert to tensor
             input_tensor = torch.FloatTensor(feature_vector).unsqueeze(0)
             
@@ -75,8 +233,8 @@ class PredictionService:
             with torch.no_grad():
                 prediction = self.model(input_tensor).item()
             
-            # Denormalize (if needed)
-            return max(0, prediction * 10000)  # Scale back to actual cost range
+            # The model is trained on unscaled insurance costs
+            return max(0, prediction)
         
         except Exception as e:
             print(f"Prediction error: {e}")
@@ -106,3 +264,16 @@ class PredictionService:
         """Get active model version"""
         return self.model_version
 
+
+_prediction_service: Optional[PredictionService] = None
+_prediction_service_lock = threading.Lock()
+
+
+def get_prediction_service() -> PredictionService:
+    """Process-wide prediction service, so the model and cache are shared across requests"""
+    global _prediction_service
+    if _prediction_service is None:
+        with _prediction_service_lock:
+            if _prediction_service is None:
+                _prediction_service = PredictionService()
+    return _prediction_service
@@ -0,0 +1,87 @@
+"""
+Prometheus metrics for the backend API
+
+Exposed on ``/metrics`` (see app.main).
+"""
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+PREDICTION_LATENCY = Histogram(
+    "api_prediction_latency_seconds", "Model prediction latency",
+    ["model_version"], buckets=_LATENCY_BUCKETS,
+)
+PREDICTIONS = Counter(
+    "api_predictions_total", "Predictions served", ["source"]
+)
+PREDICTION_CACHE = Counter(
+    "api_prediction_cache_total", "Prediction cache lookups", ["result"]
+)
+PREDICTION_LOG_WRITTEN = Counter(
+    "api_prediction_log_written_total", "Prediction log records written to the database"
+)
+PREDICTION_LOG_DROPPED = Counter(
+    "api_prediction_log_dropped_total", "Prediction log records dropped (queue full or write error)"
+)
+PREDICTION_LOG_QUEUE_DEPTH = Gauge(
+    "api_prediction_log_queue_depth", "Prediction log records waiting to be written"
+)
+PASSWORD_HASH_QUEUE_TIME = Histogram(
+    "api_password_hash_queue_seconds", "Time bcrypt work waited for a hashing thread",
+    ["operation"], buckets=_LATENCY_BUCKETS,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "api_password_hash_duration_seconds", "bcrypt hash/verify duration",
+    ["operation"], buckets=_LATENCY_BUCKETS,
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "api_password_hash_rejected_total", "bcrypt work rejected because the queue was full",
+    ["operation"],
+)
+DB_POOL_SIZE = Gauge("api_db_pool_size", "Configured database connection pool size")
+DB_POOL_CHECKED_OUT = Gauge("api_db_pool_checked_out", "Database connections in use")
+DB_POOL_CHECKED_IN = Gauge("api_db_pool_checked_in", "Idle database connections in the pool")
+DB_POOL_OVERFLOW = Gauge("api_db_pool_overflow", "Database connections above the pool size")
+DB_POOL_WAIT_TIME = Histogram(
+    "api_db_pool_wait_seconds", "Time spent waiting to check out a pooled connection",
+    buckets=_LATENCY_BUCKETS,
+)
+DB_SESSIONS_ACTIVE = Gauge("api_db_sessions_active", "Request database sessions currently open")
+DB_SESSION_DURATION = Histogram(
+    "api_db_session_duration_seconds", "Lifetime of a request database session",
+    buckets=_LATENCY_BUCKETS,
+)
+
+
+def update_pool_metrics(engine) -> None:
+    """Refresh connection pool gauges from a SQLAlchemy engine"""
+    pool = engine.pool
+    for gauge, attribute in (
+        (DB_POOL_SIZE, "size"),
+        (DB_POOL_CHECKED_OUT, "checkedout"),
+        (DB_POOL_CHECKED_IN, "checkedin"),
+        (DB_POOL_OVERFLOW, "overflow"),
+    ):
+        # Not every pool class (e.g. NullPool) reports every statistic
+        method = getattr(pool, attribute, None)
+        if method is not None:
+            gauge.set(method())
+
+
+async def record_request_metrics(request, call_next):
+    """HTTP middleware recording request latency per route template"""
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_DURATION.labels(
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=str(response.status_code),
+    ).observe(time.perf_counter() - start_time)
+    return response
@@ -0,0 +1,45 @@
+"""
+Benchmarks for FedAvg aggregation as a function of the number of clients
+"""
+import numpy as np
+import pytest
+from flwr.common import Code, FitRes, Status, ndarrays_to_parameters
+from flwr.server.strategy import FedAvg
+
+from model import InsuranceCostModel, get_model_parameters
+
+
+def _fit_results(num_clients: int, seed: int = 42):
+    """Fit results of ``num_clients`` clients with perturbed model weights"""
+    rng = np.random.default_rng(seed)
+    base = get_model_parameters(InsuranceCostModel(input_size=17))
+    results = []
+    for _ in range(num_clients):
+        ndarrays = [
+            (array + rng.normal(0, 0.01, array.shape)).astype(array.dtype)
+            if np.issubdtype(array.dtype, np.floating) else array
+            for array in base
+        ]
+        fit_res = FitRes(
+            status=Status(code=Code.OK, message=""),
+            parameters=ndarrays_to_parameters(ndarrays),
+            num_examples=int(rng.integers(1000, 20000)),
+            metrics={},
+        )
+        # The client proxy is not used by FedAvg.aggregate_fit
+        results.append((None, fit_res))
+    return results
+
+
+@pytest.mark.parametrize("num_clients", [3, 10, 50, 100])
+def test_fedavg_aggregate_fit(benchmark, num_clients):
+    """FedAvg.aggregate_fit over serialized client updates"""
+    benchmark.group = "fedavg_aggregate_fit"
+    strategy = FedAvg()
+    results = _fit_results(num_clients)
+
+    parameters, _ = benchmark(strategy.aggregate_fit, 1, results, [])
+
+    assert parameters is not None
+    if benchmark.stats:
+        benchmark.extra_info["clients_per_second"] = num_clients / benchmark.stats.stats.mean
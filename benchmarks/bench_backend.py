@@ -0,0 +1,144 @@
+"""
+Benchmarks for backend request handling
+
+HTTP benchmarks use FastAPI's in-process TestClient on an app with the
+backend's middleware stack, and are skipped when the backend dependencies are
+not installed.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from model import InsuranceCostModel
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+FEATURES = {"age": 45, "sex": "male", "bmi": 28.5, "children": 2, "smoker": "no", "region": "southeast"}
+
+
+@pytest.fixture(scope="module")
+def prediction_service():
+    try:
+        from app.services.prediction_service import PredictionService
+    except Exception as e:
+        pytest.skip(f"Prediction service unavailable: {e}")
+    return PredictionService()
+
+
+@pytest.fixture(scope="module")
+def feature_store_service(tmp_path_factory):
+    """Prediction service with a trained-model file and a SQLite patient_features table"""
+    try:
+        from app.services import prediction_service as service_module
+    except Exception as e:
+        pytest.skip(f"Prediction service unavailable: {e}")
+    model_path = tmp_path_factory.mktemp("models") / "active_model.pt"
+    torch.manual_seed(42)
+    torch.save(InsuranceCostModel(input_size=17).state_dict(), model_path)
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    columns = ", ".join(f"{name} REAL" for name in service_module.FEATURE_COLUMNS)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE patient_features (patient_id INTEGER, institution_id INTEGER, {columns})"))
+        conn.execute(
+            text(f"INSERT INTO patient_features VALUES (7, 1, {', '.join(['0.25'] * 17)})")
+        )
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(service_module, "engine", engine)
+        mp.setenv("MODEL_PATH", str(model_path))
+        yield service_module.PredictionService()
+
+
+def test_prediction_uses_feature_store(feature_store_service):
+    """With a loaded model, a request's patient_id selects the stored feature row"""
+    service = feature_store_service
+    assert service.model is not None
+    with torch.no_grad():
+        expected = service.model(torch.full((1, 17), 0.25)).item()
+
+    assert asyncio.run(service.predict({**FEATURES, "patient_id": 7})) == pytest.approx(max(0, expected))
+    np.testing.assert_allclose(service._stored_features(7, institution_id=1), np.full(17, 0.25))
+    # Other institutions' rows are not visible; the request features are used instead
+    assert service._stored_features(7, institution_id=2) is None
+    assert service._preprocess_features(FEATURES).shape == (17,)
+
+
+def test_prediction_log_flushes_on_stop():
+    """stop() writes every queued record; records after stop() are dropped"""
+    try:
+        from app.services import prediction_log
+    except Exception as e:
+        pytest.skip(f"Prediction log unavailable: {e}")
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    prediction_log.prediction_logs.create(engine)
+
+    async def run(sink):
+        for i in range(25):
+            await sink.record(FEATURES, 1000.0 + i, "v1", 0.01)
+        await sink.stop()
+        await sink.record(FEATURES, 1.0, "v1", 0.01)
+        return sink._task
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(prediction_log, "engine", engine)
+        sink = prediction_log.PredictionLogSink(batch_size=10, flush_interval=60)
+        assert asyncio.run(run(sink)) is None
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM prediction_logs")).scalar_one() == 25
+
+
+@pytest.fixture(scope="module")
+def api_client():
+    """App with the backend's middleware stack and static routes
+
+    app.main itself needs the ORM models and a database, so the API
+    routers are left out.
+    """
+    try:
+        from fastapi import FastAPI
+        from fastapi.middleware.cors import CORSMiddleware
+        from fastapi.testclient import TestClient
+        from app.utils.metrics import record_request_metrics
+    except Exception as e:
+        pytest.skip(f"Backend application unavailable: {e}")
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:3000"], allow_methods=["*"])
+    app.middleware("http")(record_request_metrics)
+    app.get("/")(lambda: {"message": "Federated Medical Insurance Cost Prediction API"})
+    app.get("/health")(lambda: {"status": "healthy"})
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("cached", [False, True])
+@pytest.mark.parametrize("requests", [1, 100])
+def test_prediction_service(benchmark, prediction_service, requests, cached):
+    """PredictionService.predict calls per event loop run, with and without the result cache"""
+    benchmark.group = "backend_prediction"
+    prediction_service.cache.clear()
+    prediction_service.cache.max_size = 10000 if cached else 0
+
+    async def predict_many():
+        return await asyncio.gather(*(prediction_service.predict(FEATURES) for _ in range(requests)))
+
+    predictions = benchmark(lambda: asyncio.run(predict_many()))
+    assert len(predictions) == requests
+    if benchmark.stats:
+        benchmark.extra_info["requests_per_second"] = requests / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("path", ["/health", "/"])
+def test_http_request(benchmark, api_client, path):
+    """Round trip of a request through the middleware stack"""
+    benchmark.group = "backend_http"
+    response = benchmark(api_client.get, path)
+    assert response.status_code == 200
+    if benchmark.stats:
+        benchmark.extra_info["requests_per_second"] = 1 / benchmark.stats.stats.mean
@@ -0,0 +1,114 @@
+"""
+Benchmarks for loading patients into the database
+
+Compares scripts/bulk_loader.py with the previous DataFrame.to_sql(method='multi')
+approach. Uses a temporary SQLite database unless BENCH_DATABASE_URL points
+to a scratch PostgreSQL database with the schema from database_schema.sql
+(institution 1 and medical worker 1 must exist; benchmark rows are not
+cleaned up).
+"""
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from bulk_loader import BulkLoader
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+
+
+def _dataset(rows: int, seed: int = 42):
+    """Patients and two child tables in the loader script layout"""
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    patient_ids = np.arange(1, rows + 1)
+    patients = pd.DataFrame({
+        'institution_id': 1,
+        'created_by': 1,
+        'first_name': 'Patient',
+        'last_name': [f"{i:04d}" for i in patient_ids],
+        'date_of_birth': pd.Timestamp(now) - pd.to_timedelta(rng.integers(18 * 365, 64 * 365, rows), unit='D'),
+        'sex': rng.choice(['male', 'female'], rows),
+        'marital_status': 'single',
+        'number_of_dependents': rng.integers(0, 6, rows),
+        'insurance_cost': rng.uniform(1000, 60000, rows).round(2),
+        'created_at': now,
+        'updated_at': now,
+    })
+    physical = pd.DataFrame({
+        'patient_id': patient_ids,
+        'height_cm': rng.uniform(150, 200, rows).round(2),
+        'weight_kg': rng.uniform(50, 120, rows).round(2),
+        'bmi': rng.uniform(16, 45, rows).round(3),
+        'measured_at': now,
+        'updated_at': now,
+    })
+    lifestyle = pd.DataFrame({
+        'patient_id': patient_ids,
+        'smoking_status': rng.choice(['never', 'current'], rows),
+        'physical_activity_level': rng.choice(['sedentary', 'moderate', 'active'], rows),
+        'updated_at': now,
+    })
+    return patients, [('patient_physical_measurements', physical), ('patient_lifestyle', lifestyle)]
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    if BENCH_DATABASE_URL:
+        return create_engine(BENCH_DATABASE_URL)
+
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('bulk') / 'bench.db'}")
+    patients, children = _dataset(1)
+    with engine.begin() as conn:
+        columns = ", ".join(patients.columns)
+        conn.execute(text(f"CREATE TABLE patients (id INTEGER PRIMARY KEY, {columns})"))
+        for table, df in children:
+            columns = ", ".join(df.columns)
+            conn.execute(text(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, {columns})"))
+    return engine
+
+
+def _to_sql_insert(engine, patients, children):
+    """Previous approach: to_sql(method='multi') and ID recovery with ORDER BY id DESC"""
+    patients.to_sql('patients', engine, if_exists='append', index=False, method='multi', chunksize=1000)
+    with engine.connect() as conn:
+        result = conn.execute(text("SELECT id FROM patients ORDER BY id DESC LIMIT :limit"),
+                              {'limit': len(patients)})
+        patient_ids = [row[0] for row in result][::-1]
+    for table, df in children:
+        df = df.copy()
+        df['patient_id'] = patient_ids
+        df.to_sql(table, engine, if_exists='append', index=False, method='multi', chunksize=1000)
+
+
+@pytest.mark.parametrize("num_patients", [10000, 100000])
+def test_bulk_loader(benchmark, engine, num_patients):
+    """BulkLoader.load (COPY on PostgreSQL, executemany on SQLite)"""
+    benchmark.group = f"load_patients_{num_patients}"
+    patients, children = _dataset(num_patients)
+    loader = BulkLoader(engine)
+
+    ids = benchmark.pedantic(loader.load, args=(patients, children), rounds=3)
+
+    assert len(ids) == num_patients
+    if benchmark.stats:
+        benchmark.extra_info["patients_per_second"] = num_patients / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("num_patients", [10000])
+def test_to_sql_multi(benchmark, engine, num_patients):
+    """Baseline: DataFrame.to_sql(method='multi')"""
+    benchmark.group = f"load_patients_{num_patients}"
+    patients, children = _dataset(num_patients)
+
+    benchmark.pedantic(_to_sql_insert, args=(engine, patients, children), rounds=3)
+
+    if benchmark.stats:
+        benchmark.extra_info["patients_per_second"] = num_patients / benchmark.stats.stats.mean
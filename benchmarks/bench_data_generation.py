@@ -0,0 +1,73 @@
+"""
+Benchmarks for the synthetic dataset generator (scripts/generate_extended_data.py)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from generate_extended_data import create_name_pool, generate_patients, stream_patients
+from generation_utils import years_since_diagnosis
+
+# Distributions in the format returned by analyze_distributions()
+DISTRIBUTIONS = {
+    'age': {'mean': 39.2, 'std': 14.0, 'min': 18, 'max': 64},
+    'sex': {'male': 0.505, 'female': 0.495},
+    'bmi': {'mean': 30.7, 'std': 6.1, 'min': 16.0, 'max': 53.1},
+    'insurance_cost': {'mean': 13270.0, 'std': 12110.0, 'min': 1121.9, 'max': 63770.4},
+    'children': {0: 0.43, 1: 0.24, 2: 0.18, 3: 0.12, 4: 0.02, 5: 0.01},
+    'region': {'southeast': 0.27, 'southwest': 0.24, 'northwest': 0.25, 'northeast': 0.24},
+    'smoking': {'never': 0.6, 'former': 0.2, 'current': 0.2},
+    'activity': {'sedentary': 0.2, 'light': 0.3, 'moderate': 0.3, 'active': 0.15, 'very_active': 0.05},
+    'education': {'less_than_high_school': 0.1, 'high_school': 0.3, 'some_college': 0.2,
+                  'bachelor': 0.25, 'master': 0.1, 'doctorate': 0.05},
+    'employment': {'employed': 0.7, 'unemployed': 0.1, 'self_employed': 0.15, 'student': 0.05},
+}
+
+
+@pytest.fixture(scope="module")
+def name_pool():
+    return create_name_pool()
+
+
+@pytest.mark.parametrize("num_records", [10000, 100000])
+def test_generate_patients(benchmark, name_pool, num_records):
+    """Vectorized generate_patients"""
+    benchmark.group = "generate_patients"
+
+    dataframes = benchmark.pedantic(
+        generate_patients,
+        args=(num_records, DISTRIBUTIONS),
+        kwargs={"name_pool": name_pool},
+        rounds=3,
+        warmup_rounds=1,
+    )
+
+    assert len(dataframes[0]) == num_records
+    if benchmark.stats:
+        benchmark.extra_info["records_per_second"] = num_records / benchmark.stats.stats.mean
+
+
+def test_years_since_diagnosis_minimum_age():
+    """Patients at the minimum age (no diagnosis years available) get at least one year"""
+    max_years = np.array([0, -1, 1, 2, 30])
+
+    years = years_since_diagnosis(np.random.default_rng(42), max_years)
+
+    assert (years >= 1).all()
+    assert (years <= np.maximum(max_years, 1)).all()
+
+
+def test_stream_patients_multiple_chunks(tmp_path):
+    """Streamed chunks are written in order with contiguous patient ids"""
+    written = stream_patients(2500, DISTRIBUTIONS, tmp_path, chunk_size=1000, workers=2)
+
+    assert written == 2500
+    physical = pd.read_csv(tmp_path / "patient_physical_measurements.csv")
+    assert physical['patient_id'].tolist() == list(range(1, 2501))
+    medical_history = pd.read_csv(tmp_path / "patient_medical_history.csv")
+    assert medical_history['patient_id'].is_monotonic_increasing
@@ -0,0 +1,75 @@
+"""
+Benchmarks for CSV loading and feature preprocessing on the client
+"""
+import numpy as np
+import pandas as pd
+
+from conftest import generate_dataset
+from data_loader import DataLoaderClient
+
+
+def _loader(data_dir, rows):
+    """Data loader over all rows of the dataset"""
+    return DataLoaderClient(1, str(data_dir), start_idx=0, end_idx=rows)
+
+
+def test_load_data(benchmark, dataset_factory, rows):
+    """DataLoaderClient.load_data: read and merge the CSV files"""
+    benchmark.group = "load_data"
+    loader = _loader(dataset_factory(rows), rows)
+
+    df = benchmark.pedantic(loader.load_data, rounds=3, iterations=1, warmup_rounds=1)
+
+    assert len(df) == rows
+    if benchmark.stats:
+        benchmark.extra_info["rows_per_second"] = rows / benchmark.stats.stats.mean
+
+
+def test_preprocess_features(benchmark, dataset_factory, rows):
+    """DataLoaderClient.preprocess_features: encode and normalize merged rows"""
+    benchmark.group = "preprocess_features"
+    loader = _loader(dataset_factory(rows), rows)
+    df = loader.load_data()
+
+    # preprocess_features adds columns to the frame, so each round gets a fresh copy
+    features, targets = benchmark.pedantic(
+        loader.preprocess_features,
+        setup=lambda: ((df.copy(),), {}),
+        rounds=5,
+        warmup_rounds=1,
+    )
+
+    assert features.shape == (rows, 17)
+    assert len(targets) == rows
+    if benchmark.stats:
+        benchmark.extra_info["rows_per_second"] = rows / benchmark.stats.stats.mean
+
+
+def _append_row(path, **values):
+    """Append a copy of the last row of a CSV file with some values replaced"""
+    row = pd.read_csv(path).tail(1).assign(**values)
+    row.to_csv(path, mode="a", header=False, index=False)
+
+
+def test_refresh_child_rows_after_patient(tmp_path):
+    """Child rows appended in a later round than their patient row update that patient"""
+    generate_dataset(tmp_path, 100)
+    loader = DataLoaderClient(3, str(tmp_path))
+    train_loader, val_loader = loader.get_data_loaders()
+    train_dataset, val_dataset = train_loader.dataset, val_loader.dataset
+
+    _append_row(tmp_path / "patients.csv")
+    assert loader.refresh(train_dataset, val_dataset) == (1, 0)
+
+    _append_row(tmp_path / "patient_physical_measurements.csv", patient_id=101)
+    _append_row(tmp_path / "patient_lifestyle.csv", patient_id=101, smoking_status="current")
+    _append_row(tmp_path / "patient_socioeconomic.csv", patient_id=101, region="northeast")
+    _append_row(tmp_path / "patient_lab_results.csv", patient_id=101)
+    assert loader.refresh(train_dataset, val_dataset) == (0, 1)
+
+    # Same row as a full reload of the files
+    reloaded = DataLoaderClient(3, str(tmp_path))
+    features, _ = reloaded.load_features()
+    expected = features[reloaded._ids == 101][0]
+    position = np.flatnonzero(loader._split_ids[0] == 101)[0]
+    np.testing.assert_allclose(train_dataset.features[position].numpy(), expected, atol=1e-4)
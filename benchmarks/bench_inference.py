@@ -0,0 +1,39 @@
+"""
+Benchmarks for single and batch inference latency of the global model
+"""
+import numpy as np
+import pytest
+import torch
+
+from model import InsuranceCostModel
+
+
+@pytest.fixture(scope="module")
+def model():
+    model = InsuranceCostModel(input_size=17)
+    model.eval()
+    return model
+
+
+def _predict(model, features):
+    with torch.no_grad():
+        return model(features)
+
+
+def test_single_inference(benchmark, model):
+    """Latency of one prediction"""
+    benchmark.group = "inference"
+    features = torch.FloatTensor(np.random.default_rng(42).random((1, 17)))
+    output = benchmark(_predict, model, features)
+    assert output.shape == (1, 1)
+
+
+@pytest.mark.parametrize("batch_size", [64, 1024, 16384])
+def test_batch_inference(benchmark, model, batch_size):
+    """Latency of a batch of predictions"""
+    benchmark.group = "inference"
+    features = torch.FloatTensor(np.random.default_rng(42).random((batch_size, 17)))
+    output = benchmark(_predict, model, features)
+    assert output.shape == (batch_size, 1)
+    if benchmark.stats:
+        benchmark.extra_info["predictions_per_second"] = batch_size / benchmark.stats.stats.mean
@@ -0,0 +1,44 @@
+"""
+Benchmarks for model parameter (de)serialization
+"""
+import pytest
+from flwr.common import ndarrays_to_parameters, parameters_to_ndarrays
+
+from model import InsuranceCostModel, get_model_parameters, set_model_parameters
+
+
+@pytest.fixture(scope="module")
+def model():
+    return InsuranceCostModel(input_size=17)
+
+
+@pytest.fixture(scope="module")
+def ndarrays(model):
+    return get_model_parameters(model)
+
+
+def test_get_model_parameters(benchmark, model):
+    """state_dict -> list of numpy arrays"""
+    benchmark.group = "parameters"
+    benchmark(get_model_parameters, model)
+
+
+def test_set_model_parameters(benchmark, model, ndarrays):
+    """list of numpy arrays -> state_dict"""
+    benchmark.group = "parameters"
+    benchmark(set_model_parameters, model, ndarrays)
+
+
+def test_ndarrays_to_parameters(benchmark, ndarrays):
+    """Serialize numpy arrays to Flower Parameters"""
+    benchmark.group = "serialization"
+    parameters = benchmark(ndarrays_to_parameters, ndarrays)
+    benchmark.extra_info["bytes"] = sum(len(tensor) for tensor in parameters.tensors)
+
+
+def test_parameters_to_ndarrays(benchmark, ndarrays):
+    """Deserialize Flower Parameters to numpy arrays"""
+    benchmark.group = "serialization"
+    parameters = ndarrays_to_parameters(ndarrays)
+    result = benchmark(parameters_to_ndarrays, parameters)
+    assert len(result) == len(ndarrays)
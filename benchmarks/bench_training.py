@@ -0,0 +1,42 @@
+"""
+Benchmarks for local training throughput of a Flower client
+"""
+import pytest
+
+from client import FlowerClient
+
+
+@pytest.fixture(scope="module")
+def flower_client(small_dataset):
+    """Client on the first third of the 10k-row dataset"""
+    return FlowerClient(client_id=1, data_dir=str(small_dataset), local_epochs=1)
+
+
+@pytest.mark.parametrize("batch_size", [32, 128, 512])
+def test_fit_epoch(benchmark, flower_client, batch_size):
+    """One local epoch through FlowerClient.fit"""
+    benchmark.group = "fit_epoch"
+    parameters = flower_client.get_parameters({})
+    config = {"local_epochs": 1, "batch_size": batch_size}
+
+    _, num_samples, metrics = benchmark.pedantic(
+        flower_client.fit, args=(parameters, config), rounds=5, warmup_rounds=1
+    )
+
+    assert metrics["local_epochs"] == 1
+    if benchmark.stats:
+        benchmark.extra_info["samples_per_second"] = num_samples / benchmark.stats.stats.mean
+
+
+def test_evaluate(benchmark, flower_client):
+    """Validation pass through FlowerClient.evaluate"""
+    benchmark.group = "evaluate"
+    parameters = flower_client.get_parameters({})
+
+    loss, num_samples, _ = benchmark.pedantic(
+        flower_client.evaluate, args=(parameters, {}), rounds=5, warmup_rounds=1
+    )
+
+    assert num_samples > 0
+    if benchmark.stats:
+        benchmark.extra_info["samples_per_second"] = num_samples / benchmark.stats.stats.mean
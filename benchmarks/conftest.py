@@ -0,0 +1,125 @@
+"""
+Shared fixtures for the performance benchmarks
+
+Benchmarks run against synthetic CSV files with the same layout as the
+generated dataset in ``output/``, so results do not depend on local data.
+Files are generated once per row count and session with a fixed seed.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+# Same import layout as the client: model.py from the server directory,
+# data_loader.py from the client directory
+sys.path.insert(0, str(ROOT / "flower_server"))
+sys.path.insert(0, str(ROOT / "flower_client"))
+
+# Row counts for the data loading benchmarks (override with --bench-rows or BENCH_ROWS)
+DEFAULT_BENCH_ROWS = os.getenv("BENCH_ROWS", "10000,100000,1000000")
+BENCH_SEED = 42
+
+REGIONS = np.array(["northeast", "northwest", "southeast", "southwest"])
+SMOKING_STATUS = np.array(["never", "former", "current"])
+ACTIVITY_LEVELS = np.array(["sedentary", "light", "moderate", "active", "very_active"])
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-rows",
+        default=DEFAULT_BENCH_ROWS,
+        help="Comma-separated row counts for the data loading benchmarks",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "rows" in metafunc.fixturenames:
+        rows = [int(value) for value in metafunc.config.getoption("bench_rows").split(",") if value]
+        metafunc.parametrize("rows", rows, ids=[f"{value}_rows" for value in rows])
+
+
+def generate_dataset(data_dir: Path, rows: int, seed: int = BENCH_SEED):
+    """Write synthetic patient CSV files with ``rows`` patients"""
+    rng = np.random.default_rng(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    patient_id = np.arange(1, rows + 1)
+
+    age = rng.integers(18, 65, rows)
+    now = datetime.now()
+    date_of_birth = [
+        (now - timedelta(days=int(a * 365.25))).strftime("%Y-%m-%d") for a in age
+    ]
+    sex = rng.choice(["male", "female"], rows)
+    children = rng.integers(0, 6, rows)
+    bmi = np.clip(rng.normal(30.0, 6.0, rows), 15, 50).round(3)
+    smoking = rng.choice(SMOKING_STATUS, rows, p=[0.6, 0.2, 0.2])
+    insurance_cost = np.clip(
+        rng.normal(13000, 12000, rows) + (age - 40) * 100 + (smoking == "current") * 5000,
+        1000, 65000,
+    ).round(2)
+
+    pd.DataFrame({
+        "institution_id": 1,
+        "first_name": "Bench",
+        "last_name": "Patient",
+        "date_of_birth": date_of_birth,
+        "sex": sex,
+        "number_of_dependents": children,
+        "insurance_cost": insurance_cost,
+    }).to_csv(data_dir / "patients.csv", index=False)
+
+    height_cm = np.clip(rng.normal(170, 10, rows), 140, 210).round(2)
+    pd.DataFrame({
+        "patient_id": patient_id,
+        "height_cm": height_cm,
+        "weight_kg": np.clip(bmi * (height_cm / 100) ** 2, 40, 200).round(2),
+        "bmi": bmi,
+        "systolic_bp": rng.integers(90, 180, rows),
+        "diastolic_bp": rng.integers(60, 120, rows),
+        "resting_heart_rate": rng.integers(50, 100, rows),
+    }).to_csv(data_dir / "patient_physical_measurements.csv", index=False)
+
+    pd.DataFrame({
+        "patient_id": patient_id,
+        "smoking_status": smoking,
+        "physical_activity_level": rng.choice(ACTIVITY_LEVELS, rows),
+    }).to_csv(data_dir / "patient_lifestyle.csv", index=False)
+
+    pd.DataFrame({
+        "patient_id": patient_id,
+        "region": rng.choice(REGIONS, rows),
+    }).to_csv(data_dir / "patient_socioeconomic.csv", index=False)
+
+    pd.DataFrame({
+        "patient_id": patient_id,
+        "total_cholesterol": rng.uniform(100, 300, rows).round(2),
+        "glucose": rng.uniform(70, 120, rows).round(2),
+        "hba1c": rng.uniform(4.0, 6.5, rows).round(2),
+    }).to_csv(data_dir / "patient_lab_results.csv", index=False)
+
+
+@pytest.fixture(scope="session")
+def dataset_factory(tmp_path_factory):
+    """Return a function that gives the directory of a synthetic dataset with N rows"""
+    cache = {}
+
+    def get_dataset(rows: int) -> Path:
+        if rows not in cache:
+            data_dir = tmp_path_factory.mktemp(f"data_{rows}")
+            generate_dataset(data_dir, rows)
+            cache[rows] = data_dir
+        return cache[rows]
+
+    return get_dataset
+
+
+@pytest.fixture(scope="session")
+def small_dataset(dataset_factory):
+    """Synthetic dataset for benchmarks that do not scale with row count"""
+    return dataset_factory(10000)
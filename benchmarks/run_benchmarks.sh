@@ -0,0 +1,22 @@
+#!/bin/bash
+# Run the benchmark suite
+#   bash run_benchmarks.sh           compare against the latest stored baseline
+#                                    (the first run on a machine stores one)
+#   bash run_benchmarks.sh --save    run and store a new baseline
+# Extra arguments are passed to pytest (e.g. --bench-rows=10000,100000 -k load_data)
+
+set -e
+cd "$(dirname "$0")"
+
+# Fail when the mean of a benchmark regresses by more than this
+REGRESSION_THRESHOLD="${REGRESSION_THRESHOLD:-10%}"
+
+if [ "$1" == "--save" ]; then
+    shift
+    python -m pytest --benchmark-autosave "$@"
+elif ls baselines/*/*.json > /dev/null 2>&1; then
+    python -m pytest --benchmark-compare --benchmark-compare-fail="mean:${REGRESSION_THRESHOLD}" "$@"
+else
+    echo "No stored baseline found, storing this run as the baseline"
+    python -m pytest --benchmark-autosave "$@"
+fi
@@ -63,7 +63,8 @@ CREATE TABLE IF NOT EXISTS patients (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_patients_institution ON patients(institution_id);
+-- Also serves keyset pagination of the patient listing (ORDER BY institution_id, id)
+CREATE INDEX idx_patients_institution ON patients(institution_id, id);
 CREATE INDEX idx_patients_created_by ON patients(created_by);
 CREATE INDEX idx_patients_age ON patients(age);
 CREATE INDEX idx_patients_sex ON patients(sex);
@@ -522,6 +523,25 @@ CREATE TABLE IF NOT EXISTS training_rounds (
 
 CREATE INDEX idx_training_rounds_number ON training_rounds(round_number);
 
+-- ============================================================================
+-- Prediction Logs (audit trail, written in batches by the API)
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS prediction_logs (
+    id BIGSERIAL PRIMARY KEY,
+    patient_id INTEGER REFERENCES patients(id) ON DELETE SET NULL,
+    requested_by INTEGER REFERENCES medical_workers(id) ON DELETE SET NULL,
+    institution_id INTEGER REFERENCES institutions(id) ON DELETE SET NULL,
+    input_hash CHAR(64) NOT NULL,  -- SHA-256 of the request features
+    predicted_cost DECIMAL(12, 2) NOT NULL,
+    model_version VARCHAR(50),
+    latency_ms REAL NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_prediction_logs_patient ON prediction_logs(patient_id);
+CREATE INDEX idx_prediction_logs_created ON prediction_logs(created_at);
+
 -- ============================================================================
 -- Triggers for Updated At
 -- ============================================================================
@@ -614,6 +634,146 @@ SELECT DISTINCT ON (patient_id)
 FROM patient_lab_results
 ORDER BY patient_id, test_date DESC;
 
+-- ============================================================================
+-- Feature Store: one row of model-ready features per patient
+-- ============================================================================
+-- Training (DATA_SOURCE=feature_store) and serving read this table instead of
+-- re-joining the source tables. Encodings match the Flower client's
+-- preprocessing, except that missing measurements take fixed reference values
+-- instead of the medians of the loaded data, so a patient's row does not
+-- depend on the rest of the data. Kept current by refresh_patient_features(),
+-- see scripts/refresh_feature_store.py.
+
+CREATE TABLE IF NOT EXISTS patient_features (
+    patient_id INTEGER PRIMARY KEY REFERENCES patients(id) ON DELETE CASCADE,
+    institution_id INTEGER NOT NULL REFERENCES institutions(id) ON DELETE CASCADE,
+    
+    -- Model inputs, in model order
+    age_norm REAL NOT NULL,
+    sex_encoded REAL NOT NULL,
+    bmi_norm REAL NOT NULL,
+    children_norm REAL NOT NULL,
+    smoker_encoded REAL NOT NULL,
+    height_norm REAL NOT NULL,
+    weight_norm REAL NOT NULL,
+    bp_systolic_norm REAL NOT NULL,
+    bp_diastolic_norm REAL NOT NULL,
+    heart_rate_norm REAL NOT NULL,
+    cholesterol_norm REAL NOT NULL,
+    glucose_norm REAL NOT NULL,
+    activity_encoded REAL NOT NULL,
+    region_northeast REAL NOT NULL,
+    region_northwest REAL NOT NULL,
+    region_southeast REAL NOT NULL,
+    region_southwest REAL NOT NULL,
+    
+    -- Training target
+    insurance_cost DECIMAL(10, 2),
+    
+    -- Latest change in the source rows (refresh watermark) and refresh time
+    source_updated_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_patient_features_institution ON patient_features(institution_id, patient_id);
+CREATE INDEX idx_patient_features_source_updated ON patient_features(source_updated_at);
+
+-- Change detection for incremental refreshes
+CREATE INDEX idx_patients_updated_at ON patients(updated_at);
+CREATE INDEX idx_patient_physical_measurements_updated_at ON patient_physical_measurements(updated_at);
+CREATE INDEX idx_patient_lifestyle_updated_at ON patient_lifestyle(updated_at);
+CREATE INDEX idx_patient_socioeconomic_updated_at ON patient_socioeconomic(updated_at);
+CREATE INDEX idx_patient_lab_results_created_at ON patient_lab_results(created_at);
+
+-- Recompute features of patients whose source rows changed after `since`
+-- (all patients by default). Age only moves with time, so run a full refresh
+-- periodically as well. Returns the number of rows written.
+CREATE OR REPLACE FUNCTION refresh_patient_features(since TIMESTAMP WITH TIME ZONE DEFAULT '-infinity')
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    WITH changed AS (
+        SELECT id AS patient_id FROM patients WHERE updated_at > since
+        UNION SELECT patient_id FROM patient_physical_measurements WHERE updated_at > since
+        UNION SELECT patient_id FROM patient_lifestyle WHERE updated_at > since
+        UNION SELECT patient_id FROM patient_socioeconomic WHERE updated_at > since
+        UNION SELECT patient_id FROM patient_lab_results WHERE created_at > since
+    )
+    INSERT INTO patient_features (
+        patient_id, institution_id,
+        age_norm, sex_encoded, bmi_norm, children_norm, smoker_encoded,
+        height_norm, weight_norm, bp_systolic_norm, bp_diastolic_norm,
+        heart_rate_norm, cholesterol_norm, glucose_norm, activity_encoded,
+        region_northeast, region_northwest, region_southeast, region_southwest,
+        insurance_cost, source_updated_at, updated_at
+    )
+    SELECT
+        p.id,
+        p.institution_id,
+        ((CURRENT_DATE - p.date_of_birth) / 365.25 - 18) / (64 - 18),
+        CASE p.sex WHEN 'male' THEN 1.0 WHEN 'female' THEN 0.0 ELSE 0.5 END,
+        (COALESCE(pm.bmi, 26.5) - 15) / (50 - 15),
+        COALESCE(p.number_of_dependents, 0) / 5.0,
+        CASE pl.smoking_status WHEN 'current' THEN 1.0 WHEN 'former' THEN 0.5 ELSE 0.0 END,
+        (COALESCE(pm.height_cm, 170) - 140) / (210 - 140),
+        (COALESCE(pm.weight_kg, 75) - 40) / (200 - 40),
+        (COALESCE(pm.systolic_bp, 120) - 90) / (180.0 - 90),
+        (COALESCE(pm.diastolic_bp, 80) - 60) / (120.0 - 60),
+        (COALESCE(pm.resting_heart_rate, 72) - 50) / (100.0 - 50),
+        (COALESCE(lab.total_cholesterol, 190) - 100) / (300 - 100),
+        (COALESCE(lab.glucose, 95) - 70) / (120 - 70),
+        CASE pl.physical_activity_level
+            WHEN 'sedentary' THEN 0.0 WHEN 'light' THEN 0.25 WHEN 'moderate' THEN 0.5
+            WHEN 'active' THEN 0.75 WHEN 'very_active' THEN 1.0 ELSE 0.5
+        END,
+        COALESCE(ps.region = 'northeast', FALSE)::INTEGER,
+        COALESCE(ps.region = 'northwest', FALSE)::INTEGER,
+        COALESCE(ps.region = 'southeast', FALSE)::INTEGER,
+        COALESCE(ps.region = 'southwest', FALSE)::INTEGER,
+        p.insurance_cost,
+        COALESCE(GREATEST(p.updated_at, pm.updated_at, pl.updated_at, ps.updated_at, lab.created_at), CURRENT_TIMESTAMP),
+        CURRENT_TIMESTAMP
+    FROM changed c
+    JOIN patients p ON p.id = c.patient_id
+    LEFT JOIN patient_physical_measurements pm ON pm.patient_id = p.id
+    LEFT JOIN patient_lifestyle pl ON pl.patient_id = p.id
+    LEFT JOIN patient_socioeconomic ps ON ps.patient_id = p.id
+    LEFT JOIN LATERAL (
+        SELECT total_cholesterol, glucose, created_at
+        FROM patient_lab_results
+        WHERE patient_id = p.id
+        ORDER BY test_date DESC
+        LIMIT 1
+    ) lab ON TRUE
+    ON CONFLICT (patient_id) DO UPDATE SET
+        institution_id = EXCLUDED.institution_id,
+        age_norm = EXCLUDED.age_norm,
+        sex_encoded = EXCLUDED.sex_encoded,
+        bmi_norm = EXCLUDED.bmi_norm,
+        children_norm = EXCLUDED.children_norm,
+        smoker_encoded = EXCLUDED.smoker_encoded,
+        height_norm = EXCLUDED.height_norm,
+        weight_norm = EXCLUDED.weight_norm,
+        bp_systolic_norm = EXCLUDED.bp_systolic_norm,
+        bp_diastolic_norm = EXCLUDED.bp_diastolic_norm,
+        heart_rate_norm = EXCLUDED.heart_rate_norm,
+        cholesterol_norm = EXCLUDED.cholesterol_norm,
+        glucose_norm = EXCLUDED.glucose_norm,
+        activity_encoded = EXCLUDED.activity_encoded,
+        region_northeast = EXCLUDED.region_northeast,
+        region_northwest = EXCLUDED.region_northwest,
+        region_southeast = EXCLUDED.region_southeast,
+        region_southwest = EXCLUDED.region_southwest,
+        insurance_cost = EXCLUDED.insurance_cost,
+        source_updated_at = EXCLUDED.source_updated_at,
+        updated_at = EXCLUDED.updated_at;
+    
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================================================
 -- Comments for Documentation
 -- ============================================================================
@@ -633,6 +793,7 @@ COMMENT ON TABLE patient_functional_status IS 'Functional status, mobility, pain
 COMMENT ON TABLE patient_risk_scores IS 'Calculated risk scores (Framingham, Charlson, etc.)';
 COMMENT ON TABLE clinical_notes IS 'Unstructured clinical notes and documentation';
 COMMENT ON TABLE insurance_claims IS 'Insurance claim history';
+COMMENT ON TABLE patient_features IS 'Model-ready encoded features per patient (feature store)';
 
 -- ============================================================================
 -- End of Schema
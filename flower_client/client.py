@@ -7,6 +7,7 @@ import torch.nn as nn
 from typing import Dict, Tuple, Optional
 import os
 import sys
+import time
 from pathlib import Path
 
 # Import model from server directory
@@ -14,7 +15,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent / "flower_server"))
 
 from model import InsuranceCostModel, get_model_parameters, set_model_parameters
-from data_loader import DataLoaderClient
+from data_loader import DataLoaderClient, rebatch_data_loaders, get_client_properties
 
 
 class FlowerClient(fl.client.NumPyClient):
@@ -26,7 +27,9 @@ class FlowerClient(fl.client.NumPyClient):
         data_dir: str = "output",
         local_epochs: int = 5,
         batch_size: int = 32,
-        learning_rate: float = 0.001
+        learning_rate: float = 0.001,
+        data_source: Optional[str] = None,
+        institution_id: Optional[int] = None
     ):
         self.client_id = client_id
         self.local_epochs = local_epochs
@@ -34,7 +37,9 @@ class FlowerClient(fl.client.NumPyClient):
         self.learning_rate = learning_rate
         
         # Initialize data loader (loads from CSV)
-        self.data_loader = DataLoaderClient(client_id, data_dir)
+        self.data_loader = DataLoaderClient(
+            client_id, data_dir, data_source=data_source, institution_id=institution_id
+        )
         
         # Determine input size from data
         self._determine_input_size()
@@ -55,8 +60,7 @@ class FlowerClient(fl.client.NumPyClient):
     
     def _determine_input_size(self):
         """Determine input size from data"""
-        df = self.data_loader.load_data()
-        features, _ = self.data_loader.preprocess_features(df)
+        features, _ = self.data_loader.load_features()
         self.input_size = features.shape[1]
     
     def _load_data(self):
@@ -83,8 +87,24 @@ class FlowerClient(fl.client.NumPyClient):
         """Set model parameters"""
         set_model_parameters(self.model, parameters)
     
+    def get_properties(self, config: Dict):
+        """Report hardware and dataset size for server-side workload planning"""
+        return get_client_properties(self.train_loader, self.device)
+    
+    def _set_batch_size(self, batch_size: int):
+        """Re-batch the in-memory datasets without reloading CSV files"""
+        if batch_size == self.batch_size:
+            return
+        self.batch_size = batch_size
+        self.train_loader, self.val_loader = rebatch_data_loaders(
+            self.train_loader, self.val_loader, batch_size
+        )
+        print(f"Client {self.client_id}: Batch size set to {batch_size} ({len(self.train_loader)} train batches)")
+    
     def fit(self, parameters, config: Dict):
         """Train model on local data"""
+        start_time = time.time()
+        
         # Set parameters from server
         self.set_parameters(parameters)
         
@@ -93,12 +113,20 @@ class FlowerClient(fl.client.NumPyClient):
             for param_group in self.optimizer.param_groups:
                 param_group['lr'] = config["learning_rate"]
         
+        # Batch size and local epochs may be assigned per client by the server
+        if "batch_size" in config:
+            self._set_batch_size(int(config["batch_size"]))
+        local_epochs = int(config.get("local_epochs", self.local_epochs))
+        
+        # Pick up patients added or updated since the last round
+        self.data_loader.refresh(self.train_loader.dataset, self.val_loader.dataset)
+        
         # Train model
         self.model.train()
         total_loss = 0.0
         num_samples = 0
         
-        for epoch in range(self.local_epochs):
+        for epoch in range(local_epochs):
             epoch_loss = 0.0
             epoch_samples = 0
             
@@ -125,13 +153,20 @@ class FlowerClient(fl.client.NumPyClient):
         updated_parameters = self.get_parameters(config)
         
         # Calculate average loss
-        avg_loss = total_loss / (self.local_epochs * len(self.train_loader))
+        avg_loss = total_loss / (local_epochs * len(self.train_loader))
+        duration = time.time() - start_time
         
         print(f"Client {self.client_id}: Training completed")
         print(f"  Average loss: {avg_loss:.4f}")
         print(f"  Samples: {num_samples}")
+        print(f"  Duration: {duration:.2f}s")
         
-        return updated_parameters, num_samples, {"loss": avg_loss}
+        return updated_parameters, num_samples, {
+            "loss": avg_loss,
+            "client_id": self.client_id,
+            "duration_seconds": duration,
+            "local_epochs": local_epochs,
+        }
     
     def evaluate(self, parameters, config: Dict):
         """Evaluate model on local validation data"""
@@ -170,9 +205,13 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Flower Client")
-    parser.add_argument("--client-id", type=int, required=True, help="Client ID (1, 2, or 3)")
+    parser.add_argument("--client-id", type=int, default=int(os.getenv("CLIENT_ID", "1")), help="Client ID (1, 2, or 3)")
     parser.add_argument("--server-address", type=str, default=os.getenv("FLOWER_SERVER_URL", "localhost:8080").replace("http://", ""), help="Flower server address")
     parser.add_argument("--data-dir", type=str, default="output", help="Directory containing CSV files")
+    parser.add_argument("--data-source", type=str, choices=["csv", "sql", "feature_store"], default=os.getenv("DATA_SOURCE", "csv"),
+                        help="Train from CSV files, the DATABASE_URL tables, or its patient_features table")
+    parser.add_argument("--institution-id", type=int, default=None,
+                        help="Institution to train on from the database (default: INSTITUTION_ID, then client ID)")
     args = parser.parse_args()
     
     client_id = args.client_id
@@ -186,7 +225,10 @@ def main():
     
     print(f"Starting Flower client {client_id}")
     print(f"Server address: {server_address}")
-    print(f"Data directory: {data_dir}")
+    if args.data_source != "csv":
+        print(f"Data source: database (institution {args.institution_id or os.getenv('INSTITUTION_ID', client_id)})")
+    else:
+        print(f"Data directory: {data_dir}")
     print(f"Configuration:")
     print(f"  - Local epochs: {local_epochs}")
     print(f"  - Batch size: {batch_size}")
@@ -198,7 +240,9 @@ def main():
         data_dir=data_dir,
         local_epochs=local_epochs,
         batch_size=batch_size,
-        learning_rate=learning_rate
+        learning_rate=learning_rate,
+        data_source=args.data_source,
+        institution_id=args.institution_id
     )
     
     # Start client - use NumPyClient API directly
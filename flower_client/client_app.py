@@ -12,14 +12,19 @@ import sys
 from pathlib import Path
 from typing import Dict, Optional
 import threading
-from flask import Flask, jsonify, request
+import time
+from flask import Flask, jsonify, request, Response, send_file
 from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 # Import model from server directory
 sys.path.insert(0, str(Path(__file__).parent.parent / "flower_server"))
 
 from model import InsuranceCostModel
-from data_loader import DataLoaderClient
+from data_loader import DataLoaderClient, rebatch_data_loaders
+import client_metrics
+from profiling import get_profiler
+from tracing import get_tracer
 
 
 class ClientState:
@@ -32,8 +37,7 @@ class ClientState:
         self.data_loader = DataLoaderClient(client_id, data_dir)
         
         # Determine input size from data
-        df = self.data_loader.load_data()
-        features, _ = self.data_loader.preprocess_features(df)
+        features, _ = self.data_loader.load_features()
         self.input_size = features.shape[1]
         
         # Initialize model
@@ -52,6 +56,9 @@ class ClientState:
             batch_size=self.batch_size
         )
         
+        # Phase timing spans are recorded under this client's name
+        self.tracer = get_tracer(f"client_{client_id}")
+        
         print(f"Client {client_id}: Initialized")
         print(f"  Input features: {self.input_size}")
         print(f"  Train batches: {len(self.train_loader)}")
@@ -64,6 +71,15 @@ class ClientState:
             "last_loss": None,
             "last_eval_loss": None,
         }
+    
+    def set_batch_size(self, batch_size: int):
+        """Re-batch the in-memory datasets without reloading CSV files"""
+        if batch_size == self.batch_size:
+            return
+        self.batch_size = batch_size
+        self.train_loader, self.val_loader = rebatch_data_loaders(
+            self.train_loader, self.val_loader, batch_size
+        )
 
 
 # Global state instance
@@ -86,20 +102,40 @@ app = ClientApp()
 
 @app.train()
 def train(msg: Message, context: Context) -> Message:
+    """Train the model on local data (profiled if requested via POST /profile)."""
+    state = get_client_state()
+    config = msg.content.get("config", ConfigRecord({}))
+    with get_profiler(state.client_id).profile_fit(config.get("server_round", 0)):
+        return _train(msg, context)
+
+
+def _train(msg: Message, context: Context) -> Message:
     """Train the model on local data."""
     state = get_client_state()
     state.training_status["is_training"] = True
+    metric_labels = {"client_id": str(state.client_id)}
+    start_time = time.time()
     
     try:
+        # Read config if provided
+        config = msg.content.get("config", ConfigRecord({}))
+        round_num = config.get("server_round", 0)
+        
         # Read ArrayRecord received from ServerApp
         arrays = msg.content.get("arrays")
         if arrays is not None:
             # Load weights to model
-            state.model.load_state_dict(arrays.to_torch_state_dict())
+            with state.tracer.span("set_model_parameters", round_num, state.client_id):
+                state.model.load_state_dict(arrays.to_torch_state_dict())
         
-        # Read config if provided
-        config = msg.content.get("config", ConfigRecord({}))
         local_epochs = int(config.get("local_epochs", os.getenv("LOCAL_EPOCHS", "5")))
+        if "batch_size" in config:
+            state.set_batch_size(int(config["batch_size"]))
+        
+        # Pick up patients added or updated since the last round
+        with state.tracer.span("refresh_data", round_num, state.client_id):
+            state.data_loader.refresh(state.train_loader.dataset, state.val_loader.dataset)
+        client_metrics.BATCH_SIZE.labels(**metric_labels).set(state.batch_size)
         
         # Update learning rate if provided
         if "learning_rate" in config:
@@ -113,6 +149,7 @@ def train(msg: Message, context: Context) -> Message:
         num_samples = 0
         
         for epoch in range(local_epochs):
+            epoch_start = time.time()
             epoch_loss = 0.0
             epoch_samples = 0
             
@@ -134,9 +171,18 @@ def train(msg: Message, context: Context) -> Message:
             
             total_loss += epoch_loss
             num_samples = epoch_samples
+            epoch_duration = time.time() - epoch_start
+            client_metrics.EPOCH_DURATION.labels(**metric_labels).observe(epoch_duration)
+            state.tracer.record("train_epoch", epoch_start, epoch_duration, round_num, state.client_id,
+                                epoch=epoch, samples=epoch_samples)
         
         # Calculate average loss
         avg_loss = total_loss / (local_epochs * len(state.train_loader))
+        duration = time.time() - start_time
+        client_metrics.FIT_DURATION.labels(**metric_labels).observe(duration)
+        client_metrics.SAMPLES_PER_SECOND.labels(**metric_labels).set(num_samples * local_epochs / max(duration, 1e-6))
+        client_metrics.TRAIN_LOSS.labels(**metric_labels).set(avg_loss)
+        state.tracer.record("fit", start_time, duration, round_num, state.client_id)
         
         print(f"Client {state.client_id}: Training completed")
         print(f"  Average loss: {avg_loss:.4f}")
@@ -148,7 +194,8 @@ def train(msg: Message, context: Context) -> Message:
         state.training_status["is_training"] = False
         
         # Construct reply Message
-        model_record = ArrayRecord(state.model.state_dict())
+        with state.tracer.span("get_model_parameters", round_num, state.client_id):
+            model_record = ArrayRecord(state.model.state_dict())
         metrics = MetricRecord({
             "train_loss": avg_loss,
             "num-examples": num_samples,
@@ -169,6 +216,7 @@ def train(msg: Message, context: Context) -> Message:
 def evaluate(msg: Message, context: Context) -> Message:
     """Evaluate the model on local data."""
     state = get_client_state()
+    start_time = time.time()
     
     try:
         # Read ArrayRecord received from ServerApp
@@ -204,6 +252,12 @@ def evaluate(msg: Message, context: Context) -> Message:
         
         # Update status
         state.training_status["last_eval_loss"] = mse
+        metric_labels = {"client_id": str(state.client_id)}
+        client_metrics.EVALUATE_DURATION.labels(**metric_labels).observe(time.time() - start_time)
+        config = msg.content.get("config", ConfigRecord({}))
+        state.tracer.record("evaluate", start_time, time.time() - start_time,
+                            config.get("server_round", 0), state.client_id)
+        client_metrics.EVAL_LOSS.labels(**metric_labels).set(mse)
         
         # Construct reply Message
         metrics = MetricRecord({
@@ -282,11 +336,7 @@ def trigger_training():
         for param_group in state.optimizer.param_groups:
             param_group['lr'] = learning_rate
     
-    if batch_size != state.batch_size:
-        state.batch_size = batch_size
-        state.train_loader, state.val_loader = state.data_loader.get_data_loaders(
-            batch_size=batch_size
-        )
+    state.set_batch_size(int(batch_size))
     
     return jsonify({
         "status": "request_received",
@@ -326,6 +376,60 @@ def model_info():
     })
 
 
+@http_app.route("/tracing/round/<int:round_num>", methods=["GET"])
+def tracing_waterfall(round_num):
+    """Get phase timing waterfall of a round (?format=text for a text chart)"""
+    tracer = get_client_state().tracer
+    if request.args.get("format") == "text":
+        return Response(tracer.render_waterfall(round_num), content_type="text/plain")
+    return jsonify({"round": round_num, "spans": tracer.waterfall(round_num)})
+
+
+@http_app.route("/tracing/chrome", methods=["GET"])
+def tracing_chrome():
+    """Export spans as Chrome trace JSON (?round=N for a single round)"""
+    round_num = request.args.get("round", type=int)
+    response = jsonify(get_client_state().tracer.chrome_trace(round_num))
+    response.headers["Content-Disposition"] = "attachment; filename=trace.json"
+    return response
+
+
+@http_app.route("/profile", methods=["POST"])
+def request_profile():
+    """Profile the next training rounds (?rounds=1&mode=torch|cprofile)"""
+    state = get_client_state()
+    try:
+        status = get_profiler(state.client_id).request(
+            rounds=request.args.get("rounds", 1, type=int),
+            mode=request.args.get("mode", "torch"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"status": "armed", "profiler": status})
+
+
+@http_app.route("/profile", methods=["GET"])
+def list_profiles():
+    """Get profiler status and stored profiles"""
+    profiler = get_profiler(get_client_state().client_id)
+    return jsonify({"profiler": profiler.get_status(), "profiles": profiler.list_profiles()})
+
+
+@http_app.route("/profile/<path:filename>", methods=["GET"])
+def download_profile(filename):
+    """Download a stored profile"""
+    path = get_profiler(get_client_state().client_id).get_profile_path(filename)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, as_attachment=True)
+
+
+@http_app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
 def start_http_server(port: int = 8081):
     """Start HTTP API server in a separate thread"""
     def run_server():
@@ -338,6 +442,10 @@ def start_http_server(port: int = 8081):
     print(f"  Status: http://localhost:{port}/status")
     print(f"  Trigger training: POST http://localhost:{port}/train/trigger")
     print(f"  Model info: http://localhost:{port}/model/info")
+    print(f"  Metrics: http://localhost:{port}/metrics")
+    print(f"  Round waterfall: http://localhost:{port}/tracing/round/<n>")
+    print(f"  Chrome trace: http://localhost:{port}/tracing/chrome")
+    print(f"  Profile next training: POST http://localhost:{port}/profile?rounds=1&mode=torch")
 
 
 def main():
@@ -0,0 +1,40 @@
+"""
+Prometheus metrics for Flower clients
+
+Exposed on ``/metrics`` of the client HTTP API (client_with_api.py,
+client_app.py).
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+EPOCH_DURATION = Histogram(
+    "flower_client_epoch_duration_seconds", "Duration of one local training epoch",
+    ["client_id"], buckets=_DURATION_BUCKETS,
+)
+FIT_DURATION = Histogram(
+    "flower_client_fit_duration_seconds", "Duration of a fit request",
+    ["client_id"], buckets=_DURATION_BUCKETS,
+)
+EVALUATE_DURATION = Histogram(
+    "flower_client_evaluate_duration_seconds", "Duration of an evaluate request",
+    ["client_id"], buckets=_DURATION_BUCKETS,
+)
+SAMPLES_PER_SECOND = Gauge(
+    "flower_client_samples_per_second", "Training throughput of the last fit", ["client_id"]
+)
+BATCH_SIZE = Gauge("flower_client_batch_size", "Current training batch size", ["client_id"])
+TRAIN_LOSS = Gauge("flower_client_train_loss", "Average training loss of the last fit", ["client_id"])
+EVAL_LOSS = Gauge("flower_client_eval_loss", "Validation loss of the last evaluation", ["client_id"])
+BYTES_RECEIVED = Counter(
+    "flower_client_bytes_received_total", "Model parameter bytes received from the server",
+    ["client_id"],
+)
+BYTES_SENT = Counter(
+    "flower_client_bytes_sent_total", "Model parameter bytes sent to the server", ["client_id"]
+)
+
+
+def ndarrays_nbytes(ndarrays) -> int:
+    """Size of a list of numpy arrays in bytes"""
+    return sum(array.nbytes for array in ndarrays)
@@ -5,13 +5,14 @@ Uses NumPyClient API for compatibility, adds HTTP API layer
 import flwr as fl
 import torch
 import torch.nn as nn
-from typing import Dict
+from typing import Dict, Optional
 import os
 import sys
 from pathlib import Path
 import threading
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, send_file
 from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 # Import monitoring FIRST from current directory (client) to avoid conflicts
 # Use absolute path and unique module name to prevent conflicts with server monitoring
@@ -39,7 +40,10 @@ server_path = str(Path(__file__).parent.parent / "flower_server")
 sys.path.insert(0, server_path)
 
 from model import InsuranceCostModel, get_model_parameters, set_model_parameters
-from data_loader import DataLoaderClient
+from data_loader import DataLoaderClient, rebatch_data_loaders, get_client_properties
+import client_metrics
+from profiling import get_profiler
+from tracing import get_tracer
 
 
 class FlowerClientWithAPI(fl.client.NumPyClient):
@@ -51,7 +55,9 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
         data_dir: str = "output",
         local_epochs: int = 5,
         batch_size: int = 32,
-        learning_rate: float = 0.001
+        learning_rate: float = 0.001,
+        data_source: Optional[str] = None,
+        institution_id: Optional[int] = None
     ):
         self.client_id = client_id
         self.local_epochs = local_epochs
@@ -59,7 +65,9 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
         self.learning_rate = learning_rate
         
         # Initialize data loader
-        self.data_loader = DataLoaderClient(client_id, data_dir)
+        self.data_loader = DataLoaderClient(
+            client_id, data_dir, data_source=data_source, institution_id=institution_id
+        )
         
         # Determine input size from data
         self._determine_input_size()
@@ -78,6 +86,9 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
         self.val_loader = None
         self._load_data()
         
+        # Phase timing spans are recorded under this client's name
+        get_tracer(f"client_{client_id}")
+        
         # Training status
         self.training_status = {
             "is_training": False,
@@ -88,8 +99,7 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
     
     def _determine_input_size(self):
         """Determine input size from data"""
-        df = self.data_loader.load_data()
-        features, _ = self.data_loader.preprocess_features(df)
+        features, _ = self.data_loader.load_features()
         self.input_size = features.shape[1]
     
     def _load_data(self):
@@ -116,13 +126,33 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
         """Set model parameters"""
         set_model_parameters(self.model, parameters)
     
+    def get_properties(self, config: Dict):
+        """Report hardware and dataset size for server-side workload planning"""
+        return get_client_properties(self.train_loader, self.device)
+    
+    def _set_batch_size(self, batch_size: int):
+        """Re-batch the in-memory datasets without reloading CSV files"""
+        if batch_size == self.batch_size:
+            return
+        self.batch_size = batch_size
+        self.train_loader, self.val_loader = rebatch_data_loaders(
+            self.train_loader, self.val_loader, batch_size
+        )
+        print(f"Client {self.client_id}: Batch size set to {batch_size} ({len(self.train_loader)} train batches)")
+    
     def fit(self, parameters, config: Dict):
+        """Train model on local data (profiled if requested via POST /profile)"""
+        with get_profiler(self.client_id).profile_fit(config.get("server_round", 0)):
+            return self._fit(parameters, config)
+    
+    def _fit(self, parameters, config: Dict):
         """Train model on local data"""
         from datetime import datetime
         import time
         
         self.training_status["is_training"] = True
         monitor = get_monitor(self.client_id)
+        tracer = get_tracer(f"client_{self.client_id}")
         round_num = config.get("server_round", 0)
         start_time = time.time()
         
@@ -131,15 +161,27 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
             monitor.start_training(round_num, config)
             
             # Set parameters from server
-            self.set_parameters(parameters)
+            with tracer.span("set_model_parameters", round_num, self.client_id):
+                self.set_parameters(parameters)
+            metric_labels = {"client_id": str(self.client_id)}
+            client_metrics.BYTES_RECEIVED.labels(**metric_labels).inc(client_metrics.ndarrays_nbytes(parameters))
             
             # Update learning rate if provided
             if "learning_rate" in config:
                 for param_group in self.optimizer.param_groups:
                     param_group['lr'] = config["learning_rate"]
             
+            # Update batch size if provided (re-batches in-memory data)
+            if "batch_size" in config:
+                self._set_batch_size(int(config["batch_size"]))
+            
+            # Pick up patients added or updated since the last round
+            with tracer.span("refresh_data", round_num, self.client_id):
+                self.data_loader.refresh(self.train_loader.dataset, self.val_loader.dataset)
+            
             # Update local epochs if provided
             local_epochs = int(config.get("local_epochs", self.local_epochs))
+            client_metrics.BATCH_SIZE.labels(**metric_labels).set(self.batch_size)
             
             # Train model
             self.model.train()
@@ -147,6 +189,7 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
             num_samples = 0
             
             for epoch in range(local_epochs):
+                epoch_start = time.time()
                 epoch_loss = 0.0
                 epoch_samples = 0
                 
@@ -168,14 +211,24 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
                 
                 total_loss += epoch_loss
                 num_samples = epoch_samples
+                epoch_duration = time.time() - epoch_start
+                client_metrics.EPOCH_DURATION.labels(**metric_labels).observe(epoch_duration)
+                tracer.record("train_epoch", epoch_start, epoch_duration, round_num, self.client_id,
+                              epoch=epoch, samples=epoch_samples)
             
             # Get updated parameters
-            updated_parameters = self.get_parameters(config)
+            with tracer.span("get_model_parameters", round_num, self.client_id):
+                updated_parameters = self.get_parameters(config)
             
             # Calculate average loss
             avg_loss = total_loss / (local_epochs * len(self.train_loader))
             duration = time.time() - start_time
             
+            client_metrics.FIT_DURATION.labels(**metric_labels).observe(duration)
+            client_metrics.SAMPLES_PER_SECOND.labels(**metric_labels).set(num_samples * local_epochs / max(duration, 1e-6))
+            client_metrics.TRAIN_LOSS.labels(**metric_labels).set(avg_loss)
+            client_metrics.BYTES_SENT.labels(**metric_labels).inc(client_metrics.ndarrays_nbytes(updated_parameters))
+            
             print(f"Client {self.client_id}: Training completed")
             print(f"  Average loss: {avg_loss:.4f}")
             print(f"  Samples: {num_samples}")
@@ -189,7 +242,18 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
             self.training_status["last_loss"] = avg_loss
             self.training_status["is_training"] = False
             
-            return updated_parameters, num_samples, {"loss": avg_loss, "client_id": self.client_id}
+            fit_metrics = {
+                "loss": avg_loss,
+                "client_id": self.client_id,
+                "duration_seconds": duration,
+                "local_epochs": local_epochs,
+            }
+            # Phase timings for the server-side round waterfall
+            tracer.record("fit", start_time, duration, round_num, self.client_id)
+            if tracer.enabled:
+                fit_metrics["trace"] = tracer.export_round(round_num)
+            
+            return updated_parameters, num_samples, fit_metrics
             
         except Exception as e:
             self.training_status["is_training"] = False
@@ -203,11 +267,13 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
         import time
         
         monitor = get_monitor(self.client_id)
+        tracer = get_tracer(f"client_{self.client_id}")
         round_num = config.get("server_round", 0)
         start_time = time.time()
         
         # Set parameters from server
-        self.set_parameters(parameters)
+        with tracer.span("set_model_parameters", round_num, self.client_id):
+            self.set_parameters(parameters)
         
         # Evaluate model
         self.model.eval()
@@ -237,6 +303,10 @@ class FlowerClientWithAPI(fl.client.NumPyClient):
         
         # Record metrics
         monitor.record_evaluation_metrics(round_num, avg_loss, mse, num_samples, duration)
+        tracer.record("evaluate", start_time, duration, round_num, self.client_id)
+        metric_labels = {"client_id": str(self.client_id)}
+        client_metrics.EVALUATE_DURATION.labels(**metric_labels).observe(duration)
+        client_metrics.EVAL_LOSS.labels(**metric_labels).set(mse)
         
         # Update status
         self.training_status["last_eval_loss"] = mse
@@ -318,14 +388,8 @@ def trigger_training():
         for param_group in client.optimizer.param_groups:
             param_group['lr'] = learning_rate
     
-    if batch_size != client.batch_size:
-        client.batch_size = batch_size
-        client.local_epochs = local_epochs
-        client.train_loader, client.val_loader = client.data_loader.get_data_loaders(
-            batch_size=batch_size
-        )
-    else:
-        client.local_epochs = local_epochs
+    client._set_batch_size(int(batch_size))
+    client.local_epochs = local_epochs
     
     return jsonify({
         "status": "request_received",
@@ -404,6 +468,71 @@ def monitoring_summary():
     return jsonify(monitor.get_metrics_summary())
 
 
+@http_app.route("/tracing/round/<int:round_num>", methods=["GET"])
+def tracing_waterfall(round_num):
+    """Get phase timing waterfall of a round (?format=text for a text chart)"""
+    tracer = get_tracer()
+    if request.args.get("format") == "text":
+        return Response(tracer.render_waterfall(round_num), content_type="text/plain")
+    return jsonify({"round": round_num, "spans": tracer.waterfall(round_num)})
+
+
+@http_app.route("/tracing/chrome", methods=["GET"])
+def tracing_chrome():
+    """Export spans as Chrome trace JSON (?round=N for a single round)"""
+    round_num = request.args.get("round", type=int)
+    response = jsonify(get_tracer().chrome_trace(round_num))
+    response.headers["Content-Disposition"] = "attachment; filename=trace.json"
+    return response
+
+
+@http_app.route("/profile", methods=["POST"])
+def request_profile():
+    """Profile the next fit rounds (?rounds=1&mode=torch|cprofile)"""
+    client = get_client_instance()
+    if client is None:
+        return jsonify({"error": "Client not initialized"}), 503
+    
+    try:
+        status = get_profiler(client.client_id).request(
+            rounds=request.args.get("rounds", 1, type=int),
+            mode=request.args.get("mode", "torch"),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"status": "armed", "profiler": status})
+
+
+@http_app.route("/profile", methods=["GET"])
+def list_profiles():
+    """Get profiler status and stored profiles"""
+    client = get_client_instance()
+    if client is None:
+        return jsonify({"error": "Client not initialized"}), 503
+    
+    profiler = get_profiler(client.client_id)
+    return jsonify({"profiler": profiler.get_status(), "profiles": profiler.list_profiles()})
+
+
+@http_app.route("/profile/<path:filename>", methods=["GET"])
+def download_profile(filename):
+    """Download a stored profile"""
+    client = get_client_instance()
+    if client is None:
+        return jsonify({"error": "Client not initialized"}), 503
+    
+    path = get_profiler(client.client_id).get_profile_path(filename)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, as_attachment=True)
+
+
+@http_app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
 def start_http_server(port: int = 8081):
     """Start HTTP API server in a separate thread"""
     def run_server():
@@ -419,6 +548,10 @@ def start_http_server(port: int = 8081):
     print(f"  Monitoring status: http://localhost:{port}/monitoring/status")
     print(f"  Monitoring history: http://localhost:{port}/monitoring/history")
     print(f"  Monitoring summary: http://localhost:{port}/monitoring/summary")
+    print(f"  Metrics: http://localhost:{port}/metrics")
+    print(f"  Round waterfall: http://localhost:{port}/tracing/round/<n>")
+    print(f"  Chrome trace: http://localhost:{port}/tracing/chrome")
+    print(f"  Profile next fit: POST http://localhost:{port}/profile?rounds=1&mode=torch")
 
 
 def main():
@@ -426,11 +559,15 @@ def main():
     import argparse
     
     parser = argparse.ArgumentParser(description="Flower Client with HTTP API")
-    parser.add_argument("--client-id", type=int, required=True, help="Client ID (1, 2, or 3)")
+    parser.add_argument("--client-id", type=int, default=int(os.getenv("CLIENT_ID", "1")), help="Client ID (1, 2, or 3)")
     parser.add_argument("--server-address", type=str, 
                        default=os.getenv("FLOWER_SERVER_URL", "localhost:8080").replace("http://", ""),
                        help="Flower server address")
     parser.add_argument("--data-dir", type=str, default="output", help="Directory containing CSV files")
+    parser.add_argument("--data-source", type=str, choices=["csv", "sql", "feature_store"], default=os.getenv("DATA_SOURCE", "csv"),
+                        help="Train from CSV files, the DATABASE_URL tables, or its patient_features table")
+    parser.add_argument("--institution-id", type=int, default=None,
+                        help="Institution to train on from the database (default: INSTITUTION_ID, then client ID)")
     parser.add_argument("--http-port", type=int, default=int(os.getenv("HTTP_PORT", "8081")),
                        help="HTTP API port")
     parser.add_argument("--enable-http", action="store_true", default=True,
@@ -449,7 +586,9 @@ def main():
         data_dir=args.data_dir,
         local_epochs=local_epochs,
         batch_size=batch_size,
-        learning_rate=learning_rate
+        learning_rate=learning_rate,
+        data_source=args.data_source,
+        institution_id=args.institution_id
     )
     
     print(f"Starting Flower client {args.client_id}")
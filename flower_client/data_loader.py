@@ -1,16 +1,26 @@
 """
 Data loading and preprocessing for Flower client
-Loads data from CSV files in output directory
+Loads data from CSV files in output directory, or from PostgreSQL
+(DATA_SOURCE=sql or feature_store, see sql_data_source.py)
 """
+import io
 import pandas as pd
 import numpy as np
 import torch
 from torch.utils.data import Dataset, DataLoader
 import os
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
+# Add new/updated patients to the in-memory datasets before each round
+DATA_REFRESH = os.getenv("DATA_REFRESH", "true").lower() == "true"
+
+CSV_TABLES = [
+    'patients', 'patient_physical_measurements', 'patient_lifestyle',
+    'patient_socioeconomic', 'patient_lab_results',
+]
+
 
 class PatientDataset(Dataset):
     """Dataset class for patient data"""
@@ -24,13 +34,50 @@ class PatientDataset(Dataset):
     
     def __getitem__(self, idx):
         return self.features[idx], self.targets[idx]
+    
+    def append(self, features: np.ndarray, targets: np.ndarray):
+        """Add rows at the end of the dataset"""
+        self.features = torch.cat([self.features, torch.FloatTensor(features)])
+        self.targets = torch.cat([self.targets, torch.FloatTensor(targets)])
+    
+    def update(self, positions: np.ndarray, features: np.ndarray, targets: np.ndarray):
+        """Overwrite rows in place"""
+        index = torch.as_tensor(positions, dtype=torch.long)
+        self.features[index] = torch.FloatTensor(features)
+        self.targets[index] = torch.FloatTensor(targets)
+
+
+def _read_appended_csv(path: Path, offset: int, columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, int]:
+    """Read the complete rows of a CSV file after byte ``offset``
+    
+    Returns the rows and the offset to continue from. With ``columns`` the
+    data has no header row and is an incremental read, where a partially
+    written last line is left for the next read; the initial read takes the
+    file up to EOF, so a last row without a trailing newline is kept.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = len(data) if columns is None else data.rfind(b'\n') + 1
+    if end == 0 or (columns is not None and not data[:end].strip()):
+        df = pd.DataFrame(columns=columns)
+        if 'patient_id' in df.columns:
+            df = df.astype({'patient_id': 'int64'})
+        return df, offset
+    if columns is None:
+        df = pd.read_csv(io.BytesIO(data[:end]))
+    else:
+        df = pd.read_csv(io.BytesIO(data[:end]), header=None, names=columns)
+    return df, offset + end
 
 
 class DataLoaderClient:
-    """Data loader for Flower client - loads from CSV files"""
+    """Data loader for Flower client - loads from CSV files or PostgreSQL"""
     
     def __init__(self, client_id: int, data_dir: str = "output", 
-                 start_idx: int = None, end_idx: int = None):
+                 start_idx: int = None, end_idx: int = None,
+                 data_source: Optional[str] = None, institution_id: Optional[int] = None,
+                 database_url: Optional[str] = None):
         """
         Initialize data loader
         
@@ -39,9 +86,44 @@ class DataLoaderClient:
             data_dir: Directory containing CSV files
             start_idx: Start index for data split (if None, auto-calculate)
             end_idx: End index for data split (if None, auto-calculate)
+            data_source: "csv", "sql" (joined source tables) or "feature_store"
+                (precomputed patient_features) (default: DATA_SOURCE env var)
+            institution_id: Institution whose patients are loaded from SQL
+                (default: INSTITUTION_ID env var, then client_id)
+            database_url: SQL connection string (default: DATABASE_URL env var)
         """
         self.client_id = client_id
         self.data_dir = Path(data_dir)
+        self.data_source = data_source or os.getenv("DATA_SOURCE", "csv")
+        self.institution_id = institution_id or int(os.getenv("INSTITUTION_ID", client_id))
+        self.database_url = database_url or os.getenv("DATABASE_URL")
+        self._arrays = None
+        # Patient ids of the train/validation rows, for incremental refresh
+        self._ids = None
+        self._split_ids = None
+        self.train_ratio = 0.8
+        # Fill values and region columns learned from the initial load
+        self._fill_values: Dict[str, float] = {}
+        self._region_columns = None
+        self._sql_source = None
+        # CSV read positions (bytes) and header columns per table
+        self._csv_offsets: Dict[str, int] = {}
+        self._csv_columns: Dict[str, List[str]] = {}
+        self._num_patients = 0
+        self._open_ended = False
+        # Rows of loaded patients still missing a child table row, re-merged
+        # when the missing rows are appended
+        self._incomplete: Dict[str, pd.DataFrame] = {}
+        
+        if self.data_source in ("sql", "feature_store"):
+            if not self.database_url:
+                raise ValueError(f"DATABASE_URL is required for the {self.data_source} data source")
+            # Rows are selected by institution, not by index range
+            self.start_idx = start_idx
+            self.end_idx = end_idx
+            return
+        if self.data_source != "csv":
+            raise ValueError(f"Unknown data source: {self.data_source}")
         
         # Calculate data split for this client
         # Each client gets approximately 1/3 of the data
@@ -54,6 +136,7 @@ class DataLoaderClient:
             self.start_idx = (client_id - 1) * samples_per_client
             if client_id == 3:
                 self.end_idx = total_samples  # Last client gets remaining data
+                self._open_ended = True  # ...including rows appended later
             else:
                 self.end_idx = client_id * samples_per_client
         else:
@@ -62,26 +145,41 @@ class DataLoaderClient:
     
     def load_data(self) -> pd.DataFrame:
         """Load and merge patient data from CSV files"""
-        # Load all CSV files
-        patients_df = pd.read_csv(self.data_dir / 'patients.csv')
-        physical_df = pd.read_csv(self.data_dir / 'patient_physical_measurements.csv')
-        lifestyle_df = pd.read_csv(self.data_dir / 'patient_lifestyle.csv')
-        socioeconomic_df = pd.read_csv(self.data_dir / 'patient_socioeconomic.csv')
-        lab_results_df = pd.read_csv(self.data_dir / 'patient_lab_results.csv')
-        
-        # Merge all dataframes on patient_id
-        # First, add patient_id to patients_df (it's the index + 1)
-        patients_df = patients_df.copy()
-        patients_df['patient_id'] = patients_df.index + 1
+        # Load all CSV files, remembering where each ends for refresh()
+        tables = {}
+        for name in CSV_TABLES:
+            tables[name], self._csv_offsets[name] = _read_appended_csv(self.data_dir / f'{name}.csv', 0)
+            self._csv_columns[name] = list(tables[name].columns)
+        # patient_id is the 1-based row number in patients.csv
+        tables['patients']['patient_id'] = np.arange(1, len(tables['patients']) + 1)
+        self._num_patients = len(tables['patients'])
+        self._incomplete = self._incomplete_rows(tables)
         
+        return self._merge_tables(tables, end_idx=self.end_idx)
+    
+    @staticmethod
+    def _incomplete_rows(tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        """Rows of every table for patients that have no row yet in some child table"""
+        patient_ids = tables['patients']['patient_id']
+        complete = np.ones(len(patient_ids), dtype=bool)
+        for name in CSV_TABLES[1:]:
+            complete &= patient_ids.isin(tables[name]['patient_id']).to_numpy()
+        missing = patient_ids[~complete]
+        return {name: df[df['patient_id'].isin(missing)] for name, df in tables.items()}
+    
+    def _merge_tables(self, tables: Dict[str, pd.DataFrame], end_idx: Optional[int]) -> pd.DataFrame:
+        """Join patient rows with their child tables and keep this client's range"""
         # Merge all tables
-        df = patients_df.merge(physical_df, on='patient_id', how='left')
-        df = df.merge(lifestyle_df, on='patient_id', how='left', suffixes=('', '_lifestyle'))
-        df = df.merge(socioeconomic_df, on='patient_id', how='left', suffixes=('', '_socio'))
-        df = df.merge(lab_results_df, on='patient_id', how='left', suffixes=('', '_lab'))
+        df = tables['patients'].merge(tables['patient_physical_measurements'], on='patient_id', how='left')
+        df = df.merge(tables['patient_lifestyle'], on='patient_id', how='left', suffixes=('', '_lifestyle'))
+        df = df.merge(tables['patient_socioeconomic'], on='patient_id', how='left', suffixes=('', '_socio'))
+        df = df.merge(tables['patient_lab_results'], on='patient_id', how='left', suffixes=('', '_lab'))
         
         # Filter by client's data range (based on patient_id)
-        df = df[(df['patient_id'] > self.start_idx) & (df['patient_id'] <= self.end_idx)].copy()
+        in_range = df['patient_id'] > self.start_idx
+        if end_idx is not None:
+            in_range &= df['patient_id'] <= end_idx
+        df = df[in_range].copy()
         
         # Calculate age from date_of_birth
         df['date_of_birth'] = pd.to_datetime(df['date_of_birth'])
@@ -92,10 +190,14 @@ class DataLoaderClient:
         
         return df
     
-    def preprocess_features(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Preprocess features and targets using enriched data"""
+    def preprocess_features(self, df: pd.DataFrame, fit: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """Preprocess features and targets using enriched data
+        
+        With ``fit=False`` the fill values and region columns of the last
+        fitted call are reused, so refreshed rows match the loaded ones.
+        """
         # Encode categorical features
-        df['sex_encoded'] = df['sex'].map({'male': 1.0, 'female': 0.0})
+        df['sex_encoded'] = df['sex'].map({'male': 1.0, 'female': 0.0}).fillna(0.5)
         
         # Smoking status from lifestyle
         df['smoker_encoded'] = df['smoking_status'].map({'current': 1.0, 'never': 0.0, 'former': 0.5})
@@ -103,6 +205,10 @@ class DataLoaderClient:
         
         # One-hot encode region
         region_dummies = pd.get_dummies(df['region'], prefix='region')
+        if fit or self._region_columns is None:
+            self._region_columns = list(region_dummies.columns)
+        else:
+            region_dummies = region_dummies.reindex(columns=self._region_columns, fill_value=0)
         df = pd.concat([df, region_dummies], axis=1)
         
         # Fill missing values with median
@@ -111,7 +217,9 @@ class DataLoaderClient:
                        'total_cholesterol', 'glucose', 'hba1c']
         for col in numeric_cols:
             if col in df.columns:
-                df[col] = df[col].fillna(df[col].median())
+                if fit or col not in self._fill_values:
+                    self._fill_values[col] = df[col].median()
+                df[col] = df[col].fillna(self._fill_values[col])
         
         # Normalize features
         df['age_norm'] = (df['age'] - 18) / (64 - 18)  # Normalize to 0-1
@@ -149,30 +257,138 @@ class DataLoaderClient:
             else:
                 features_list.append(np.zeros(len(df)))
         
-        features = np.column_stack(features_list)
+        features = np.column_stack(features_list).astype(np.float64)
         
         # Normalize targets (insurance_cost) - keep original scale for better training
         targets = df['insurance_cost'].values
         
         return features, targets
     
+    def load_features(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Features and targets from the configured source (loaded once)"""
+        if self._arrays is None:
+            if self.data_source in ("sql", "feature_store"):
+                from sql_data_source import FeatureStoreSource, SqlDataSource
+                source_class = FeatureStoreSource if self.data_source == "feature_store" else SqlDataSource
+                self._sql_source = source_class(self.database_url, self.institution_id)
+                self._ids, features, targets = self._sql_source.load_arrays()
+            else:
+                df = self.load_data()
+                features, targets = self.preprocess_features(df)
+                self._ids = df['patient_id'].to_numpy()
+            self._arrays = (features, targets)
+        return self._arrays
+    
+    def _load_csv_delta(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Patients appended to the CSV files since the last read
+        
+        Also returns loaded patients whose missing child rows were appended
+        (files are written patients first), so they are updated in place.
+        """
+        tables = {}
+        for name in CSV_TABLES:
+            path = self.data_dir / f'{name}.csv'
+            if path.stat().st_size < self._csv_offsets[name]:
+                print(f"Warning: {path} was truncated; restart the client to reload it")
+                return np.empty(0, dtype=np.int64), np.empty((0, 0)), np.empty(0)
+            tables[name], self._csv_offsets[name] = _read_appended_csv(
+                path, self._csv_offsets[name], self._csv_columns[name]
+            )
+        
+        first_patient_id = self._num_patients + 1
+        tables['patients']['patient_id'] = np.arange(first_patient_id, first_patient_id + len(tables['patients']))
+        self._num_patients += len(tables['patients'])
+        
+        # New patients plus earlier incomplete ones that received child rows;
+        # further child rows of complete patients are not revisited
+        touched = set(tables['patients']['patient_id'])
+        incomplete_ids = set(self._incomplete['patients']['patient_id'])
+        for name in CSV_TABLES[1:]:
+            touched.update(incomplete_ids.intersection(tables[name]['patient_id']))
+        # Empty delta frames have object columns; restore numeric dtypes after concat
+        tables = {
+            name: pd.concat([self._incomplete[name], tables[name]], ignore_index=True).infer_objects()
+            for name in CSV_TABLES
+        }
+        patient_ids = tables['patients']['patient_id']
+        for name in CSV_TABLES[1:]:
+            tables[name] = tables[name][tables[name]['patient_id'].isin(patient_ids)]
+        self._incomplete = self._incomplete_rows(tables)
+        if not touched:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0)), np.empty(0)
+        
+        tables['patients'] = tables['patients'][patient_ids.isin(touched)]
+        end_idx = None if self._open_ended else self.end_idx
+        df = self._merge_tables(tables, end_idx)
+        if len(df) == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, 0)), np.empty(0)
+        features, targets = self.preprocess_features(df, fit=False)
+        return df['patient_id'].to_numpy(), features, targets
+    
+    def refresh(self, train_dataset: PatientDataset, val_dataset: PatientDataset) -> Tuple[int, int]:
+        """Add patients that are new or updated since the last load to the datasets
+        
+        Reads only the delta: rows past the last ``updated_at`` watermark in
+        SQL, or rows appended to the CSV files. Updated patients are
+        overwritten in place; new patients are appended, split between
+        train and validation by patient id.
+        
+        Returns:
+            (added, updated) row counts
+        """
+        if not DATA_REFRESH or self._split_ids is None:
+            return 0, 0
+        
+        if self._sql_source is not None:
+            ids, features, targets = self._sql_source.load_delta()
+        else:
+            ids, features, targets = self._load_csv_delta()
+        if len(ids) == 0:
+            return 0, 0
+        
+        # Patients already loaded are updated where they are
+        pending = np.ones(len(ids), dtype=bool)
+        updated = 0
+        for split, dataset in enumerate((train_dataset, val_dataset)):
+            split_ids = self._split_ids[split]
+            if len(split_ids) == 0:
+                continue
+            order = np.argsort(split_ids, kind='stable')
+            sorted_ids = split_ids[order]
+            positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+            found = pending & (sorted_ids[positions] == ids)
+            if found.any():
+                dataset.update(order[positions[found]], features[found], targets[found])
+                pending &= ~found
+                updated += int(found.sum())
+        
+        # New patients keep the train/validation ratio
+        is_val = (ids % 100) >= round(self.train_ratio * 100)
+        for split, dataset, mask in ((0, train_dataset, pending & ~is_val), (1, val_dataset, pending & is_val)):
+            if mask.any():
+                dataset.append(features[mask], targets[mask])
+                self._split_ids[split] = np.concatenate([self._split_ids[split], ids[mask]])
+        added = int(pending.sum())
+        
+        print(f"Client {self.client_id}: Refreshed data ({added} new, {updated} updated rows; "
+              f"{len(train_dataset)} train / {len(val_dataset)} val)")
+        return added, updated
+    
     def get_data_loaders(
         self, 
         train_ratio: float = 0.8,
         batch_size: int = 32
     ) -> Tuple[DataLoader, DataLoader]:
         """Get train and validation data loaders"""
-        # Load data
-        df = self.load_data()
+        features, targets = self.load_features()
         
-        if len(df) == 0:
+        if len(features) == 0:
             raise ValueError(f"No data found for institution {self.institution_id}")
         
-        # Preprocess
-        features, targets = self.preprocess_features(df)
-        
         # Split train/validation
         n_train = int(len(features) * train_ratio)
+        self.train_ratio = train_ratio
+        self._split_ids = [self._ids[:n_train], self._ids[n_train:]]
         train_features = features[:n_train]
         train_targets = targets[:n_train]
         val_features = features[n_train:]
@@ -196,3 +412,31 @@ class DataLoaderClient:
         
         return train_loader, val_loader
 
+
+def rebatch_data_loaders(
+    train_loader: DataLoader,
+    val_loader: DataLoader,
+    batch_size: int
+) -> Tuple[DataLoader, DataLoader]:
+    """Create new data loaders with a different batch size over the same in-memory datasets"""
+    train_loader = DataLoader(
+        train_loader.dataset,
+        batch_size=batch_size,
+        shuffle=True
+    )
+    val_loader = DataLoader(
+        val_loader.dataset,
+        batch_size=batch_size,
+        shuffle=False
+    )
+    return train_loader, val_loader
+
+
+def get_client_properties(train_loader: DataLoader, device: torch.device) -> dict:
+    """Hardware and dataset properties reported to the server for workload planning"""
+    return {
+        "cpu_count": os.cpu_count() or 1,
+        "torch_threads": torch.get_num_threads(),
+        "cuda": device.type == "cuda",
+        "train_samples": len(train_loader.dataset),
+    }
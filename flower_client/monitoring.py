@@ -2,13 +2,30 @@
 Monitoring system for Flower client
 Tracks local training metrics and progress
 """
+import atexit
 import json
 import os
+import queue
+import sys
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
+from collections import deque
 import threading
 
+# History log shared with the server monitor (appended so client modules win on name clashes)
+sys.path.append(str(Path(__file__).parent.parent / "flower_server"))
+from history_log import HistoryLog
+
+# Records kept in memory for the HTTP API
+HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", "100"))
+# Records kept in training_history.jsonl after compaction
+HISTORY_RETAIN_RECORDS = int(os.getenv("HISTORY_RETAIN_RECORDS", "10000"))
+# Pending records before new ones are dropped instead of blocking training
+WRITE_QUEUE_SIZE = int(os.getenv("MONITORING_WRITE_QUEUE_SIZE", "1000"))
+# Maximum records written per append
+WRITE_BATCH_SIZE = int(os.getenv("MONITORING_WRITE_BATCH_SIZE", "50"))
+
 
 class ClientMonitor:
     """Monitor for Flower client training metrics"""
@@ -18,8 +35,10 @@ class ClientMonitor:
         self.log_dir = Path(log_dir) / f"client_{client_id}"
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
-        # Training history
-        self.training_history: List[Dict] = []
+        # Training history (ring buffer; the HTTP API reads from memory only)
+        self.training_history: deque = deque(maxlen=HISTORY_BUFFER_SIZE)
+        self.history_file = self.log_dir / "training_history.jsonl"
+        self.history_log = HistoryLog(self.history_file, HISTORY_RETAIN_RECORDS)
         self.current_training: Optional[Dict] = None
         
         # Statistics
@@ -32,34 +51,98 @@ class ClientMonitor:
         
         # Load existing history
         self._load_history()
+        
+        # Background writer: records are appended to disk off the training thread
+        self.write_queue: queue.Queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.dropped_writes = 0
+        self.closed = False
+        self.writer_thread = threading.Thread(
+            target=self._writer_loop, name=f"client-{client_id}-monitor-writer", daemon=True
+        )
+        self.writer_thread.start()
+        atexit.register(self.close)
     
     def _load_history(self):
-        """Load training history from file"""
-        history_file = self.log_dir / "training_history.json"
-        if history_file.exists():
-            try:
-                with open(history_file, 'r') as f:
-                    data = json.load(f)
-                    self.training_history = data.get("history", [])
-                    self.total_trainings = data.get("total_trainings", 0)
-                    self.total_evaluations = data.get("total_evaluations", 0)
-            except Exception as e:
-                print(f"Warning: Could not load training history: {e}")
+        """Load recent training history from the tail of the append-only log"""
+        self._migrate_legacy_history()
+        try:
+            records = self.history_log.load_tail(HISTORY_BUFFER_SIZE)
+            self.training_history.extend(records)
+            # Persisted records carry the running totals, which survive compaction
+            for record in reversed(records):
+                if "total_trainings" in record:
+                    self.total_trainings = record["total_trainings"]
+                    self.total_evaluations = record["total_evaluations"]
+                    break
+            else:
+                self.total_trainings = sum(1 for r in records if r.get("type") == "training")
+                self.total_evaluations = sum(1 for r in records if r.get("type") == "evaluation")
+        except Exception as e:
+            print(f"Warning: Could not load training history: {e}")
     
-    def _save_history(self):
-        """Save training history to file"""
-        history_file = self.log_dir / "training_history.json"
+    def _migrate_legacy_history(self):
+        """Convert training_history.json from older versions to the JSON-lines log"""
+        legacy_file = self.log_dir / "training_history.json"
+        if not legacy_file.exists() or self.history_file.exists():
+            return
+        
         try:
-            with open(history_file, 'w') as f:
-                json.dump({
-                    "client_id": self.client_id,
-                    "history": self.training_history,
-                    "total_trainings": self.total_trainings,
-                    "total_evaluations": self.total_evaluations,
-                    "last_updated": datetime.now().isoformat()
-                }, f, indent=2)
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+            with open(self.history_file, 'w') as f:
+                for record in data.get("history", []):
+                    f.write(json.dumps(record) + "\n")
+            legacy_file.rename(legacy_file.with_name("training_history.json.bak"))
         except Exception as e:
-            print(f"Warning: Could not save training history: {e}")
+            print(f"Warning: Could not migrate training history: {e}")
+    
+    def _enqueue(self, record: Dict):
+        """Queue a record for the background writer without blocking"""
+        try:
+            self.write_queue.put_nowait(json.dumps(record) + "\n")
+        except queue.Full:
+            self.dropped_writes += 1
+            if self.dropped_writes == 1 or self.dropped_writes % 100 == 0:
+                print(f"Warning: Monitoring write queue full, {self.dropped_writes} records not persisted")
+    
+    def _writer_loop(self):
+        """Append queued records to the history log in batches"""
+        while True:
+            lines = [self.write_queue.get()]
+            while len(lines) < WRITE_BATCH_SIZE:
+                try:
+                    lines.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = None in lines
+            lines = [line for line in lines if line is not None]
+            if lines:
+                try:
+                    self.history_log.append(lines)
+                except Exception as e:
+                    print(f"Warning: Could not save training history: {e}")
+            for _ in range(len(lines) + (1 if stop else 0)):
+                self.write_queue.task_done()
+            if stop:
+                return
+    
+    def flush(self):
+        """Block until all queued records are written"""
+        self.write_queue.join()
+    
+    def close(self):
+        """Flush pending records and stop the writer thread"""
+        if self.closed:
+            return
+        self.closed = True
+        # Waits for queue space: the sentinel must come after all pending records
+        try:
+            self.write_queue.put(None, timeout=10)
+        except queue.Full:
+            print("Warning: Monitoring writer did not drain, pending records lost")
+            return
+        self.writer_thread.join(timeout=10)
     
     def start_training(self, round_num: int, config: Dict):
         """Record start of training"""
@@ -97,13 +180,10 @@ class ClientMonitor:
                     "status": "completed"
                 })
                 self.current_training = None
-            
-            # Keep only last 100 records in memory
-            if len(self.training_history) > 100:
-                self.training_history = self.training_history[-100:]
-            
-            # Save to file
-            self._save_history()
+            totals = {"total_trainings": self.total_trainings, "total_evaluations": self.total_evaluations}
+        
+        # Persisted by the background writer
+        self._enqueue(dict(training_record, **totals))
     
     def record_evaluation_metrics(self, round_num: int, loss: float, mse: float, 
                                   num_samples: int, duration: float):
@@ -122,13 +202,10 @@ class ClientMonitor:
             
             self.training_history.append(eval_record)
             self.total_evaluations += 1
-            
-            # Keep only last 100 records in memory
-            if len(self.training_history) > 100:
-                self.training_history = self.training_history[-100:]
-            
-            # Save to file
-            self._save_history()
+            totals = {"total_trainings": self.total_trainings, "total_evaluations": self.total_evaluations}
+        
+        # Persisted by the background writer
+        self._enqueue(dict(eval_record, **totals))
     
     def get_current_status(self) -> Dict:
         """Get current training status"""
@@ -145,7 +222,7 @@ class ClientMonitor:
     def get_training_history(self, limit: int = 20) -> List[Dict]:
         """Get recent training history"""
         with self.lock:
-            return self.training_history[-limit:]
+            return list(self.training_history)[-limit:]
     
     def get_metrics_summary(self) -> Dict:
         """Get summary of training metrics"""
@@ -0,0 +1,159 @@
+"""
+On-demand profiling of client training
+
+``POST /profile?rounds=1&mode=torch`` on the client HTTP API arms the
+profiler; the next ``rounds`` fit calls run under ``torch.profiler`` (Chrome
+trace + operator table) or ``cProfile`` (.prof + text summary). Results are
+written to ``<MONITORING_DIR>/client_<id>/profiles`` and can be listed and
+downloaded over HTTP.
+"""
+import cProfile
+import io
+import os
+import pstats
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import torch
+
+PROFILE_MODES = ("torch", "cprofile")
+# Maximum number of rounds a single request may profile
+MAX_PROFILE_ROUNDS = int(os.getenv("MAX_PROFILE_ROUNDS", "10"))
+
+
+class ClientProfiler:
+    """Profiles the next N fit calls when requested"""
+
+    def __init__(self, client_id: int, log_dir: str = "monitoring"):
+        self.client_id = client_id
+        self.profile_dir = Path(log_dir) / f"client_{client_id}" / "profiles"
+        self.pending_rounds = 0
+        self.mode = "torch"
+        self.active = False
+        self.lock = threading.Lock()
+
+    def request(self, rounds: int = 1, mode: str = "torch") -> Dict:
+        """Arm the profiler for the next ``rounds`` fit calls"""
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', expected one of {PROFILE_MODES}")
+        if not 1 <= rounds <= MAX_PROFILE_ROUNDS:
+            raise ValueError(f"rounds must be between 1 and {MAX_PROFILE_ROUNDS}")
+
+        with self.lock:
+            self.pending_rounds = rounds
+            self.mode = mode
+        return self.get_status()
+
+    def get_status(self) -> Dict:
+        """Get profiler status"""
+        with self.lock:
+            return {
+                "client_id": self.client_id,
+                "pending_rounds": self.pending_rounds,
+                "mode": self.mode,
+                "active": self.active,
+            }
+
+    @contextmanager
+    def profile_fit(self, round_num):
+        """Profile the enclosed fit if profiling was requested"""
+        with self.lock:
+            if self.pending_rounds <= 0 or self.active:
+                enabled = False
+            else:
+                enabled = True
+                self.pending_rounds -= 1
+                self.active = True
+                mode = self.mode
+
+        if not enabled:
+            yield
+            return
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        name = f"round_{round_num}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        try:
+            if mode == "torch":
+                with self._torch_profile(name):
+                    yield
+            else:
+                with self._cprofile(name):
+                    yield
+        finally:
+            with self.lock:
+                self.active = False
+
+    @contextmanager
+    def _torch_profile(self, name: str):
+        """Run under torch.profiler and export a Chrome trace and operator table"""
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+
+        with torch.profiler.profile(activities=activities, record_shapes=True) as prof:
+            yield
+
+        try:
+            prof.export_chrome_trace(str(self.profile_dir / f"{name}_torch.json"))
+            sort_by = "cuda_time_total" if torch.cuda.is_available() else "cpu_time_total"
+            with open(self.profile_dir / f"{name}_torch.txt", "w") as f:
+                f.write(prof.key_averages().table(sort_by=sort_by, row_limit=50))
+            print(f"Client {self.client_id}: Torch profile saved to {self.profile_dir / name}_torch.json")
+        except Exception as e:
+            print(f"Warning: Could not save torch profile: {e}")
+
+    @contextmanager
+    def _cprofile(self, name: str):
+        """Run under cProfile and save stats and a text summary"""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+        try:
+            profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(50)
+            with open(self.profile_dir / f"{name}_cprofile.txt", "w") as f:
+                f.write(summary.getvalue())
+            print(f"Client {self.client_id}: cProfile saved to {self.profile_dir / name}.prof")
+        except Exception as e:
+            print(f"Warning: Could not save cProfile stats: {e}")
+
+    def list_profiles(self) -> List[Dict]:
+        """List stored profile files, newest first"""
+        if not self.profile_dir.exists():
+            return []
+        files = sorted(self.profile_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        return [
+            {
+                "filename": path.name,
+                "size_bytes": path.stat().st_size,
+                "created_at": datetime.fromtimestamp(path.stat().st_mtime).isoformat(),
+            }
+            for path in files if path.is_file()
+        ]
+
+    def get_profile_path(self, filename: str) -> Optional[Path]:
+        """Resolve a profile file name, rejecting paths outside the profile directory"""
+        path = (self.profile_dir / filename).resolve()
+        if path.parent != self.profile_dir.resolve() or not path.is_file():
+            return None
+        return path
+
+
+# Global profiler instances per client
+_profiler_instances: Dict[int, ClientProfiler] = {}
+
+
+def get_profiler(client_id: int) -> ClientProfiler:
+    """Get profiler instance for a client"""
+    if client_id not in _profiler_instances:
+        log_dir = os.getenv("MONITORING_DIR", "monitoring")
+        _profiler_instances[client_id] = ClientProfiler(client_id, log_dir)
+    return _profiler_instances[client_id]
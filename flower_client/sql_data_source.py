@@ -0,0 +1,231 @@
+"""
+PostgreSQL data source for Flower clients
+
+Streams one institution's patients joined with their physical measurements,
+lifestyle, socioeconomic (region) and latest lab results through a
+server-side cursor, in chunks, into preallocated NumPy arrays. Produces the
+same feature layout as DataLoaderClient.preprocess_features.
+
+After the initial load, load_delta() returns only patients whose rows
+changed since an ``updated_at`` watermark.
+
+FeatureStoreSource reads the same features precomputed in patient_features
+(see database_schema.sql) with a single index scan instead of the joins.
+"""
+import os
+import time
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+# Rows fetched per round trip from the server-side cursor
+SQL_CHUNK_SIZE = int(os.getenv("SQL_CHUNK_SIZE", "10000"))
+# Seconds re-read before the watermark, covering transactions that committed
+# after a snapshot but stamped rows before it (re-read rows are idempotent updates)
+DATA_REFRESH_OVERLAP = float(os.getenv("DATA_REFRESH_OVERLAP", "60"))
+
+# Fixed one-hot order so every institution produces the same input size
+REGIONS = ['northeast', 'northwest', 'southeast', 'southwest']
+
+# Raw columns streamed per patient; categoricals are encoded in SQL
+RAW_COLUMNS = [
+    'patient_id', 'age', 'sex_encoded', 'bmi', 'number_of_dependents', 'smoker_encoded',
+    'height_cm', 'weight_kg', 'systolic_bp', 'diastolic_bp', 'resting_heart_rate',
+    'total_cholesterol', 'glucose', 'activity_encoded', 'region_index', 'insurance_cost',
+]
+
+_FROM_CLAUSE = """
+    FROM patients p
+    LEFT JOIN patient_physical_measurements pm ON pm.patient_id = p.id
+    LEFT JOIN patient_lifestyle pl ON pl.patient_id = p.id
+    LEFT JOIN patient_socioeconomic ps ON ps.patient_id = p.id
+    LEFT JOIN LATERAL (
+        SELECT total_cholesterol, glucose, created_at
+        FROM patient_lab_results
+        WHERE patient_id = p.id
+        ORDER BY test_date DESC
+        LIMIT 1
+    ) lab ON TRUE
+    WHERE p.institution_id = :institution_id
+      AND p.insurance_cost IS NOT NULL
+      {delta}
+"""
+
+# Rows changed after the watermark in any joined table (GREATEST skips NULLs)
+_DELTA_FILTER = """
+      AND GREATEST(p.updated_at, pm.updated_at, pl.updated_at, ps.updated_at, lab.created_at) > :watermark
+"""
+
+_COUNT_QUERY = "SELECT COUNT(*) " + _FROM_CLAUSE
+
+_ROWS_QUERY = """
+    SELECT
+        p.id AS patient_id,
+        (CURRENT_DATE - p.date_of_birth) / 365.25 AS age,
+        CASE p.sex WHEN 'male' THEN 1.0 WHEN 'female' THEN 0.0 ELSE 0.5 END AS sex_encoded,
+        pm.bmi,
+        p.number_of_dependents,
+        CASE pl.smoking_status WHEN 'current' THEN 1.0 WHEN 'former' THEN 0.5 ELSE 0.0 END AS smoker_encoded,
+        pm.height_cm,
+        pm.weight_kg,
+        pm.systolic_bp,
+        pm.diastolic_bp,
+        pm.resting_heart_rate,
+        lab.total_cholesterol,
+        lab.glucose,
+        CASE pl.physical_activity_level
+            WHEN 'sedentary' THEN 0.0 WHEN 'light' THEN 0.25 WHEN 'moderate' THEN 0.5
+            WHEN 'active' THEN 0.75 WHEN 'very_active' THEN 1.0 ELSE 0.5
+        END AS activity_encoded,
+        CASE ps.region
+            WHEN 'northeast' THEN 0 WHEN 'northwest' THEN 1 WHEN 'southeast' THEN 2
+            WHEN 'southwest' THEN 3 ELSE -1
+        END AS region_index,
+        p.insurance_cost
+""" + _FROM_CLAUSE + """
+    ORDER BY p.id
+"""
+
+
+def build_features(
+    raw: np.ndarray, fill_values: Optional[Dict[str, float]] = None
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, float]]:
+    """Feature matrix and targets from RAW_COLUMNS, matching preprocess_features
+
+    Missing values are filled with column medians, or with ``fill_values``
+    from an earlier load so refreshed rows match the loaded ones.
+
+    Returns:
+        (features, targets, fill values used)
+    """
+    column = {name: raw[:, i] for i, name in enumerate(RAW_COLUMNS)}
+
+    # Fill missing numeric values with the column median
+    if fill_values is None:
+        fill_values = {}
+        for name in ('age', 'bmi', 'number_of_dependents', 'height_cm', 'weight_kg',
+                     'systolic_bp', 'diastolic_bp', 'resting_heart_rate', 'total_cholesterol', 'glucose'):
+            if not np.isnan(column[name]).all():
+                fill_values[name] = float(np.nanmedian(column[name]))
+    for name, value in fill_values.items():
+        values = column[name]
+        values[np.isnan(values)] = value
+
+    num_rows = len(raw)
+    features = np.empty((num_rows, 13 + len(REGIONS)), dtype=np.float64)
+    features[:, 0] = (column['age'] - 18) / (64 - 18)
+    features[:, 1] = column['sex_encoded']
+    features[:, 2] = (column['bmi'] - 15) / (50 - 15)
+    features[:, 3] = column['number_of_dependents'] / 5.0
+    features[:, 4] = column['smoker_encoded']
+    features[:, 5] = (column['height_cm'] - 140) / (210 - 140)
+    features[:, 6] = (column['weight_kg'] - 40) / (200 - 40)
+    features[:, 7] = (column['systolic_bp'] - 90) / (180 - 90)
+    features[:, 8] = (column['diastolic_bp'] - 60) / (120 - 60)
+    features[:, 9] = (column['resting_heart_rate'] - 50) / (100 - 50)
+    features[:, 10] = (column['total_cholesterol'] - 100) / (300 - 100)
+    features[:, 11] = (column['glucose'] - 70) / (120 - 70)
+    features[:, 12] = column['activity_encoded']
+
+    region_index = column['region_index'].astype(np.int64)
+    features[:, 13:] = region_index[:, None] == np.arange(len(REGIONS))
+
+    return features, column['insurance_cost'].copy(), fill_values
+
+
+class SqlDataSource:
+    """Loads one institution's training data from PostgreSQL"""
+
+    columns = RAW_COLUMNS
+    count_query = _COUNT_QUERY
+    rows_query = _ROWS_QUERY
+    delta_filter = _DELTA_FILTER
+
+    def __init__(self, database_url: str, institution_id: int, chunk_size: int = SQL_CHUNK_SIZE):
+        self.database_url = database_url
+        self.institution_id = institution_id
+        self.chunk_size = chunk_size
+        self.watermark = None
+        self.fill_values: Optional[Dict[str, float]] = None
+        self._engine = None
+
+    def _stream(self, delta: bool) -> np.ndarray:
+        """Stream all rows (or rows past the watermark) into a preallocated array"""
+        if self._engine is None:
+            self._engine = create_engine(self.database_url)
+        params = {"institution_id": self.institution_id, "watermark": self.watermark}
+        delta_filter = self.delta_filter if delta else ""
+
+        # Count and stream in one snapshot so the preallocated array fits exactly
+        with self._engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+            snapshot_time = conn.execute(text("SELECT CURRENT_TIMESTAMP")).scalar_one()
+            num_rows = conn.execute(text(self.count_query.format(delta=delta_filter)), params).scalar_one()
+            raw = np.empty((num_rows, len(self.columns)), dtype=np.float64)
+
+            result = conn.execution_options(
+                stream_results=True, max_row_buffer=self.chunk_size
+            ).execute(text(self.rows_query.format(delta=delta_filter)), params)
+            offset = 0
+            for chunk in result.partitions(self.chunk_size):
+                # NULL becomes NaN, DECIMAL becomes float
+                raw[offset:offset + len(chunk)] = np.array([tuple(row) for row in chunk], dtype=np.float64)
+                offset += len(chunk)
+
+        self.watermark = snapshot_time - timedelta(seconds=DATA_REFRESH_OVERLAP)
+        return raw
+
+    def load_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Stream the institution's rows and return (patient ids, features, targets)"""
+        start_time = time.perf_counter()
+        raw = self._stream(delta=False)
+        features, targets, self.fill_values = self._build(raw)
+
+        print(f"Institution {self.institution_id}: streamed {len(raw)} patients from the database "
+              f"in {time.perf_counter() - start_time:.2f}s")
+        return raw[:, 0].astype(np.int64), features, targets
+
+    def load_delta(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Patients changed since the last load, as (patient ids, features, targets)"""
+        if self.watermark is None:
+            return self.load_arrays()
+        raw = self._stream(delta=True)
+        features, targets, _ = self._build(raw, self.fill_values)
+        return raw[:, 0].astype(np.int64), features, targets
+
+    def _build(self, raw: np.ndarray, fill_values: Optional[Dict[str, float]] = None):
+        """(features, targets, fill values) from streamed rows"""
+        return build_features(raw, fill_values)
+
+
+# Model inputs stored in patient_features, in model order
+FEATURE_COLUMNS = [
+    'age_norm', 'sex_encoded', 'bmi_norm', 'children_norm', 'smoker_encoded',
+    'height_norm', 'weight_norm', 'bp_systolic_norm', 'bp_diastolic_norm',
+    'heart_rate_norm', 'cholesterol_norm', 'glucose_norm', 'activity_encoded',
+] + [f'region_{region}' for region in REGIONS]
+
+_FEATURE_STORE_WHERE = """
+    FROM patient_features
+    WHERE institution_id = :institution_id
+      AND insurance_cost IS NOT NULL
+      {delta}
+"""
+
+
+class FeatureStoreSource(SqlDataSource):
+    """Loads one institution's precomputed features from patient_features"""
+
+    columns = ['patient_id'] + FEATURE_COLUMNS + ['insurance_cost']
+    count_query = "SELECT COUNT(*) " + _FEATURE_STORE_WHERE
+    rows_query = (
+        "SELECT patient_id, " + ", ".join(FEATURE_COLUMNS) + ", insurance_cost "
+        + _FEATURE_STORE_WHERE + " ORDER BY patient_id"
+    )
+    # Rows rewritten by the refresh job since the last load
+    delta_filter = "AND updated_at > :watermark"
+
+    def _build(self, raw: np.ndarray, fill_values: Optional[Dict[str, float]] = None):
+        """Stored features are already encoded and complete"""
+        return raw[:, 1:-1], raw[:, -1].copy(), {}
@@ -0,0 +1,272 @@
+"""
+Buffered asynchronous aggregation (FedBuff-style) for the Flower server
+
+Clients train continuously: as soon as a client returns an update it is put
+into a buffer and the client immediately receives the latest global model.
+Every ``buffer_size`` updates the buffered deltas are averaged, weighted by
+sample count and staleness, and applied to the global model, which is then
+published as a new model version. There is no global barrier, so a slow
+institution never holds up the others.
+"""
+import concurrent.futures
+import json
+import time
+import timeit
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import flwr as fl
+from flwr.common import FitIns, FitRes, Code, parameters_to_ndarrays, ndarrays_to_parameters
+from flwr.server.client_proxy import ClientProxy
+from flwr.server.history import History
+
+from monitoring import get_monitor
+import server_metrics
+from tracing import get_tracer
+
+
+def staleness_weight(staleness: int, alpha: float = 0.5) -> float:
+    """Polynomial staleness discount: 1 / (1 + staleness) ** alpha"""
+    return 1.0 / (1.0 + staleness) ** alpha
+
+
+class BufferedAsyncServer(fl.server.Server):
+    """
+    Flower server that aggregates client updates asynchronously
+
+    ``num_rounds`` passed by ``start_server`` is interpreted as the number of
+    global model versions to publish. The strategy is used for client
+    configuration (``on_fit_config_fn``), evaluation and model saving
+    (``save_model``, see ``SaveModelStrategy``).
+    """
+
+    def __init__(
+        self,
+        *,
+        client_manager,
+        strategy,
+        buffer_size: int = 3,
+        staleness_alpha: float = 0.5,
+        max_staleness: Optional[int] = None,
+        server_learning_rate: float = 1.0,
+        min_clients: int = 1,
+        retry_backoff: float = 1.0,
+        max_retry_backoff: float = 60.0,
+    ):
+        super().__init__(client_manager=client_manager, strategy=strategy)
+        self.buffer_size = max(1, buffer_size)
+        self.staleness_alpha = staleness_alpha
+        self.max_staleness = max_staleness
+        self.server_learning_rate = server_learning_rate
+        self.min_clients = max(1, min_clients)
+        # Seconds a failed client waits before it is sent the model again,
+        # doubled on each consecutive failure up to max_retry_backoff
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+        # Current global model version and weights
+        self.model_version = 0
+        self.global_ndarrays: List[np.ndarray] = []
+        # Flower proxy cid -> client_id reported in fit metrics
+        self.client_ids: Dict[str, int] = {}
+
+    def _fit_config(self, version: int) -> Dict:
+        """Build fit config for a client starting from ``version``"""
+        config = {}
+        on_fit_config_fn = getattr(self.strategy, "on_fit_config_fn", None)
+        if on_fit_config_fn is not None:
+            config = on_fit_config_fn(version + 1)
+        config["model_version"] = version
+        return config
+
+    def _fit_client(self, client: ClientProxy, base_ndarrays, config: Dict,
+                    timeout: Optional[float], version: int) -> FitRes:
+        """Configure, encode and train one client (runs in a worker thread)"""
+        # The workload planner may query the client's properties, which must
+        # not block dispatching other clients
+        configure_client = getattr(self.strategy, "configure_client", None)
+        if configure_client is not None:
+            config = configure_client(client, config)
+        with get_tracer().span("encode_parameters", version + 1, client_id=client.cid):
+            ins = FitIns(ndarrays_to_parameters(base_ndarrays), config)
+        server_metrics.BYTES_SENT.inc(server_metrics.parameters_nbytes(ins.parameters))
+        return client.fit(ins, timeout, version)
+
+    def _submit(self, executor, client: ClientProxy, timeout: Optional[float]):
+        """Send the current global model to a client"""
+        version = self.model_version
+        base_ndarrays = self.global_ndarrays
+        config = self._fit_config(version)
+        future = executor.submit(self._fit_client, client, base_ndarrays, config, timeout, version)
+        return future, (client, version, base_ndarrays)
+
+    def _aggregate_buffer(self, buffer: List[Tuple]) -> None:
+        """Apply buffered updates to the global model"""
+        total_weight = 0.0
+        delta_sum = [np.zeros_like(layer, dtype=np.float64) for layer in self.global_ndarrays]
+
+        for _, fit_res, base_ndarrays, staleness in buffer:
+            weight = fit_res.num_examples * staleness_weight(staleness, self.staleness_alpha)
+            client_ndarrays = parameters_to_ndarrays(fit_res.parameters)
+            for i, (new, base) in enumerate(zip(client_ndarrays, base_ndarrays)):
+                delta_sum[i] += weight * (new.astype(np.float64) - base.astype(np.float64))
+            total_weight += weight
+
+        if total_weight == 0:
+            return
+
+        self.global_ndarrays = [
+            (layer + self.server_learning_rate * delta / total_weight).astype(layer.dtype)
+            for layer, delta in zip(self.global_ndarrays, delta_sum)
+        ]
+        self.parameters = ndarrays_to_parameters(self.global_ndarrays)
+
+    def fit(self, num_rounds: int, timeout: Optional[float]):
+        """Run asynchronous training until ``num_rounds`` model versions are published"""
+        history = History()
+        monitor = get_monitor()
+
+        self.parameters = self._get_initial_parameters(server_round=0, timeout=timeout)
+        self.global_ndarrays = parameters_to_ndarrays(self.parameters)
+        self.model_version = 0
+
+        print(f"[Async] Waiting for {self.min_clients} clients...")
+        self._client_manager.wait_for(self.min_clients)
+
+        start_time = timeit.default_timer()
+        buffer: List[Tuple] = []
+        busy: Dict[str, bool] = {}
+        # Consecutive failures per client and the time it may be dispatched again
+        failures: Dict[str, int] = {}
+        retry_at: Dict[str, float] = {}
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = {}
+
+        def dispatch_idle_clients():
+            clients = self._client_manager.all()
+            now = time.monotonic()
+            for cid in list(retry_at):
+                if cid not in clients or retry_at[cid] <= now:
+                    del retry_at[cid]
+            for cid, client in clients.items():
+                if not busy.get(cid) and cid not in retry_at:
+                    future, job = self._submit(executor, client, timeout)
+                    pending[future] = job
+                    busy[cid] = True
+
+        def record_failure(client, reason):
+            failures[client.cid] = failures.get(client.cid, 0) + 1
+            delay = min(self.retry_backoff * 2 ** (failures[client.cid] - 1), self.max_retry_backoff)
+            retry_at[client.cid] = time.monotonic() + delay
+            client_id = self.client_ids.get(client.cid, client.cid)
+            print(f"[Async] Client {client_id} {reason}, retrying in {delay:.1f}s")
+            server_metrics.CLIENT_UPDATES.labels(status="failed").inc()
+            monitor.record_fit_metrics(self.model_version + 1, client_id, {}, 0,
+                                       dropped=True, reason=reason)
+
+        try:
+            monitor.start_round(1, len(self._client_manager.all()))
+            dispatch_idle_clients()
+
+            while self.model_version < num_rounds and (pending or retry_at):
+                # Wake up for the next client coming out of backoff
+                wait_timeout = None
+                if retry_at:
+                    wait_timeout = max(0.0, min(retry_at.values()) - time.monotonic())
+                if not pending:
+                    time.sleep(wait_timeout)
+                    dispatch_idle_clients()
+                    continue
+                done, _ = concurrent.futures.wait(
+                    pending, timeout=wait_timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+
+                for future in done:
+                    client, base_version, base_ndarrays = pending.pop(future)
+                    busy[client.cid] = False
+
+                    if future.exception() is not None:
+                        record_failure(client, f"error: {future.exception()}")
+                        continue
+                    fit_res: FitRes = future.result()
+                    if fit_res.status.code != Code.OK:
+                        record_failure(client, f"status {fit_res.status.code.name}: {fit_res.status.message}")
+                        continue
+                    failures.pop(client.cid, None)
+                    client_id = fit_res.metrics.get("client_id", client.cid)
+                    self.client_ids[client.cid] = client_id
+
+                    server_metrics.BYTES_RECEIVED.inc(server_metrics.parameters_nbytes(fit_res.parameters))
+                    trace = fit_res.metrics.pop("trace", None)
+                    if trace:
+                        get_tracer().add_spans(json.loads(trace))
+                    staleness = self.model_version - base_version
+                    if self.max_staleness is not None and staleness > self.max_staleness:
+                        reason = f"staleness {staleness} > {self.max_staleness}"
+                        print(f"[Async] Dropping update from client {client_id} ({reason})")
+                        server_metrics.CLIENT_UPDATES.labels(status="dropped").inc()
+                        monitor.record_fit_metrics(
+                            self.model_version + 1, client_id, fit_res.metrics, fit_res.num_examples,
+                            staleness=staleness, dropped=True, reason=reason,
+                        )
+                    else:
+                        buffer.append((client, fit_res, base_ndarrays, staleness))
+                        server_metrics.CLIENT_UPDATES.labels(status="ok").inc()
+                        server_metrics.record_client_fit(client_id, fit_res.num_examples, fit_res.metrics)
+                        monitor.record_fit_metrics(
+                            self.model_version + 1, client_id, fit_res.metrics, fit_res.num_examples,
+                            staleness=staleness,
+                        )
+
+                    if len(buffer) >= self.buffer_size:
+                        self._publish(buffer, history)
+                        buffer = []
+                        if self.model_version < num_rounds:
+                            monitor.start_round(self.model_version + 1, len(self._client_manager.all()))
+
+                if self.model_version < num_rounds:
+                    dispatch_idle_clients()
+        finally:
+            # In-flight updates are discarded, but a client cannot be evaluated
+            # while its fit is still running, so wait for them (bounded by timeout)
+            executor.shutdown(wait=False, cancel_futures=True)
+            _, still_running = concurrent.futures.wait(pending, timeout=timeout)
+            if still_running:
+                print(f"[Async] {len(still_running)} client updates still running at the final evaluation")
+
+        elapsed = timeit.default_timer() - start_time
+
+        # Final distributed evaluation of the last published model
+        res_fed = self.evaluate_round(server_round=self.model_version, timeout=timeout)
+        if res_fed is not None and res_fed[0] is not None:
+            history.add_loss_distributed(server_round=self.model_version, loss=res_fed[0])
+            history.add_metrics_distributed(server_round=self.model_version, metrics=res_fed[1])
+
+        return history, elapsed
+
+    def _publish(self, buffer: List[Tuple], history: History) -> None:
+        """Aggregate the buffer and publish a new model version"""
+        monitor = get_monitor()
+        with get_tracer().span("aggregate", self.model_version + 1, num_results=len(buffer)):
+            self._aggregate_buffer(buffer)
+        self.model_version += 1
+        server_metrics.CURRENT_ROUND.set(self.model_version)
+
+        # Sample-weighted average of client-reported losses
+        total_examples = sum(fit_res.num_examples for _, fit_res, _, _ in buffer)
+        losses = [
+            (fit_res.metrics["loss"], fit_res.num_examples)
+            for _, fit_res, _, _ in buffer if "loss" in fit_res.metrics
+        ]
+        metrics = {"num_updates": len(buffer)}
+        if losses and total_examples:
+            metrics["loss"] = sum(loss * n for loss, n in losses) / sum(n for _, n in losses)
+        history.add_metrics_distributed_fit(server_round=self.model_version, metrics=metrics)
+
+        save_model = getattr(self.strategy, "save_model", None)
+        if save_model is not None:
+            with get_tracer().span("save_model", self.model_version):
+                save_model(self.model_version, self.parameters)
+
+        monitor.complete_round(self.model_version, metrics)
@@ -0,0 +1,149 @@
+"""
+Throughput-aware client selection for the Flower server
+
+Keeps an exponentially weighted estimate of each client's training
+throughput (samples/sec) and round duration, selects the clients that
+process the most samples within a round-time budget and assigns each one
+a number of local epochs so that they all finish at about the same time.
+"""
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class ClientThroughputEstimator:
+    """Exponentially weighted throughput and duration estimates per client"""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.estimates: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def update(self, cid: str, num_samples: int, local_epochs: int, duration: float):
+        """Update estimates with a client-reported training duration"""
+        if duration <= 0 or num_samples <= 0:
+            return
+        samples_per_sec = num_samples * max(1, local_epochs) / duration
+
+        with self.lock:
+            estimate = self.estimates.get(cid)
+            if estimate is None:
+                self.estimates[cid] = {
+                    "samples_per_sec": samples_per_sec,
+                    "round_duration": duration,
+                    "num_samples": num_samples,
+                    "updates": 1,
+                }
+                return
+
+            a = self.alpha
+            estimate["samples_per_sec"] = a * samples_per_sec + (1 - a) * estimate["samples_per_sec"]
+            estimate["round_duration"] = a * duration + (1 - a) * estimate["round_duration"]
+            estimate["num_samples"] = num_samples
+            estimate["updates"] += 1
+
+    def get(self, cid: str) -> Optional[Dict]:
+        """Get current estimate for a client (None if never seen)"""
+        with self.lock:
+            estimate = self.estimates.get(cid)
+            return dict(estimate) if estimate else None
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Get a copy of all estimates"""
+        with self.lock:
+            return {cid: dict(estimate) for cid, estimate in self.estimates.items()}
+
+
+class ThroughputClientSelector:
+    """Select clients and per-client local epochs from throughput estimates"""
+
+    def __init__(
+        self,
+        estimator: ClientThroughputEstimator,
+        round_time_budget: Optional[float] = None,
+        default_epochs: int = 5,
+        min_epochs: int = 1,
+        max_epochs: int = 20,
+    ):
+        """
+        Args:
+            estimator: Throughput estimates updated from fit results
+            round_time_budget: Target training time per round in seconds. If
+                None, the slowest selected client at ``default_epochs`` sets
+                the pace and faster clients get more epochs.
+            default_epochs: Epochs for clients without estimates
+            min_epochs: Lower bound for assigned epochs
+            max_epochs: Upper bound for assigned epochs
+        """
+        self.estimator = estimator
+        self.round_time_budget = round_time_budget
+        self.default_epochs = default_epochs
+        self.min_epochs = min_epochs
+        self.max_epochs = max_epochs
+
+    def _epochs_for(self, estimate: Dict, budget: float) -> int:
+        """Number of local epochs a client can complete within the budget"""
+        epoch_time = estimate["num_samples"] / estimate["samples_per_sec"]
+        epochs = int(math.floor(budget / epoch_time)) if epoch_time > 0 else self.max_epochs
+        return max(self.min_epochs, min(self.max_epochs, epochs))
+
+    def select(self, clients: Dict, max_clients: int, min_clients: int = 1) -> List[Tuple[object, int]]:
+        """
+        Select clients for a round
+
+        Clients run in parallel, so every client that can finish at least
+        ``min_epochs`` within the budget adds samples without extending the
+        round. Clients without estimates are always included so they get
+        measured.
+
+        Args:
+            clients: Available clients (cid -> ClientProxy)
+            max_clients: Maximum number of clients to select
+            min_clients: Minimum number of clients to select
+
+        Returns:
+            List of (client, local_epochs)
+        """
+        unknown = []
+        known = []
+        for cid, client in clients.items():
+            estimate = self.estimator.get(cid)
+            if estimate is None:
+                unknown.append(client)
+            else:
+                known.append((client, estimate))
+
+        budget = self.round_time_budget
+        if not budget:
+            # Pace set by the slowest known client at the default epoch count
+            budget = max(
+                (e["num_samples"] * self.default_epochs / e["samples_per_sec"] for _, e in known),
+                default=0.0,
+            )
+
+        feasible = []
+        infeasible = []
+        for client, estimate in known:
+            min_time = estimate["num_samples"] * self.min_epochs / estimate["samples_per_sec"]
+            epochs = self._epochs_for(estimate, budget) if budget else self.default_epochs
+            samples = estimate["num_samples"] * epochs
+            if not budget or min_time <= budget:
+                feasible.append((samples, client, epochs))
+            else:
+                infeasible.append((min_time, client, self.min_epochs))
+
+        selected = [(client, self.default_epochs) for client in unknown[:max_clients]]
+
+        # Most samples processed first
+        for _, client, epochs in sorted(feasible, key=lambda item: item[0], reverse=True):
+            if len(selected) >= max_clients:
+                break
+            selected.append((client, epochs))
+
+        # Fill up to the minimum with the fastest over-budget clients
+        for _, client, epochs in sorted(infeasible, key=lambda item: item[0]):
+            if len(selected) >= min_clients:
+                break
+            selected.append((client, epochs))
+
+        return selected
@@ -0,0 +1,72 @@
+"""
+Append-only JSON-lines history log shared by the server and client monitors
+
+Records are appended one line each. On startup only the tail of the file is
+read, and once the file holds twice the retained number of records it is
+rewritten with just the most recent ones, so neither the file nor startup
+time grows with the length of training.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+
+def read_tail_lines(path: Path, count: int, block_size: int = 65536) -> List[str]:
+    """Read the last ``count`` non-empty lines of a file without parsing all of it"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+    lines = [line for line in data.decode("utf-8").splitlines() if line.strip()]
+    return lines[-count:]
+
+
+class HistoryLog:
+    """JSON-lines file with tail-only loading and compaction"""
+
+    def __init__(self, path: Path, retain: int):
+        self.path = Path(path)
+        self.retain = retain
+        # Lines in the file; estimated from the tail on load, exact after compaction
+        self.num_lines = 0
+        self.lock = threading.Lock()
+
+    def load_tail(self, count: int) -> List[Dict]:
+        """Last ``count`` records, estimating the file's line count from their size"""
+        if not self.path.exists():
+            return []
+        lines = read_tail_lines(self.path, count)
+        if lines:
+            average_size = sum(len(line) + 1 for line in lines) / len(lines)
+            self.num_lines = max(len(lines), int(self.path.stat().st_size / average_size))
+        return [json.loads(line) for line in lines]
+
+    def append(self, lines: List[str]):
+        """Append serialized records (newline-terminated) and compact if due"""
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.writelines(lines)
+            self.num_lines += len(lines)
+
+            if self.num_lines > 2 * self.retain:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the log keeping only the most recent records (lock held)"""
+        try:
+            lines = read_tail_lines(self.path, self.retain)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, 'w') as f:
+                for line in lines:
+                    f.write(line + "\n")
+            os.replace(tmp_path, self.path)
+            self.num_lines = len(lines)
+        except Exception as e:
+            print(f"Warning: Could not compact {self.path}: {e}")
@@ -7,9 +7,17 @@ import os
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
-from collections import defaultdict
+from collections import defaultdict, deque
 import threading
 
+from history_log import HistoryLog
+from server_metrics import ROUND_DURATION, UPDATE_STALENESS
+
+# Completed rounds kept in memory for the API
+HISTORY_BUFFER_SIZE = int(os.getenv("HISTORY_BUFFER_SIZE", "100"))
+# Rounds kept in training_history.jsonl after compaction
+HISTORY_RETAIN_ROUNDS = int(os.getenv("HISTORY_RETAIN_ROUNDS", "10000"))
+
 
 class ServerMonitor:
     """Monitor for Flower server training metrics"""
@@ -18,8 +26,11 @@ class ServerMonitor:
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
         
-        # Training history
-        self.training_history: List[Dict] = []
+        # Training history (ring buffer of the most recent completed rounds)
+        self.training_history: deque = deque(maxlen=HISTORY_BUFFER_SIZE)
+        self.history_file = self.log_dir / "training_history.jsonl"
+        # Has its own lock, so disk I/O never blocks metric recording
+        self.history_log = HistoryLog(self.history_file, HISTORY_RETAIN_ROUNDS)
         self.current_round: Optional[int] = None
         self.round_start_time: Optional[datetime] = None
         
@@ -39,29 +50,37 @@ class ServerMonitor:
         self._load_history()
     
     def _load_history(self):
-        """Load training history from file"""
-        history_file = self.log_dir / "training_history.json"
-        if history_file.exists():
-            try:
-                with open(history_file, 'r') as f:
-                    data = json.load(f)
-                    self.training_history = data.get("history", [])
-                    self.total_rounds = data.get("total_rounds", 0)
-                    self.total_clients = data.get("total_clients", 0)
-            except Exception as e:
-                print(f"Warning: Could not load training history: {e}")
+        """Load recent training history from the tail of the append-only log"""
+        self._migrate_legacy_history()
+        try:
+            for round_info in self.history_log.load_tail(HISTORY_BUFFER_SIZE):
+                self.training_history.append(round_info)
+                self.total_rounds = max(self.total_rounds, round_info.get("round", 0))
+                self.total_clients = max(self.total_clients, round_info.get("num_clients", 0))
+        except Exception as e:
+            print(f"Warning: Could not load training history: {e}")
     
-    def _save_history(self):
-        """Save training history to file"""
-        history_file = self.log_dir / "training_history.json"
+    def _migrate_legacy_history(self):
+        """Convert training_history.json from older versions to the JSON-lines log"""
+        legacy_file = self.log_dir / "training_history.json"
+        if not legacy_file.exists() or self.history_file.exists():
+            return
+        
         try:
-            with open(history_file, 'w') as f:
-                json.dump({
-                    "history": self.training_history,
-                    "total_rounds": self.total_rounds,
-                    "total_clients": self.total_clients,
-                    "last_updated": datetime.now().isoformat()
-                }, f, indent=2)
+            with open(legacy_file, 'r') as f:
+                data = json.load(f)
+            with open(self.history_file, 'w') as f:
+                for round_info in data.get("history", []):
+                    f.write(json.dumps(round_info) + "\n")
+            legacy_file.rename(legacy_file.with_name("training_history.json.bak"))
+            print(f"[Monitor] Migrated {legacy_file} to {self.history_file}")
+        except Exception as e:
+            print(f"Warning: Could not migrate training history: {e}")
+    
+    def _append_history(self, line: str):
+        """Append a serialized completed round to the history log (O(1) per round)"""
+        try:
+            self.history_log.append([line])
         except Exception as e:
             print(f"Warning: Could not save training history: {e}")
     
@@ -83,8 +102,19 @@ class ServerMonitor:
             self.round_metrics[round_num] = round_info
             print(f"[Monitor] Round {round_num} started with {num_clients} clients")
     
-    def record_fit_metrics(self, round_num: int, client_id: int, metrics: Dict, num_samples: int):
-        """Record metrics from a client fit"""
+    def record_fit_metrics(self, round_num: int, client_id: int, metrics: Dict, num_samples: int,
+                           staleness: Optional[int] = None, dropped: bool = False,
+                           reason: Optional[str] = None):
+        """Record metrics from a client fit
+        
+        Args:
+            staleness: Global model versions published between the client
+                receiving its parameters and its update being applied
+                (asynchronous aggregation only)
+            dropped: The client was sampled but its update was not aggregated
+                (straggler past the round deadline or failure)
+            reason: Why the client was dropped
+        """
         with self.lock:
             client_metric = {
                 "round": round_num,
@@ -93,6 +123,11 @@ class ServerMonitor:
                 "metrics": metrics,
                 "timestamp": datetime.now().isoformat()
             }
+            if staleness is not None:
+                client_metric["staleness"] = staleness
+            if dropped:
+                client_metric["status"] = "dropped"
+                client_metric["reason"] = reason
             
             self.client_metrics[round_num].append(client_metric)
             
@@ -107,7 +142,7 @@ class ServerMonitor:
         with self.lock:
             # Find existing client metric for this round
             for metric in self.client_metrics[round_num]:
-                if metric["client_id"] == client_id:
+                if metric["client_id"] == client_id and metric.get("status") != "dropped":
                     metric["eval_metrics"] = metrics
                     metric["eval_samples"] = num_samples
                     break
@@ -129,19 +164,35 @@ class ServerMonitor:
                 "aggregated_metrics": aggregated_metrics or {}
             })
             
-            # Add to history
-            self.training_history.append(round_info)
-            
-            # Keep only last 100 rounds in memory
-            if len(self.training_history) > 100:
-                self.training_history = self.training_history[-100:]
+            # Clients whose updates did not make it into the aggregate
+            round_client_metrics = self.client_metrics.get(round_num, [])
+            round_info["num_dropped"] = sum(
+                1 for m in round_client_metrics if m.get("status") == "dropped"
+            )
+            round_info["num_responded"] = len(round_client_metrics) - round_info["num_dropped"]
             
-            # Save to file
-            self._save_history()
+            # Staleness distribution of the updates applied in this round
+            staleness_values = [
+                m["staleness"] for m in round_client_metrics
+                if "staleness" in m and m.get("status") != "dropped"
+            ]
+            if staleness_values:
+                round_info["staleness"] = _staleness_distribution(staleness_values)
+                for value in staleness_values:
+                    UPDATE_STALENESS.observe(value)
+            if duration is not None:
+                ROUND_DURATION.observe(duration)
             
-            print(f"[Monitor] Round {round_num} completed in {duration:.2f}s")
-            if aggregated_metrics:
-                print(f"[Monitor] Aggregated metrics: {aggregated_metrics}")
+            # Add to history (ring buffer drops the oldest round)
+            self.training_history.append(round_info)
+            line = json.dumps(round_info, default=str) + "\n"
+        
+        # Persist outside the metrics lock
+        self._append_history(line)
+        
+        print(f"[Monitor] Round {round_num} completed in {duration:.2f}s")
+        if aggregated_metrics:
+            print(f"[Monitor] Aggregated metrics: {aggregated_metrics}")
     
     def get_current_status(self) -> Dict:
         """Get current training status"""
@@ -158,7 +209,7 @@ class ServerMonitor:
     def get_round_history(self, limit: int = 10) -> List[Dict]:
         """Get recent training rounds"""
         with self.lock:
-            return self.training_history[-limit:]
+            return list(self.training_history)[-limit:]
     
     def get_round_details(self, round_num: int) -> Optional[Dict]:
         """Get detailed information about a specific round"""
@@ -184,16 +235,39 @@ class ServerMonitor:
                 if "loss" in metrics:
                     losses.append(metrics["loss"])
             
+            # Staleness distribution across asynchronous rounds
+            staleness_histogram = defaultdict(int)
+            for round_info in completed_rounds:
+                for value, count in round_info.get("staleness", {}).get("histogram", {}).items():
+                    staleness_histogram[int(value)] += count
+            
             return {
                 "total_rounds": len(completed_rounds),
                 "average_loss": sum(losses) / len(losses) if losses else None,
                 "min_loss": min(losses) if losses else None,
                 "max_loss": max(losses) if losses else None,
                 "latest_round": completed_rounds[-1]["round"] if completed_rounds else None,
-                "latest_loss": losses[-1] if losses else None
+                "latest_loss": losses[-1] if losses else None,
+                "staleness_histogram": dict(sorted(staleness_histogram.items())) or None
             }
 
 
+def _staleness_distribution(values: List[int]) -> Dict:
+    """Summarize a list of update staleness values"""
+    histogram = defaultdict(int)
+    for value in values:
+        histogram[value] += 1
+    ordered = sorted(values)
+    return {
+        "count": len(values),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": sum(values) / len(values),
+        "median": ordered[len(ordered) // 2],
+        "histogram": dict(sorted(histogram.items()))
+    }
+
+
 # Global monitor instance
 _monitor_instance: Optional[ServerMonitor] = None
 
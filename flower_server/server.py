@@ -5,11 +5,18 @@ import flwr as fl
 from flwr.server.strategy import FedAvg
 from flwr.server import ServerConfig
 import torch
+import json
 import os
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List, Optional
+from flwr.common import FitIns, parameters_to_ndarrays
 from model import InsuranceCostModel, get_model_parameters, set_model_parameters
 from monitoring import get_monitor
+from client_selection import ClientThroughputEstimator, ThroughputClientSelector
+from workload import WorkloadPlanner
+import server_metrics
+from tracing import get_tracer
 
 # Configuration
 # Use localhost instead of 0.0.0.0 on Windows to avoid binding issues
@@ -21,6 +28,32 @@ FRACTION_FIT = float(os.getenv("FRACTION_FIT", "1.0"))  # Use all clients
 FRACTION_EVALUATE = float(os.getenv("FRACTION_EVALUATE", "1.0"))  # Use all clients
 MIN_AVAILABLE_CLIENTS = int(os.getenv("MIN_AVAILABLE_CLIENTS", "3"))  # Wait for 3 clients
 
+# Aggregation mode: "sync" (FedAvg rounds) or "async" (buffered, FedBuff-style)
+AGGREGATION_MODE = os.getenv("AGGREGATION_MODE", "sync").lower()
+ASYNC_BUFFER_SIZE = int(os.getenv("ASYNC_BUFFER_SIZE", "3"))  # Publish a model every K updates
+ASYNC_STALENESS_ALPHA = float(os.getenv("ASYNC_STALENESS_ALPHA", "0.5"))
+ASYNC_MAX_STALENESS = int(os.getenv("ASYNC_MAX_STALENESS", "0")) or None  # 0 = no limit
+ASYNC_SERVER_LR = float(os.getenv("ASYNC_SERVER_LR", "1.0"))
+ASYNC_RETRY_BACKOFF = float(os.getenv("ASYNC_RETRY_BACKOFF", "1.0"))  # Seconds, doubled per consecutive failure
+ASYNC_MAX_RETRY_BACKOFF = float(os.getenv("ASYNC_MAX_RETRY_BACKOFF", "60"))
+
+# Per-round deadline in seconds (0 = wait indefinitely). Clients that have not
+# responded by then are dropped and the round aggregates whatever arrived,
+# provided at least MIN_CLIENTS results are available.
+ROUND_TIMEOUT = float(os.getenv("ROUND_TIMEOUT", "0")) or None
+
+# Client selection: "uniform" (Flower sampling) or "throughput" (EWMA throughput-aware)
+CLIENT_SELECTION = os.getenv("CLIENT_SELECTION", "uniform").lower()
+ROUND_TIME_BUDGET = float(os.getenv("ROUND_TIME_BUDGET", "0")) or None  # Seconds of training per round
+THROUGHPUT_EWMA_ALPHA = float(os.getenv("THROUGHPUT_EWMA_ALPHA", "0.3"))
+MIN_LOCAL_EPOCHS = int(os.getenv("MIN_LOCAL_EPOCHS", "1"))
+MAX_LOCAL_EPOCHS = int(os.getenv("MAX_LOCAL_EPOCHS", "20"))
+
+# Per-client batch size / local epochs from client-reported hardware and dataset size
+ADAPTIVE_WORKLOAD = os.getenv("ADAPTIVE_WORKLOAD", "false").lower() == "true"
+MIN_BATCH_SIZE = int(os.getenv("MIN_BATCH_SIZE", "16"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "512"))
+
 MODEL_DIR = Path("./models")
 MODEL_DIR.mkdir(exist_ok=True)
 
@@ -51,52 +84,210 @@ def evaluate_config(server_round: int):
 class SaveModelStrategy(FedAvg):
     """Custom strategy that saves model after aggregation"""
     
+    def __init__(self, *args, min_fit_results: int = 1, client_selector=None,
+                 workload_planner=None, model_dir: Optional[Path] = MODEL_DIR, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Directory for round checkpoints and active_model.pt (None disables saving)
+        self.model_dir = model_dir
+        # Minimum number of client results required to aggregate a round
+        self.min_fit_results = min_fit_results
+        # Optional ThroughputClientSelector replacing uniform sampling
+        self.client_selector = client_selector
+        # Optional WorkloadPlanner assigning per-client batch size / local epochs
+        self.workload_planner = workload_planner
+        # Clients sampled per round (proxy cid), used to detect stragglers
+        self.round_clients: Dict[int, List[str]] = {}
+        # Flower proxy cid -> client_id reported in fit metrics
+        self.client_ids: Dict[str, int] = {}
+    
     def configure_fit(self, server_round, parameters, client_manager):
         """Configure fit for clients"""
+        with get_tracer().span("configure_fit", server_round):
+            return self._configure_fit(server_round, parameters, client_manager)
+    
+    def _configure_fit(self, server_round, parameters, client_manager):
+        """Sample clients and build per-client fit instructions"""
         monitor = get_monitor()
         num_clients = len(client_manager.all().values())
         monitor.start_round(server_round, num_clients)
-        return super().configure_fit(server_round, parameters, client_manager)
+        if self.client_selector is None:
+            instructions = super().configure_fit(server_round, parameters, client_manager)
+        else:
+            instructions = self._configure_fit_by_throughput(server_round, parameters, client_manager)
+        
+        if self.workload_planner is not None:
+            self.workload_planner.fetch_properties([client for client, _ in instructions])
+            instructions = [
+                (client, FitIns(fit_ins.parameters, self.configure_client(client, fit_ins.config)))
+                for client, fit_ins in instructions
+            ]
+        
+        self.round_clients[server_round] = [client.cid for client, _ in instructions]
+        
+        server_metrics.CURRENT_ROUND.set(server_round)
+        server_metrics.CONNECTED_CLIENTS.set(num_clients)
+        for client, fit_ins in instructions:
+            server_metrics.BYTES_SENT.inc(server_metrics.parameters_nbytes(fit_ins.parameters))
+            if "batch_size" in fit_ins.config:
+                server_metrics.CLIENT_BATCH_SIZE.labels(
+                    client_id=str(self.client_ids.get(client.cid, client.cid))
+                ).set(fit_ins.config["batch_size"])
+        return instructions
+    
+    def configure_client(self, client, config):
+        """Apply the planned per-client workload to a fit config"""
+        if self.workload_planner is None:
+            return config
+        
+        plan = self.workload_planner.plan(client)
+        if self.client_selector is not None:
+            # Epochs measured from throughput take precedence over the static plan
+            plan.pop("local_epochs", None)
+        
+        client_config = dict(config)
+        client_config.update(plan)
+        return client_config
+    
+    def _configure_fit_by_throughput(self, server_round, parameters, client_manager):
+        """Select clients and per-client local epochs from measured throughput"""
+        sample_size, min_num_clients = self.num_fit_clients(client_manager.num_available())
+        client_manager.wait_for(min_num_clients)
+        
+        config = {}
+        if self.on_fit_config_fn is not None:
+            config = self.on_fit_config_fn(server_round)
+        
+        plan = self.client_selector.select(client_manager.all(), sample_size, min_num_clients)
+        instructions = []
+        for client, local_epochs in plan:
+            client_config = dict(config)
+            client_config["local_epochs"] = local_epochs
+            instructions.append((client, FitIns(parameters, client_config)))
+        
+        print(f"[Server] Round {server_round}: selected {len(plan)} clients, "
+              f"local epochs {[epochs for _, epochs in plan]}")
+        return instructions
+    
+    def _record_dropped_clients(self, server_round, results, failures):
+        """Record every sampled client without a usable result as dropped"""
+        monitor = get_monitor()
+        responded = {client.cid for client, _ in results}
+        
+        # Failures are either (client, FitRes) with a non-OK status or a raised
+        # exception, which usually does not say which client raised it
+        reasons = {}
+        errors = []
+        for failure in failures:
+            if isinstance(failure, BaseException):
+                client = getattr(failure, "client", None)
+                if client is not None:
+                    reasons[client.cid] = f"error: {failure}"
+                else:
+                    errors.append(failure)
+            else:
+                client, fit_res = failure
+                reasons[client.cid] = f"status {fit_res.status.code.name}: {fit_res.status.message}"
+        
+        for error in errors:
+            print(f"[Server] Round {server_round}: client error: {error!r}")
+        if errors:
+            default_reason = "error"
+        elif ROUND_TIMEOUT is not None:
+            default_reason = f"no result within {ROUND_TIMEOUT}s deadline"
+        else:
+            default_reason = "no result"
+        
+        dropped = [
+            cid for cid in self.round_clients.pop(server_round, [])
+            if cid not in responded
+        ]
+        for cid in dropped:
+            reason = reasons.get(cid, default_reason)
+            server_metrics.CLIENT_UPDATES.labels(status="dropped").inc()
+            monitor.record_fit_metrics(
+                server_round, self.client_ids.get(cid, cid), {}, 0,
+                dropped=True, reason=reason
+            )
+            print(f"[Server] Round {server_round}: dropped client {cid} ({reason})")
+        return len(dropped)
     
     def aggregate_fit(self, server_round, results, failures):
         """Aggregate model weights and save model"""
         monitor = get_monitor()
+        tracer = get_tracer()
+        
+        # Client phase timings arrive as a JSON "trace" metric
+        for _, fit_res in results:
+            trace = fit_res.metrics.pop("trace", None)
+            if trace:
+                tracer.add_spans(json.loads(trace))
         
         # Record client metrics
         for result in results:
+            server_metrics.CLIENT_UPDATES.labels(status="ok").inc()
+            server_metrics.BYTES_RECEIVED.inc(server_metrics.parameters_nbytes(result[1].parameters))
             if result[1].metrics:
                 client_id = result[1].metrics.get("client_id", 0)
                 num_samples = result[1].num_examples
                 metrics = result[1].metrics
+                self.client_ids[result[0].cid] = client_id
                 monitor.record_fit_metrics(server_round, client_id, metrics, num_samples)
+                server_metrics.record_client_fit(client_id, num_samples, metrics)
+                if self.client_selector is not None and "duration_seconds" in metrics:
+                    self.client_selector.estimator.update(
+                        result[0].cid, num_samples,
+                        int(metrics.get("local_epochs", 1)), float(metrics["duration_seconds"])
+                    )
+        
+        self._record_dropped_clients(server_round, results, failures)
         
-        # Call parent aggregation
-        aggregated_parameters, aggregated_metrics = super().aggregate_fit(
-            server_round, results, failures
-        )
+        if len(results) < self.min_fit_results:
+            # Keep the previous global model; Flower only replaces it on non-None parameters
+            print(f"[Server] Round {server_round}: only {len(results)} of "
+                  f"{self.min_fit_results} required results arrived, skipping aggregation")
+            monitor.complete_round(server_round, {})
+            return None, {}
+        
+        # Call parent aggregation (decode, weighted average, encode)
+        with tracer.span("aggregate", server_round, num_results=len(results)):
+            aggregated_parameters, aggregated_metrics = super().aggregate_fit(
+                server_round, results, failures
+            )
         
         if aggregated_parameters is not None:
-            # Save aggregated model
-            # Determine input size (17 features: 13 base + 4 regions)
-            model = InsuranceCostModel(input_size=17)
-            set_model_parameters(model, aggregated_parameters)
-            
-            # Save model checkpoint
-            model_path = MODEL_DIR / f"model_round_{server_round}.pt"
-            torch.save(model.state_dict(), model_path)
-            
-            # Save as active model
-            active_model_path = MODEL_DIR / "active_model.pt"
-            torch.save(model.state_dict(), active_model_path)
-            
-            print(f"Model saved: {model_path}")
-            print(f"Active model updated: {active_model_path}")
+            with tracer.span("save_model", server_round):
+                self.save_model(server_round, aggregated_parameters)
         
         # Record completion
         monitor.complete_round(server_round, aggregated_metrics)
         
         return aggregated_parameters, aggregated_metrics
     
+    def save_model(self, server_round, parameters):
+        """Save aggregated parameters as round checkpoint and active model"""
+        if self.model_dir is None:
+            return
+        tracer = get_tracer()
+        # Determine input size (17 features: 13 base + 4 regions)
+        model = InsuranceCostModel(input_size=17)
+        with tracer.span("decode_parameters", server_round):
+            ndarrays = parameters_to_ndarrays(parameters)
+        with tracer.span("set_model_parameters", server_round):
+            set_model_parameters(model, ndarrays)
+        
+        # Save model checkpoint
+        model_path = self.model_dir / f"model_round_{server_round}.pt"
+        with tracer.span("torch.save", server_round, path=str(model_path)):
+            torch.save(model.state_dict(), model_path)
+        
+        # Save as active model
+        active_model_path = self.model_dir / "active_model.pt"
+        with tracer.span("torch.save", server_round, path=str(active_model_path)):
+            torch.save(model.state_dict(), active_model_path)
+        
+        print(f"Model saved: {model_path}")
+        print(f"Active model updated: {active_model_path}")
+    
     def aggregate_evaluate(self, server_round, results, failures):
         """Aggregate evaluation results"""
         monitor = get_monitor()
@@ -109,7 +300,58 @@ class SaveModelStrategy(FedAvg):
                 metrics = result[1].metrics
                 monitor.record_eval_metrics(server_round, client_id, metrics, num_samples)
         
-        return super().aggregate_evaluate(server_round, results, failures)
+        with get_tracer().span("aggregate_evaluate", server_round, num_results=len(results)):
+            return super().aggregate_evaluate(server_round, results, failures)
+
+
+def create_client_selector():
+    """Create the client selector for the configured selection mode"""
+    if CLIENT_SELECTION != "throughput":
+        return None
+    
+    return ThroughputClientSelector(
+        ClientThroughputEstimator(alpha=THROUGHPUT_EWMA_ALPHA),
+        round_time_budget=ROUND_TIME_BUDGET,
+        default_epochs=int(os.getenv("LOCAL_EPOCHS", "5")),
+        min_epochs=MIN_LOCAL_EPOCHS,
+        max_epochs=MAX_LOCAL_EPOCHS,
+    )
+
+
+def create_workload_planner():
+    """Create the workload planner if adaptive workloads are enabled"""
+    if not ADAPTIVE_WORKLOAD:
+        return None
+    
+    return WorkloadPlanner(
+        base_batch_size=int(os.getenv("BATCH_SIZE", "32")),
+        base_epochs=int(os.getenv("LOCAL_EPOCHS", "5")),
+        min_batch_size=MIN_BATCH_SIZE,
+        max_batch_size=MAX_BATCH_SIZE,
+        min_epochs=MIN_LOCAL_EPOCHS,
+        max_epochs=MAX_LOCAL_EPOCHS,
+    )
+
+
+def create_server(strategy):
+    """Create the Flower server for the configured aggregation mode"""
+    if AGGREGATION_MODE != "async":
+        return None
+    
+    from flwr.server.client_manager import SimpleClientManager
+    from async_aggregation import BufferedAsyncServer
+    
+    return BufferedAsyncServer(
+        client_manager=SimpleClientManager(),
+        strategy=strategy,
+        buffer_size=ASYNC_BUFFER_SIZE,
+        staleness_alpha=ASYNC_STALENESS_ALPHA,
+        max_staleness=ASYNC_MAX_STALENESS,
+        server_learning_rate=ASYNC_SERVER_LR,
+        min_clients=MIN_CLIENTS,
+        retry_backoff=ASYNC_RETRY_BACKOFF,
+        max_retry_backoff=ASYNC_MAX_RETRY_BACKOFF,
+    )
 
 
 def main():
@@ -120,6 +362,12 @@ def main():
     print(f"  - Rounds: {NUM_ROUNDS}")
     print(f"  - Min clients: {MIN_CLIENTS}")
     print(f"  - Fraction fit: {FRACTION_FIT}")
+    print(f"  - Aggregation mode: {AGGREGATION_MODE}")
+    print(f"  - Round timeout (s): {ROUND_TIMEOUT or 'none'}")
+    print(f"  - Client selection: {CLIENT_SELECTION}")
+    print(f"  - Adaptive workload: {ADAPTIVE_WORKLOAD}")
+    if AGGREGATION_MODE == "async":
+        print(f"  - Async buffer size: {ASYNC_BUFFER_SIZE}")
     
     # Create strategy
     strategy = SaveModelStrategy(
@@ -131,14 +379,18 @@ def main():
         initial_parameters=fl.common.ndarrays_to_parameters(get_initial_parameters()),
         on_fit_config_fn=fit_config,
         on_evaluate_config_fn=evaluate_config,
+        min_fit_results=MIN_CLIENTS,
+        client_selector=create_client_selector(),
+        workload_planner=create_workload_planner(),
     )
     
     # Create server config
-    config = ServerConfig(num_rounds=NUM_ROUNDS)
+    config = ServerConfig(num_rounds=NUM_ROUNDS, round_timeout=ROUND_TIMEOUT)
     
     # Start server
     fl.server.start_server(
         server_address=f"{SERVER_ADDRESS}:{SERVER_PORT}",
+        server=create_server(strategy),
         config=config,
         strategy=strategy,
     )
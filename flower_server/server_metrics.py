@@ -0,0 +1,53 @@
+"""
+Prometheus metrics for the Flower server
+
+Exposed on ``/metrics`` of the monitoring HTTP API (server_with_monitoring.py).
+Per-client series are prefixed ``flower_server_client_`` so they do not clash
+with the clients' own ``flower_client_`` metrics when both are scraped.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+ROUND_DURATION = Histogram(
+    "flower_round_duration_seconds", "Duration of a training round",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+CURRENT_ROUND = Gauge("flower_current_round", "Current training round / model version")
+CONNECTED_CLIENTS = Gauge("flower_connected_clients", "Clients connected to the server")
+CLIENT_UPDATES = Counter(
+    "flower_server_client_updates_total", "Client fit results by outcome", ["status"]
+)
+BYTES_SENT = Counter(
+    "flower_bytes_sent_total", "Serialized model parameter bytes sent to clients"
+)
+BYTES_RECEIVED = Counter(
+    "flower_bytes_received_total", "Serialized model parameter bytes received from clients"
+)
+CLIENT_SAMPLES_PER_SECOND = Gauge(
+    "flower_server_client_samples_per_second", "Training throughput reported by a client", ["client_id"]
+)
+CLIENT_BATCH_SIZE = Gauge(
+    "flower_server_client_batch_size", "Batch size the server configured for a client", ["client_id"]
+)
+CLIENT_LOCAL_EPOCHS = Gauge(
+    "flower_server_client_local_epochs", "Local epochs the server configured for a client", ["client_id"]
+)
+UPDATE_STALENESS = Histogram(
+    "flower_update_staleness", "Staleness of aggregated updates (async mode)",
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21),
+)
+
+
+def parameters_nbytes(parameters) -> int:
+    """Size of serialized Flower parameters in bytes"""
+    return sum(len(tensor) for tensor in parameters.tensors)
+
+
+def record_client_fit(client_id, num_samples: int, metrics) -> None:
+    """Record throughput and workload reported in a client's fit metrics"""
+    client_id = str(client_id)
+    duration = metrics.get("duration_seconds")
+    if duration:
+        epochs = int(metrics.get("local_epochs", 1))
+        CLIENT_SAMPLES_PER_SECOND.labels(client_id=client_id).set(num_samples * epochs / duration)
+    if "local_epochs" in metrics:
+        CLIENT_LOCAL_EPOCHS.labels(client_id=client_id).set(metrics["local_epochs"])
@@ -9,12 +9,17 @@ import os
 from pathlib import Path
 from datetime import datetime
 import threading
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from model import InsuranceCostModel, get_model_parameters, set_model_parameters
-from server import SaveModelStrategy, fit_config, evaluate_config, get_initial_parameters
+from server import (
+    SaveModelStrategy, fit_config, evaluate_config, get_initial_parameters, create_server,
+    create_client_selector, create_workload_planner, ROUND_TIMEOUT,
+)
 from monitoring import get_monitor
+from tracing import get_tracer
 
 # Configuration
 # Use localhost instead of 0.0.0.0 on Windows to avoid binding issues
@@ -76,6 +81,30 @@ def monitoring_summary():
     return jsonify(monitor.get_metrics_summary())
 
 
+@http_app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
+
+@http_app.route("/tracing/round/<int:round_num>", methods=["GET"])
+def tracing_waterfall(round_num):
+    """Get phase timing waterfall of a round (?format=text for a text chart)"""
+    tracer = get_tracer()
+    if request.args.get("format") == "text":
+        return Response(tracer.render_waterfall(round_num), content_type="text/plain")
+    return jsonify({"round": round_num, "spans": tracer.waterfall(round_num)})
+
+
+@http_app.route("/tracing/chrome", methods=["GET"])
+def tracing_chrome():
+    """Export spans as Chrome trace JSON (?round=N for a single round)"""
+    round_num = request.args.get("round", type=int)
+    response = jsonify(get_tracer().chrome_trace(round_num))
+    response.headers["Content-Disposition"] = "attachment; filename=trace.json"
+    return response
+
+
 def start_http_server(port: int = 8082):
     """Start HTTP API server in a separate thread"""
     def run_server():
@@ -87,6 +116,9 @@ def start_http_server(port: int = 8082):
     print(f"  Status: http://localhost:{port}/monitoring/status")
     print(f"  History: http://localhost:{port}/monitoring/history")
     print(f"  Summary: http://localhost:{port}/monitoring/summary")
+    print(f"  Metrics: http://localhost:{port}/metrics")
+    print(f"  Round waterfall: http://localhost:{port}/tracing/round/<n>")
+    print(f"  Chrome trace: http://localhost:{port}/tracing/chrome")
 
 
 def main():
@@ -112,14 +144,18 @@ def main():
         initial_parameters=fl.common.ndarrays_to_parameters(get_initial_parameters()),
         on_fit_config_fn=fit_config,
         on_evaluate_config_fn=evaluate_config,
+        min_fit_results=MIN_CLIENTS,
+        client_selector=create_client_selector(),
+        workload_planner=create_workload_planner(),
     )
     
     # Create server config
-    config = ServerConfig(num_rounds=NUM_ROUNDS)
+    config = ServerConfig(num_rounds=NUM_ROUNDS, round_timeout=ROUND_TIMEOUT)
     
     # Start server
     fl.server.start_server(
         server_address=f"{SERVER_ADDRESS}:{SERVER_PORT}",
+        server=create_server(strategy),
         config=config,
         strategy=strategy,
     )
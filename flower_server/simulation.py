@@ -0,0 +1,375 @@
+"""
+In-process federated learning simulation
+
+Runs N virtual clients inside one process instead of one OS process and
+gRPC connection per client. The real ``fl.server.Server``,
+``SaveModelStrategy`` and ``InsuranceCostModel`` are used; only the client
+side is replaced by ``VirtualClientProxy``, which sends the training work to
+a shared thread or process pool.
+
+The dataset is preprocessed once with ``DataLoaderClient`` and stored as
+``.npy`` files, rebuilt when the source CSVs change size or modification
+time. Workers open them with ``mmap_mode='r'`` so all processes share the
+same pages, and each virtual client trains on a contiguous shard split into
+train/validation rows with a seeded shuffle.
+
+Models are only saved when ``--model-dir`` is given, so a simulation never
+replaces the ``active_model.pt`` served by the backend.
+
+Usage:
+    python simulation.py --num-clients 100 --num-rounds 5 --executor process
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+import flwr as fl
+from flwr.common import (
+    Code, Status, FitRes, EvaluateRes, GetPropertiesRes, GetParametersRes,
+    DisconnectRes, ndarrays_to_parameters, parameters_to_ndarrays,
+)
+from flwr.server.client_manager import SimpleClientManager
+from flwr.server.client_proxy import ClientProxy
+
+from model import InsuranceCostModel, get_model_parameters, set_model_parameters
+
+# Client data loading lives in flower_client (appended so server modules win on name clashes)
+sys.path.append(str(Path(__file__).parent.parent / "flower_client"))
+
+
+# Per-process worker state (memory-mapped data)
+_worker_state: Dict = {}
+# Reusable model per worker thread
+_thread_local = threading.local()
+
+
+def prepare_dataset(data_dir: str, cache_dir: str) -> Tuple[str, str, int]:
+    """
+    Preprocess the full dataset once and store it as .npy files
+
+    Returns:
+        (features_path, targets_path, num_samples)
+    """
+    from data_loader import DataLoaderClient, CSV_TABLES
+
+    cache = Path(cache_dir)
+    cache.mkdir(parents=True, exist_ok=True)
+    features_path = cache / "features.npy"
+    targets_path = cache / "targets.npy"
+    source_path = cache / "source.json"
+
+    # Size and modification time of every source CSV the cache was built from
+    source = {}
+    for name in CSV_TABLES:
+        path = Path(data_dir) / f"{name}.csv"
+        if path.exists():
+            stat = path.stat()
+            source[name] = [stat.st_size, stat.st_mtime_ns]
+
+    cached_source = None
+    if features_path.exists() and targets_path.exists() and source_path.exists():
+        cached_source = json.loads(source_path.read_text())
+
+    if cached_source != source:
+        print(f"[Simulation] Preprocessing data from {data_dir}...")
+        loader = DataLoaderClient(client_id=1, data_dir=data_dir, start_idx=0, end_idx=sys.maxsize)
+        df = loader.load_data()
+        features, targets = loader.preprocess_features(df)
+        np.save(features_path, features.astype(np.float32))
+        np.save(targets_path, targets.astype(np.float32))
+        # Written last, so an interrupted run is rebuilt next time
+        source_path.write_text(json.dumps(source))
+
+    num_samples = len(np.load(targets_path, mmap_mode="r"))
+    return str(features_path), str(targets_path), num_samples
+
+
+def shard_bounds(num_samples: int, num_clients: int) -> List[Tuple[int, int]]:
+    """Contiguous (start, end) row ranges, one per client"""
+    edges = np.linspace(0, num_samples, num_clients + 1).astype(int)
+    return [(int(edges[i]), int(edges[i + 1])) for i in range(num_clients)]
+
+
+def _init_worker(features_path: str, targets_path: str, num_threads: int):
+    """Open memory-mapped data once per worker process"""
+    torch.set_num_threads(num_threads)
+    _worker_state["features"] = np.load(features_path, mmap_mode="r")
+    _worker_state["targets"] = np.load(targets_path, mmap_mode="r")
+
+
+def _worker_model(input_size: int) -> nn.Module:
+    """Reusable model instance of the worker thread"""
+    model = getattr(_thread_local, "model", None)
+    if model is None:
+        model = InsuranceCostModel(input_size=input_size)
+        _thread_local.model = model
+    return model
+
+
+def _shard_tensors(shard: Tuple[int, int], train_ratio: float, train: bool, seed: int):
+    """Train or validation split of a shard as tensors"""
+    start, end = shard
+    # Same seed and shard give the same split in every worker and round
+    rows = start + np.random.default_rng([seed, start]).permutation(end - start)
+    n_train = int((end - start) * train_ratio)
+    rows = np.sort(rows[:n_train] if train else rows[n_train:])
+    features = torch.from_numpy(_worker_state["features"][rows])
+    targets = torch.from_numpy(_worker_state["targets"][rows])
+    return features, targets
+
+
+def _fit_worker(client_id: int, shard: Tuple[int, int], parameters: List[np.ndarray],
+                config: Dict, train_ratio: float, seed: int):
+    """Train one virtual client on its shard"""
+    start_time = time.time()
+    features, targets = _shard_tensors(shard, train_ratio, train=True, seed=seed)
+    model = _worker_model(features.shape[1])
+    set_model_parameters(model, parameters)
+
+    local_epochs = int(config.get("local_epochs", 5))
+    batch_size = int(config.get("batch_size", 32))
+    optimizer = torch.optim.Adam(model.parameters(), lr=float(config.get("learning_rate", 0.001)))
+    criterion = nn.MSELoss()
+    loader = DataLoader(TensorDataset(features, targets), batch_size=batch_size, shuffle=True)
+
+    model.train()
+    total_loss = 0.0
+    for _ in range(local_epochs):
+        for batch_features, batch_targets in loader:
+            optimizer.zero_grad()
+            loss = criterion(model(batch_features), batch_targets.unsqueeze(1))
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+
+    avg_loss = total_loss / max(1, local_epochs * len(loader))
+    metrics = {
+        "loss": avg_loss,
+        "client_id": client_id,
+        "duration_seconds": time.time() - start_time,
+        "local_epochs": local_epochs,
+    }
+    return get_model_parameters(model), len(features), metrics
+
+
+def _evaluate_worker(shard: Tuple[int, int], parameters: List[np.ndarray], train_ratio: float, seed: int):
+    """Evaluate one virtual client on its validation split"""
+    features, targets = _shard_tensors(shard, train_ratio, train=False, seed=seed)
+    if len(features) == 0:
+        return 0.0, 0
+    model = _worker_model(features.shape[1])
+    set_model_parameters(model, parameters)
+
+    model.eval()
+    with torch.no_grad():
+        loss = nn.MSELoss()(model(features), targets.unsqueeze(1)).item()
+    return loss, len(features)
+
+
+class VirtualClientProxy(ClientProxy):
+    """Client proxy that runs training in a local executor instead of over gRPC"""
+
+    def __init__(self, cid: str, client_id: int, shard: Tuple[int, int], executor,
+                 train_ratio: float = 0.8, seed: int = 42):
+        super().__init__(cid)
+        self.client_id = client_id
+        self.shard = shard
+        self.executor = executor
+        self.train_ratio = train_ratio
+        self.seed = seed
+
+    def get_properties(self, ins, timeout: Optional[float], group_id: Optional[int]) -> GetPropertiesRes:
+        """Report shard size (virtual clients share the host hardware)"""
+        start, end = self.shard
+        properties = {
+            "cpu_count": 1,
+            "torch_threads": 1,
+            "cuda": False,
+            "train_samples": int((end - start) * self.train_ratio),
+        }
+        return GetPropertiesRes(status=Status(code=Code.OK, message="Success"), properties=properties)
+
+    def get_parameters(self, ins, timeout: Optional[float], group_id: Optional[int]) -> GetParametersRes:
+        """Virtual clients do not provide initial parameters"""
+        return GetParametersRes(
+            status=Status(code=Code.GET_PARAMETERS_NOT_IMPLEMENTED, message="Not implemented"),
+            parameters=ndarrays_to_parameters([]),
+        )
+
+    def fit(self, ins, timeout: Optional[float], group_id: Optional[int]) -> FitRes:
+        """Train on the client's shard"""
+        future = self.executor.submit(
+            _fit_worker, self.client_id, self.shard,
+            parameters_to_ndarrays(ins.parameters), dict(ins.config), self.train_ratio, self.seed,
+        )
+        ndarrays, num_examples, metrics = future.result(timeout=timeout)
+        return FitRes(
+            status=Status(code=Code.OK, message="Success"),
+            parameters=ndarrays_to_parameters(ndarrays),
+            num_examples=num_examples,
+            metrics=metrics,
+        )
+
+    def evaluate(self, ins, timeout: Optional[float], group_id: Optional[int]) -> EvaluateRes:
+        """Evaluate on the client's validation split"""
+        future = self.executor.submit(
+            _evaluate_worker, self.shard, parameters_to_ndarrays(ins.parameters), self.train_ratio, self.seed,
+        )
+        loss, num_examples = future.result(timeout=timeout)
+        return EvaluateRes(
+            status=Status(code=Code.OK, message="Success"),
+            loss=float(loss),
+            num_examples=num_examples,
+            metrics={"mse": float(loss), "client_id": self.client_id},
+        )
+
+    def reconnect(self, ins, timeout: Optional[float], group_id: Optional[int]) -> DisconnectRes:
+        """Nothing to disconnect"""
+        return DisconnectRes(reason="")
+
+
+def create_executor(kind: str, max_workers: int, features_path: str, targets_path: str):
+    """Create the thread or process pool that runs client work"""
+    if kind == "process":
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(features_path, targets_path, 1),
+        )
+
+    # Threads share this process' state; one torch thread each avoids oversubscription
+    _init_worker(features_path, targets_path, 1)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+
+def run_simulation(
+    num_clients: int = 3,
+    num_rounds: int = 5,
+    data_dir: str = "output",
+    cache_dir: Optional[str] = None,
+    executor_kind: str = "process",
+    max_workers: Optional[int] = None,
+    fraction_fit: float = 1.0,
+    fraction_evaluate: float = 1.0,
+    fit_config_overrides: Optional[Dict] = None,
+    model_dir: Optional[str] = None,
+    seed: int = 42,
+):
+    """
+    Run a federated training simulation with virtual clients
+
+    Checkpoints are saved to ``model_dir`` if given (never by default, so the
+    backend's active model is left alone). ``seed`` fixes the per-shard
+    train/validation split.
+
+    Returns:
+        (History, elapsed_seconds)
+    """
+    from server import SaveModelStrategy, fit_config, evaluate_config
+
+    cache_dir = cache_dir or str(Path(data_dir) / ".simulation_cache")
+    features_path, targets_path, num_samples = prepare_dataset(data_dir, cache_dir)
+    input_size = np.load(features_path, mmap_mode="r").shape[1]
+    max_workers = max_workers or min(num_clients, os.cpu_count() or 1)
+    if model_dir:
+        Path(model_dir).mkdir(parents=True, exist_ok=True)
+
+    print(f"[Simulation] {num_clients} virtual clients, {num_samples} samples, "
+          f"{max_workers} {executor_kind} workers")
+
+    def simulation_fit_config(server_round: int):
+        config = fit_config(server_round)
+        config.update(fit_config_overrides or {})
+        return config
+
+    min_clients = max(1, int(num_clients * min(fraction_fit, fraction_evaluate)))
+    strategy = SaveModelStrategy(
+        fraction_fit=fraction_fit,
+        fraction_evaluate=fraction_evaluate,
+        min_fit_clients=min_clients,
+        min_evaluate_clients=min_clients,
+        min_available_clients=num_clients,
+        initial_parameters=ndarrays_to_parameters(
+            get_model_parameters(InsuranceCostModel(input_size=input_size))
+        ),
+        on_fit_config_fn=simulation_fit_config,
+        on_evaluate_config_fn=evaluate_config,
+        min_fit_results=min_clients,
+        model_dir=Path(model_dir) if model_dir else None,
+    )
+
+    client_manager = SimpleClientManager()
+    server = fl.server.Server(client_manager=client_manager, strategy=strategy)
+    # Every virtual client needs its own dispatch thread; the pool bounds actual work
+    server.set_max_workers(num_clients)
+
+    executor = create_executor(executor_kind, max_workers, features_path, targets_path)
+    try:
+        for i, shard in enumerate(shard_bounds(num_samples, num_clients)):
+            client_manager.register(VirtualClientProxy(str(i + 1), i + 1, shard, executor, seed=seed))
+        history, elapsed = server.fit(num_rounds=num_rounds, timeout=None)
+    finally:
+        executor.shutdown(wait=True)
+
+    print(f"[Simulation] Completed {num_rounds} rounds in {elapsed:.2f}s")
+    return history, elapsed
+
+
+def main():
+    """Run simulation from the command line"""
+    parser = argparse.ArgumentParser(description="In-process federated learning simulation")
+    parser.add_argument("--num-clients", type=int, default=int(os.getenv("NUM_CLIENTS", "3")))
+    parser.add_argument("--num-rounds", type=int, default=int(os.getenv("NUM_ROUNDS", "5")))
+    parser.add_argument("--data-dir", type=str, default=os.getenv("DATA_DIR", "output"))
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Directory for preprocessed .npy files (default: <data-dir>/.simulation_cache)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--fraction-fit", type=float, default=1.0)
+    parser.add_argument("--fraction-evaluate", type=float, default=1.0)
+    parser.add_argument("--local-epochs", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--learning-rate", type=float, default=None)
+    parser.add_argument("--model-dir", type=str, default=None,
+                        help="Save round checkpoints here (default: do not save)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for the per-shard train/validation split")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.local_epochs is not None:
+        overrides["local_epochs"] = args.local_epochs
+    if args.batch_size is not None:
+        overrides["batch_size"] = args.batch_size
+    if args.learning_rate is not None:
+        overrides["learning_rate"] = args.learning_rate
+
+    history, _ = run_simulation(
+        num_clients=args.num_clients,
+        num_rounds=args.num_rounds,
+        data_dir=args.data_dir,
+        cache_dir=args.cache_dir,
+        executor_kind=args.executor,
+        max_workers=args.max_workers,
+        fraction_fit=args.fraction_fit,
+        fraction_evaluate=args.fraction_evaluate,
+        fit_config_overrides=overrides,
+        model_dir=args.model_dir,
+        seed=args.seed,
+    )
+
+    for server_round, loss in history.losses_distributed:
+        print(f"  Round {server_round}: distributed loss {loss:.4f}")
+
+
+if __name__ == "__main__":
+    main()
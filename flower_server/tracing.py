@@ -0,0 +1,167 @@
+"""
+Phase timing and tracing for federated rounds
+
+Records spans (name, start, duration) per round and per client around the
+phases of a round: configure_fit, parameter decode/encode, setting model
+parameters, per-epoch training, aggregation, checkpointing. Spans can be
+viewed as a per-round waterfall or exported as Chrome trace JSON
+(chrome://tracing, https://ui.perfetto.dev).
+
+Shared by the server and the clients (clients import it from the server
+directory like model.py). Clients send their spans for a round to the
+server in the ``trace`` fit metric, so the server waterfall covers both.
+Client timestamps use the client's wall clock.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "10000"))
+
+
+class Tracer:
+    """Collects timed spans in a bounded in-memory buffer"""
+
+    def __init__(self, process_name: str, max_spans: int = TRACE_MAX_SPANS, enabled: bool = TRACING_ENABLED):
+        self.process_name = process_name
+        self.enabled = enabled
+        self.spans: deque = deque(maxlen=max_spans)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, round_num: Optional[int] = None, client_id=None, **args):
+        """Time the enclosed block as a span"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.time() - start, round_num, client_id, **args)
+
+    def record(self, name: str, start: float, duration: float, round_num: Optional[int] = None,
+               client_id=None, **args):
+        """Record a span measured by the caller"""
+        if not self.enabled:
+            return
+        self.add_span({
+            "name": name,
+            "process": self.process_name,
+            "thread": threading.current_thread().name,
+            "round": round_num,
+            "client_id": client_id,
+            "start": start,
+            "duration": duration,
+            "args": args,
+        })
+
+    def add_span(self, span: Dict):
+        """Add a finished span"""
+        with self.lock:
+            self.spans.append(span)
+
+    def add_spans(self, spans: List[Dict]):
+        """Add spans recorded elsewhere (e.g. reported by a client)"""
+        with self.lock:
+            self.spans.extend(spans)
+
+    def get_spans(self, round_num: Optional[int] = None, client_id=None) -> List[Dict]:
+        """Get spans, optionally filtered by round and client"""
+        with self.lock:
+            spans = list(self.spans)
+        if round_num is not None:
+            spans = [s for s in spans if s.get("round") == round_num]
+        if client_id is not None:
+            spans = [s for s in spans if str(s.get("client_id")) == str(client_id)]
+        return sorted(spans, key=lambda s: s["start"])
+
+    def export_round(self, round_num: int) -> str:
+        """Compact JSON of a round's spans for the ``trace`` fit metric"""
+        return json.dumps(self.get_spans(round_num), separators=(",", ":"))
+
+    def waterfall(self, round_num: int) -> List[Dict]:
+        """Spans of a round with offsets from the first span, in milliseconds"""
+        spans = self.get_spans(round_num)
+        if not spans:
+            return []
+        origin = spans[0]["start"]
+        return [
+            {
+                "name": s["name"],
+                "process": s["process"],
+                "client_id": s.get("client_id"),
+                "offset_ms": round((s["start"] - origin) * 1000, 3),
+                "duration_ms": round(s["duration"] * 1000, 3),
+                "args": s.get("args", {}),
+            }
+            for s in spans
+        ]
+
+    def render_waterfall(self, round_num: int, width: int = 60) -> str:
+        """Plain-text waterfall of a round"""
+        rows = self.waterfall(round_num)
+        if not rows:
+            return f"No spans recorded for round {round_num}\n"
+
+        total_ms = max(r["offset_ms"] + r["duration_ms"] for r in rows) or 1.0
+        lines = [f"Round {round_num} ({total_ms:.1f} ms)"]
+        for r in rows:
+            begin = int(r["offset_ms"] / total_ms * width)
+            length = max(1, int(r["duration_ms"] / total_ms * width))
+            bar = " " * begin + "#" * min(length, width - begin)
+            label = f"{r['process']}:{r['name']}"
+            lines.append(f"{label:<40} |{bar:<{width}}| {r['duration_ms']:10.2f} ms")
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self, round_num: Optional[int] = None) -> Dict:
+        """Spans in Chrome trace event format (complete events, microseconds)"""
+        spans = self.get_spans(round_num)
+        processes: Dict[str, int] = {}
+        threads: Dict[tuple, int] = {}
+        events = []
+
+        for s in spans:
+            pid = processes.setdefault(s["process"], len(processes) + 1)
+            tid = threads.setdefault((pid, s.get("thread")), len(threads) + 1)
+            args = dict(s.get("args", {}))
+            if s.get("round") is not None:
+                args["round"] = s["round"]
+            if s.get("client_id") is not None:
+                args["client_id"] = s["client_id"]
+            events.append({
+                "name": s["name"],
+                "cat": "round",
+                "ph": "X",
+                "ts": int(s["start"] * 1e6),
+                "dur": int(s["duration"] * 1e6),
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+
+        for name, pid in processes.items():
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": name}})
+        for (pid, thread), tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": thread or "main"}})
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+# Global tracer instance
+_tracer_instance: Optional[Tracer] = None
+
+
+def get_tracer(process_name: str = "server") -> Tracer:
+    """Get global tracer instance (the process name is set on first use)"""
+    global _tracer_instance
+    if _tracer_instance is None:
+        _tracer_instance = Tracer(process_name)
+    return _tracer_instance
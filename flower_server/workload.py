@@ -0,0 +1,137 @@
+"""
+Per-client workload planning for the Flower server
+
+Clients report their hardware (CPU cores, CUDA) and training set size via
+``get_properties``. The planner turns these into a per-client batch size
+and number of local epochs so that institutions with very different data
+volumes and hardware finish a round in roughly the same time.
+"""
+import concurrent.futures
+import math
+import threading
+from typing import Dict, List, Optional
+
+from flwr.common import GetPropertiesIns
+
+
+class WorkloadPlanner:
+    """Plan batch size and local epochs per client from reported properties"""
+
+    def __init__(
+        self,
+        base_batch_size: int = 32,
+        base_epochs: int = 5,
+        min_batch_size: int = 16,
+        max_batch_size: int = 512,
+        min_batches_per_epoch: int = 10,
+        min_epochs: int = 1,
+        max_epochs: int = 20,
+        reference_cores: int = 4,
+        cuda_speedup: float = 8.0,
+        properties_timeout: Optional[float] = 30.0,
+    ):
+        """
+        Args:
+            base_batch_size: Batch size for a client with ``reference_cores`` CPU cores
+            base_epochs: Local epochs for a client of median workload
+            min_batch_size: Lower bound for planned batch sizes
+            max_batch_size: Upper bound for planned batch sizes
+            min_batches_per_epoch: Keep at least this many optimizer steps per epoch
+            min_epochs: Lower bound for planned epochs
+            max_epochs: Upper bound for planned epochs
+            reference_cores: CPU core count that ``base_batch_size`` is tuned for
+            cuda_speedup: Relative compute capacity of a CUDA client vs. the reference
+            properties_timeout: Timeout for ``get_properties`` requests in seconds
+        """
+        self.base_batch_size = base_batch_size
+        self.base_epochs = base_epochs
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.min_batches_per_epoch = min_batches_per_epoch
+        self.min_epochs = min_epochs
+        self.max_epochs = max_epochs
+        self.reference_cores = reference_cores
+        self.cuda_speedup = cuda_speedup
+        self.properties_timeout = properties_timeout
+
+        # Reported properties per client (cid -> properties)
+        self.properties: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def get_properties(self, client) -> Dict:
+        """Get (cached) properties of a client"""
+        with self.lock:
+            if client.cid in self.properties:
+                return self.properties[client.cid]
+
+        try:
+            res = client.get_properties(GetPropertiesIns(config={}), self.properties_timeout, None)
+            properties = dict(res.properties)
+        except Exception as e:
+            # Not cached, so the request is retried next round
+            print(f"[Workload] Could not get properties of client {client.cid}: {e}")
+            return {}
+
+        with self.lock:
+            self.properties[client.cid] = properties
+        return properties
+
+    def fetch_properties(self, clients: List) -> None:
+        """Request properties of all clients not seen yet in parallel"""
+        with self.lock:
+            missing = [client for client in clients if client.cid not in self.properties]
+        if not missing:
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            list(executor.map(self.get_properties, missing))
+
+    def _capacity(self, properties: Dict) -> float:
+        """Relative compute capacity (1.0 = reference CPU client)"""
+        if properties.get("cuda"):
+            return self.cuda_speedup
+        cores = int(properties.get("torch_threads") or properties.get("cpu_count") or self.reference_cores)
+        return max(cores, 1) / self.reference_cores
+
+    def _batch_size(self, properties: Dict) -> int:
+        """Batch size scaled with compute capacity, rounded to a power of two"""
+        batch_size = self.base_batch_size * self._capacity(properties)
+        train_samples = int(properties.get("train_samples", 0))
+        if train_samples > 0:
+            batch_size = min(batch_size, train_samples / self.min_batches_per_epoch)
+
+        batch_size = 2 ** int(round(math.log2(max(batch_size, 1))))
+        return max(self.min_batch_size, min(self.max_batch_size, batch_size))
+
+    def _reference_time(self) -> Optional[float]:
+        """Median per-round time (samples / capacity) of known clients at base epochs"""
+        with self.lock:
+            known = [p for p in self.properties.values() if int(p.get("train_samples", 0)) > 0]
+        if not known:
+            return None
+
+        times = sorted(int(p["train_samples"]) / self._capacity(p) for p in known)
+        return self.base_epochs * times[len(times) // 2]
+
+    def plan(self, client) -> Dict:
+        """
+        Plan the workload of a client
+
+        Returns:
+            Dict with ``batch_size`` and ``local_epochs`` (empty if the client
+            did not report properties)
+        """
+        properties = self.get_properties(client)
+        if not properties:
+            return {}
+
+        plan = {"batch_size": self._batch_size(properties)}
+
+        train_samples = int(properties.get("train_samples", 0))
+        reference_time = self._reference_time()
+        if train_samples > 0 and reference_time:
+            epoch_time = train_samples / self._capacity(properties)
+            epochs = int(round(reference_time / epoch_time))
+            plan["local_epochs"] = max(self.min_epochs, min(self.max_epochs, epochs))
+
+        return plan
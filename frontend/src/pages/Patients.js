@@ -21,8 +21,12 @@ import AddIcon from '@mui/icons-material/Add';
 import Layout from '../components/Layout';
 import axios from 'axios';
 
+const PAGE_SIZE = 50;
+const PATIENT_FIELDS = 'id,first_name,last_name,age,sex,bmi,children,smoker,region';
+
 function Patients() {
   const [patients, setPatients] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [open, setOpen] = useState(false);
   const [formData, setFormData] = useState({
     first_name: '',
@@ -39,10 +43,15 @@ function Patients() {
     fetchPatients();
   }, []);
 
-  const fetchPatients = async () => {
+  const fetchPatients = async (cursor = null) => {
     try {
-      const response = await axios.get('/api/patients');
-      setPatients(response.data);
+      const params = { limit: PAGE_SIZE, fields: PATIENT_FIELDS };
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      const response = await axios.get('/api/patients', { params });
+      setPatients(cursor ? [...patients, ...response.data.items] : response.data.items);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching patients:', error);
     }
@@ -115,6 +124,12 @@ function Patients() {
           </Table>
         </TableContainer>
 
+        {nextCursor && (
+          <Box sx={{ display: 'flex', justifyContent: 'center', mt: 2 }}>
+            <Button onClick={() => fetchPatients(nextCursor)}>Load more</Button>
+          </Box>
+        )}
+
         <Dialog open={open} onClose={() => setOpen(false)} maxWidth="sm" fullWidth>
           <DialogTitle>Add New Patient</DialogTitle>
           <DialogContent>
@@ -0,0 +1,156 @@
+"""
+Bulk database loader for patient datasets
+
+Loads a patients DataFrame and its child tables (physical measurements,
+lifestyle, socioeconomic, medical history, lab results) in batches:
+
+- PostgreSQL: patient IDs are reserved from the ``patients`` id sequence
+  and every table is streamed with ``COPY ... FROM STDIN``.
+- SQLite (local testing/benchmarks): IDs are allocated under
+  ``BEGIN IMMEDIATE`` and rows are inserted with ``executemany``.
+
+Each batch (patients plus their child rows) is loaded in one transaction on
+its own connection, and batches run in parallel on ``workers`` connections.
+
+Child tables reference patients by 1-based row number in ``patient_id``
+(the layout produced by the loader scripts); these are replaced with the
+database IDs reserved for the batch.
+"""
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Patients per batch (one transaction per batch)
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "50000"))
+# Parallel database connections
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", "4"))
+
+
+class BulkLoader:
+    """Loads patients and child tables in batches with COPY (PostgreSQL) or executemany (SQLite)"""
+
+    def __init__(self, engine, batch_size: int = BULK_BATCH_SIZE, workers: int = BULK_WORKERS):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        if self.dialect not in ("postgresql", "sqlite"):
+            raise ValueError(f"Bulk loading is not supported for '{self.dialect}' databases")
+        self.batch_size = batch_size
+        # SQLite allows a single writer at a time
+        self.workers = 1 if self.dialect == "sqlite" else max(1, workers)
+
+    def load(self, patients_df: pd.DataFrame, child_tables: List[Tuple[str, pd.DataFrame]]) -> np.ndarray:
+        """Load patients and child tables
+
+        Args:
+            patients_df: Patients without an id column
+            child_tables: (table name, DataFrame) pairs; ``patient_id`` is the
+                1-based row number of the patient in ``patients_df``
+
+        Returns:
+            Database IDs of the patients, in ``patients_df`` order
+        """
+        total = len(patients_df)
+        if total == 0:
+            return np.array([], dtype=np.int64)
+
+        # Sort child rows by patient so each batch is a contiguous slice
+        children = []
+        for table, df in child_tables:
+            if df is not None and len(df) > 0:
+                df = df.sort_values('patient_id', kind='stable', ignore_index=True)
+                children.append((table, df, df['patient_id'].to_numpy()))
+
+        batches = [(start, min(start + self.batch_size, total)) for start in range(0, total, self.batch_size)]
+        print(f"Bulk loading {total} patients in {len(batches)} batches "
+              f"({self.dialect}, {self.workers} connections)...")
+
+        start_time = time.perf_counter()
+
+        def load_batch(bounds):
+            start, end = bounds
+            batch_children = []
+            for table, df, row_numbers in children:
+                lo, hi = np.searchsorted(row_numbers, [start + 1, end + 1])
+                batch_children.append((table, df.iloc[lo:hi]))
+            ids = self._load_batch(patients_df.iloc[start:end], batch_children, start)
+            elapsed = time.perf_counter() - start_time
+            print(f"  Loaded patients {start + 1}-{end} ({end / max(elapsed, 1e-6):,.0f} patients/sec)")
+            return ids
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            ids = list(executor.map(load_batch, batches))
+
+        return np.concatenate(ids)
+
+    def _load_batch(self, patients: pd.DataFrame, children, offset: int) -> np.ndarray:
+        """Load one batch in a single transaction"""
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if self.dialect == "postgresql":
+                ids = self._reserve_ids_postgresql(cursor, len(patients))
+                insert = self._copy
+            else:
+                ids = self._reserve_ids_sqlite(cursor, len(patients))
+                insert = self._executemany
+
+            patients = patients.copy()
+            patients.insert(0, 'id', ids)
+            insert(cursor, 'patients', patients)
+
+            for table, df in children:
+                df = df.copy()
+                df['patient_id'] = ids[df['patient_id'].to_numpy() - offset - 1]
+                insert(cursor, table, df)
+
+            raw.commit()
+            return ids
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    @staticmethod
+    def _reserve_ids_postgresql(cursor, count: int) -> np.ndarray:
+        """Reserve ``count`` IDs from the patients id sequence"""
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence('patients', 'id')) FROM generate_series(1, %s)",
+            (count,)
+        )
+        return np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+    @staticmethod
+    def _reserve_ids_sqlite(cursor, count: int) -> np.ndarray:
+        """Allocate ``count`` IDs after the current maximum, holding the write lock"""
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM patients")
+        first = cursor.fetchone()[0] + 1
+        return np.arange(first, first + count, dtype=np.int64)
+
+    @staticmethod
+    def _copy(cursor, table: str, df: pd.DataFrame):
+        """Stream a DataFrame into a table with COPY FROM STDIN (empty fields are NULL)"""
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        columns = ", ".join(df.columns)
+        cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+    @staticmethod
+    def _executemany(cursor, table: str, df: pd.DataFrame):
+        """Insert a DataFrame with executemany (NaN/NaT become NULL)"""
+        # sqlite3 cannot bind pandas Timestamps; store text like to_sql does
+        df = df.copy()
+        for column in df.select_dtypes(include=['datetime', 'datetimetz']).columns:
+            df[column] = df[column].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+        values = df.astype(object).where(df.notna(), None)
+        rows = list(zip(*(values[column].tolist() for column in df.columns)))
+        columns = ", ".join(df.columns)
+        placeholders = ", ".join("?" for _ in df.columns)
+        cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
@@ -7,8 +7,13 @@ import numpy as np
 from faker import Faker
 from datetime import datetime, timedelta
 import os
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
-import random
+
+from generation_utils import choice, choice_by_mask, uniform_by_level, years_since_diagnosis
 
 load_dotenv()
 
@@ -16,10 +21,24 @@ load_dotenv()
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "output")
 
 # Random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
-fake = Faker()
-Faker.seed(42)
+RANDOM_SEED = 42
+# Number of distinct first/last names drawn from Faker
+NAME_POOL_SIZE = 1000
+# Patients per chunk in streaming mode
+STREAM_CHUNK_SIZE = 100000
+
+# Output tables in the order returned by generate_patients
+TABLE_NAMES = [
+    'patients',
+    'patient_physical_measurements',
+    'patient_lifestyle',
+    'patient_socioeconomic',
+    'patient_medical_history',
+    'patient_lab_results'
+]
+
+# Per-process state of streaming workers
+_stream_worker_state = {}
 
 # Load existing data to analyze distributions
 def load_existing_data():
@@ -91,125 +110,105 @@ def analyze_distributions(patients_df, physical_df, lifestyle_df, socioeconomic_
         'employment': employment_dist
     }
 
-def generate_age(dist):
-    """Generate age based on distribution"""
-    age = np.random.normal(dist['mean'], dist['std'])
-    age = max(dist['min'], min(dist['max'], age))
-    return int(age)
+def create_name_pool(size=NAME_POOL_SIZE, seed=RANDOM_SEED):
+    """Generate pools of first and last names with Faker (once, not per record)"""
+    fake = Faker()
+    fake.seed_instance(seed)
+    first_names = np.array([fake.first_name() for _ in range(size)])
+    last_names = np.array([fake.last_name() for _ in range(size)])
+    return first_names, last_names
+
+def generate_age(dist, rng, size):
+    """Generate ages based on distribution"""
+    age = np.clip(rng.normal(dist['mean'], dist['std'], size), dist['min'], dist['max'])
+    return age.astype(int)
 
-def generate_bmi(dist, age, sex):
+def generate_bmi(dist, rng, age, male):
     """Generate BMI based on distribution and demographics"""
-    bmi = np.random.normal(dist['mean'], dist['std'])
+    bmi = rng.normal(dist['mean'], dist['std'], len(age))
     # Slight adjustment based on age and sex
-    if sex == 'male':
-        bmi += (age - dist['mean']) * 0.01
-    else:
-        bmi -= (age - dist['mean']) * 0.005
-    bmi = max(dist['min'], min(dist['max'], bmi))
-    return round(bmi, 3)
+    bmi += np.where(male, (age - dist['mean']) * 0.01, -(age - dist['mean']) * 0.005)
+    return np.clip(bmi, dist['min'], dist['max']).round(3)
 
-def generate_insurance_cost(dist, age, bmi, smoker, children):
+def generate_insurance_cost(dist, rng, age, bmi, smoker, children):
     """Generate insurance cost based on factors"""
     # Base cost
-    cost = np.random.normal(dist['mean'], dist['std'])
+    cost = rng.normal(dist['mean'], dist['std'], len(age))
     
     # Adjustments
     cost += (age - 40) * 100  # Age factor
     cost += (bmi - 25) * 200  # BMI factor
-    if smoker == 'yes':
-        cost += 5000
+    cost += smoker * 5000
     cost += children * 500
     
-    cost = max(dist['min'], min(dist['max'], cost))
-    return round(cost, 2)
+    return np.clip(cost, dist['min'], dist['max']).round(2)
 
-def calculate_date_of_birth(age):
-    """Calculate date of birth from age"""
-    return datetime.now() - timedelta(days=int(age * 365.25))
+def calculate_date_of_birth(age, now):
+    """Calculate dates of birth from ages"""
+    return pd.Timestamp(now) - pd.to_timedelta((age * 365.25).astype(int), unit='D')
 
-def generate_height_weight_from_bmi(bmi, age, sex):
+def generate_height_weight_from_bmi(rng, bmi, age, male):
     """Generate realistic height and weight from BMI"""
-    if sex == 'male':
-        base_height = 175 + (age - 30) * 0.1
-        base_height = max(160, min(190, base_height))
-    else:
-        base_height = 162 + (age - 30) * 0.1
-        base_height = max(150, min(180, base_height))
+    base_height = np.where(
+        male,
+        np.clip(175 + (age - 30) * 0.1, 160, 190),
+        np.clip(162 + (age - 30) * 0.1, 150, 180)
+    )
     
-    height_cm = base_height + np.random.normal(0, 5)
-    height_cm = max(140, min(210, height_cm))
+    height_cm = np.clip(base_height + rng.normal(0, 5, len(bmi)), 140, 210)
     
     height_m = height_cm / 100
-    weight_kg = bmi * (height_m ** 2)
-    weight_kg = max(40, min(200, weight_kg))
+    weight_kg = np.clip(bmi * (height_m ** 2), 40, 200)
     
-    return round(height_cm, 2), round(weight_kg, 2)
+    return height_cm.round(2), weight_kg.round(2)
 
-def generate_blood_pressure(age, bmi, smoker):
+def generate_blood_pressure(rng, age, bmi, smoker):
     """Generate realistic blood pressure"""
     base_systolic = 110 + (age - 18) * 0.5
     base_systolic += (bmi - 25) * 0.8
-    if smoker == 'yes':
-        base_systolic += 5
+    base_systolic += smoker * 5
     
-    systolic = base_systolic + np.random.normal(0, 8)
-    systolic = max(90, min(180, int(systolic)))
+    systolic = np.clip(np.trunc(base_systolic + rng.normal(0, 8, len(age))), 90, 180).astype(int)
     
-    diastolic = systolic * 0.65 + np.random.normal(0, 5)
-    diastolic = max(60, min(120, int(diastolic)))
+    diastolic = np.clip(np.trunc(systolic * 0.65 + rng.normal(0, 5, len(age))), 60, 120).astype(int)
     
     return systolic, diastolic
 
-def generate_heart_rate(age, physical_activity):
+def generate_heart_rate(rng, age, physical_activity):
     """Generate resting heart rate"""
     base_hr = 75 - (age - 18) * 0.1
-    if physical_activity in ['active', 'very_active']:
-        base_hr -= 10
-    elif physical_activity == 'moderate':
-        base_hr -= 5
+    base_hr = base_hr - np.where(np.isin(physical_activity, ['active', 'very_active']), 10, 0)
+    base_hr = base_hr - np.where(physical_activity == 'moderate', 5, 0)
     
-    hr = base_hr + np.random.normal(0, 5)
-    hr = max(50, min(100, int(hr)))
-    return hr
+    hr = np.trunc(base_hr + rng.normal(0, 5, len(age)))
+    return np.clip(hr, 50, 100).astype(int)
 
-def generate_lab_results(age, sex, bmi, smoker, region):
+def generate_lab_results(rng, age, male, bmi, smoker):
     """Generate realistic laboratory results"""
-    base_cholesterol = 180 + (age - 18) * 0.5 + (bmi - 25) * 2
-    if smoker == 'yes':
-        base_cholesterol += 15
-    total_cholesterol = base_cholesterol + np.random.normal(0, 20)
-    total_cholesterol = max(100, min(300, round(total_cholesterol, 2)))
-    
-    ldl = total_cholesterol * 0.65 + np.random.normal(0, 15)
-    ldl = max(50, min(250, round(ldl, 2)))
-    
-    base_hdl = 50 if sex == 'male' else 60
-    if smoker == 'yes':
-        base_hdl -= 5
-    hdl = base_hdl + np.random.normal(0, 8)
-    hdl = max(30, min(100, round(hdl, 2)))
-    
-    base_trig = 100 + (bmi - 25) * 5
-    if smoker == 'yes':
-        base_trig += 20
-    triglycerides = base_trig + np.random.normal(0, 30)
-    triglycerides = max(50, min(400, round(triglycerides, 2)))
+    size = len(age)
+    
+    base_cholesterol = 180 + (age - 18) * 0.5 + (bmi - 25) * 2 + smoker * 15
+    total_cholesterol = np.clip((base_cholesterol + rng.normal(0, 20, size)).round(2), 100, 300)
+    
+    ldl = np.clip((total_cholesterol * 0.65 + rng.normal(0, 15, size)).round(2), 50, 250)
+    
+    base_hdl = np.where(male, 50, 60) - smoker * 5
+    hdl = np.clip((base_hdl + rng.normal(0, 8, size)).round(2), 30, 100)
+    
+    base_trig = 100 + (bmi - 25) * 5 + smoker * 20
+    triglycerides = np.clip((base_trig + rng.normal(0, 30, size)).round(2), 50, 400)
     
     base_glucose = 85 + (age - 18) * 0.3 + (bmi - 25) * 0.5
-    glucose = base_glucose + np.random.normal(0, 8)
-    glucose = max(70, min(120, round(glucose, 2)))
+    glucose = np.clip((base_glucose + rng.normal(0, 8, size)).round(2), 70, 120)
     
-    hba1c = (glucose + 46.7) / 28.7 + np.random.normal(0, 0.2)
-    hba1c = max(4.0, min(6.5, round(hba1c, 2)))
+    hba1c = (glucose + 46.7) / 28.7 + rng.normal(0, 0.2, size)
+    hba1c = np.clip(hba1c.round(2), 4.0, 6.5)
     
-    base_creatinine = 0.9 if sex == 'male' else 0.7
-    base_creatinine += (age - 18) * 0.005
-    creatinine = base_creatinine + np.random.normal(0, 0.1)
-    creatinine = max(0.5, min(1.5, round(creatinine, 2)))
+    base_creatinine = np.where(male, 0.9, 0.7) + (age - 18) * 0.005
+    creatinine = np.clip((base_creatinine + rng.normal(0, 0.1, size)).round(2), 0.5, 1.5)
     
     base_egfr = 120 - (age - 18) * 0.8
-    egfr = base_egfr + np.random.normal(0, 10)
-    egfr = max(60, min(120, round(egfr, 2)))
+    egfr = np.clip((base_egfr + rng.normal(0, 10, size)).round(2), 60, 120)
     
     return {
         'total_cholesterol': total_cholesterol,
@@ -222,12 +221,12 @@ def generate_lab_results(age, sex, bmi, smoker, region):
         'egfr': egfr
     }
 
-def generate_lifestyle_data(age, sex, bmi, smoker, children, dists):
+def generate_lifestyle_data(rng, age, smoker, dists):
     """Generate lifestyle data based on distributions"""
+    size = len(age)
+    
     # Physical activity
-    activity_levels = list(dists['activity'].keys())
-    activity_weights = list(dists['activity'].values())
-    physical_activity = np.random.choice(activity_levels, p=activity_weights)
+    physical_activity = choice(rng, dists['activity'].keys(), dists['activity'].values(), size)
     
     exercise_hours_map = {
         'sedentary': (0, 1),
@@ -236,8 +235,7 @@ def generate_lifestyle_data(age, sex, bmi, smoker, children, dists):
         'active': (5, 8),
         'very_active': (8, 15)
     }
-    min_hours, max_hours = exercise_hours_map[physical_activity]
-    exercise_hours = round(np.random.uniform(min_hours, max_hours), 2)
+    exercise_hours = uniform_by_level(rng, physical_activity, exercise_hours_map).round(2)
     
     steps_map = {
         'sedentary': (2000, 5000),
@@ -246,50 +244,37 @@ def generate_lifestyle_data(age, sex, bmi, smoker, children, dists):
         'active': (10000, 15000),
         'very_active': (15000, 25000)
     }
-    min_steps, max_steps = steps_map[physical_activity]
-    steps_per_day = int(np.random.uniform(min_steps, max_steps))
+    steps_per_day = uniform_by_level(rng, physical_activity, steps_map).astype(int)
     
     # Alcohol
     alcohol_levels = ['none', 'occasional', 'moderate', 'heavy']
-    if smoker == 'yes':
-        weights = [0.2, 0.3, 0.4, 0.1]
-    else:
-        weights = [0.3, 0.4, 0.25, 0.05]
-    alcohol_consumption = np.random.choice(alcohol_levels, p=weights)
+    alcohol_consumption = choice_by_mask(rng, alcohol_levels, [
+        (smoker, [0.2, 0.3, 0.4, 0.1]),
+        (~smoker, [0.3, 0.4, 0.25, 0.05])
+    ], size)
     
     drinks_per_week = {
-        'none': 0,
+        'none': (0, 0),
         'occasional': (1, 3),
         'moderate': (4, 7),
         'heavy': (8, 20)
     }
-    if alcohol_consumption == 'none':
-        drinks = 0
-    else:
-        min_drinks, max_drinks = drinks_per_week[alcohol_consumption]
-        drinks = int(np.random.uniform(min_drinks, max_drinks))
+    drinks = uniform_by_level(rng, alcohol_consumption, drinks_per_week).astype(int)
     
     # Diet
     diet_types = ['omnivore', 'vegetarian', 'vegan', 'pescatarian', 'mediterranean']
-    weights = [0.7, 0.15, 0.05, 0.05, 0.05]
-    diet_type = np.random.choice(diet_types, p=weights)
+    diet_type = choice(rng, diet_types, [0.7, 0.15, 0.05, 0.05, 0.05], size)
     
     # Sleep
-    sleep_hours = round(np.random.normal(7.5, 1.0), 1)
-    sleep_hours = max(5, min(10, sleep_hours))
+    sleep_hours = np.clip(rng.normal(7.5, 1.0, size).round(1), 5, 10)
     
-    sleep_quality = np.random.choice(['poor', 'fair', 'good', 'excellent'], 
-                                     p=[0.15, 0.25, 0.45, 0.15])
+    sleep_quality = choice(rng, ['poor', 'fair', 'good', 'excellent'],
+                            [0.15, 0.25, 0.45, 0.15], size)
     
     # Smoking details
-    if smoker == 'yes':
-        years_smoking = max(1, age - 18 - np.random.randint(0, 5))
-        cigarettes_per_day = int(np.random.uniform(5, 30))
-        pack_years = round((cigarettes_per_day / 20) * years_smoking, 2)
-    else:
-        years_smoking = 0
-        cigarettes_per_day = 0
-        pack_years = 0.0
+    years_smoking = np.where(smoker, np.maximum(1, age - 18 - rng.integers(0, 5, size)), 0)
+    cigarettes_per_day = np.where(smoker, rng.uniform(5, 30, size).astype(int), 0)
+    pack_years = ((cigarettes_per_day / 20) * years_smoking).round(2)
     
     return {
         'physical_activity_level': physical_activity,
@@ -305,22 +290,20 @@ def generate_lifestyle_data(age, sex, bmi, smoker, children, dists):
         'pack_years': pack_years
     }
 
-def generate_socioeconomic_data(age, region, children, dists):
+def generate_socioeconomic_data(rng, age, region, children, dists):
     """Generate socioeconomic data"""
+    size = len(age)
+    
     # Employment
-    if age < 18:
-        employment_status = 'student'
-    elif age < 65:
-        emp_levels = list(dists['employment'].keys())
-        emp_weights = list(dists['employment'].values())
-        employment_status = np.random.choice(emp_levels, p=emp_weights)
-    else:
-        employment_status = np.random.choice(['retired', 'employed'], p=[0.9, 0.1])
+    employment_status = choice_by_mask(rng, list(dists['employment'].keys()), [
+        ((age >= 18) & (age < 65), list(dists['employment'].values()))
+    ], size)
+    employment_status[age < 18] = 'student'
+    retired_age = age >= 65
+    employment_status[retired_age] = choice(rng, ['retired', 'employed'], [0.9, 0.1], int(retired_age.sum()))
     
     # Education
-    edu_levels = list(dists['education'].keys())
-    edu_weights = list(dists['education'].values())
-    education_level = np.random.choice(edu_levels, p=edu_weights)
+    education_level = choice(rng, dists['education'].keys(), dists['education'].values(), size)
     
     # Income
     income_base = {
@@ -331,55 +314,48 @@ def generate_socioeconomic_data(age, region, children, dists):
         'master': 85000,
         'doctorate': 120000
     }
-    base_income = income_base[education_level]
-    if age < 50:
-        age_multiplier = 1 + (age - 25) * 0.02
-    else:
-        age_multiplier = 1.5
-    annual_income = base_income * age_multiplier * np.random.uniform(0.8, 1.3)
-    annual_income = max(10000, round(annual_income, 2))
+    base_income = pd.Series(education_level).map(income_base).to_numpy(dtype=float)
+    age_multiplier = np.where(age < 50, 1 + (age - 25) * 0.02, 1.5)
+    annual_income = base_income * age_multiplier * rng.uniform(0.8, 1.3, size)
+    annual_income = np.maximum(10000, annual_income.round(2))
     
     # Housing
-    if annual_income > 50000:
-        housing_weights = [0.7, 0.25, 0.05]
-    else:
-        housing_weights = [0.3, 0.6, 0.1]
-    housing_type = np.random.choice(['owned', 'rented', 'other'], p=housing_weights)
+    high_income = annual_income > 50000
+    housing_type = choice_by_mask(rng, ['owned', 'rented', 'other'], [
+        (high_income, [0.7, 0.25, 0.05]),
+        (~high_income, [0.3, 0.6, 0.1])
+    ], size)
     
     # Household size
-    household_size = 1 + children + (1 if np.random.random() > 0.3 else 0)
-    household_size = max(1, min(8, household_size))
+    household_size = 1 + children + (rng.random(size) > 0.3)
+    household_size = np.clip(household_size, 1, 8)
     
     # Insurance
-    if employment_status == 'employed':
-        insurance_type = np.random.choice(['employer', 'individual'], p=[0.8, 0.2])
-    else:
-        insurance_type = np.random.choice(['individual', 'medicare', 'medicaid', 'uninsured'],
-                                         p=[0.3, 0.2, 0.3, 0.2])
-    
-    if insurance_type != 'uninsured':
-        plan_types = ['HMO', 'PPO', 'EPO', 'POS', 'HDHP']
-        insurance_plan_type = np.random.choice(plan_types, p=[0.3, 0.4, 0.1, 0.1, 0.1])
-        
-        deductible_map = {
-            'HMO': (500, 2000),
-            'PPO': (1000, 5000),
-            'EPO': (1000, 4000),
-            'POS': (1500, 6000),
-            'HDHP': (2000, 7000)
-        }
-        min_ded, max_ded = deductible_map[insurance_plan_type]
-        deductible = round(np.random.uniform(min_ded, max_ded), 2)
-        copay_amount = round(np.random.uniform(20, 50), 2)
-        out_of_pocket_max = round(deductible * 2.5, 2)
-    else:
-        insurance_plan_type = None
-        deductible = None
-        copay_amount = None
-        out_of_pocket_max = None
+    employed = employment_status == 'employed'
+    insurance_type = choice_by_mask(rng, ['employer', 'individual', 'medicare', 'medicaid', 'uninsured'], [
+        (employed, [0.8, 0.2, 0, 0, 0]),
+        (~employed, [0, 0.3, 0.2, 0.3, 0.2])
+    ], size)
+    
+    insured = insurance_type != 'uninsured'
+    plan_types = ['HMO', 'PPO', 'EPO', 'POS', 'HDHP']
+    insurance_plan_type = choice_by_mask(rng, plan_types, [
+        (insured, [0.3, 0.4, 0.1, 0.1, 0.1])
+    ], size)
+    
+    deductible_map = {
+        'HMO': (500, 2000),
+        'PPO': (1000, 5000),
+        'EPO': (1000, 4000),
+        'POS': (1500, 6000),
+        'HDHP': (2000, 7000)
+    }
+    deductible = np.full(size, np.nan)
+    deductible[insured] = uniform_by_level(rng, insurance_plan_type[insured], deductible_map).round(2)
+    copay_amount = np.where(insured, rng.uniform(20, 50, size).round(2), np.nan)
+    out_of_pocket_max = (deductible * 2.5).round(2)
     
-    residential_area = np.random.choice(['urban', 'suburban', 'rural'],
-                                       p=[0.4, 0.45, 0.15])
+    residential_area = choice(rng, ['urban', 'suburban', 'rural'], [0.4, 0.45, 0.15], size)
     
     return {
         'region': region,
@@ -394,203 +370,193 @@ def generate_socioeconomic_data(age, region, children, dists):
         'copay_amount': copay_amount,
         'out_of_pocket_max': out_of_pocket_max,
         'residential_area': residential_area,
-        'years_with_insurance': max(1, int(np.random.uniform(1, 20))),
-        'coverage_gaps': int(np.random.exponential(0.5)),
-        'total_days_without_insurance': int(np.random.exponential(30))
+        'years_with_insurance': np.maximum(1, rng.uniform(1, 20, size).astype(int)),
+        'coverage_gaps': rng.exponential(0.5, size).astype(int),
+        'total_days_without_insurance': rng.exponential(30, size).astype(int)
     }
 
-def generate_medical_history(age, bmi, smoker):
-    """Generate medical history"""
-    conditions = []
-    
-    diabetes_risk = 0.01 + (age - 18) * 0.001 + (bmi - 25) * 0.01
-    if np.random.random() < diabetes_risk:
-        years = max(1, int(np.random.uniform(1, age - 18)))
-        conditions.append({
-            'condition_type': 'diabetes',
-            'condition_name': 'Type 2 Diabetes',
-            'severity': np.random.choice(['mild', 'moderate', 'severe'], p=[0.5, 0.4, 0.1]),
+def generate_medical_history(rng, patient_ids, age, bmi, smoker, now):
+    """Generate medical history (zero or more conditions per patient)"""
+    size = len(age)
+    frames = []
+    
+    def add_conditions(has_condition, condition_type, condition_name, severities, severity_weights,
+                       max_years, controlled_threshold):
+        count = int(has_condition.sum())
+        years = years_since_diagnosis(rng, max_years[has_condition])
+        frames.append(pd.DataFrame({
+            'patient_id': patient_ids[has_condition],
+            'condition_type': condition_type,
+            'condition_name': condition_name,
+            'severity': choice(rng, severities, severity_weights, count),
             'years_since_diagnosis': years,
-            'medication_controlled': np.random.random() > 0.3
-        })
-    
-    hypertension_risk = 0.05 + (age - 18) * 0.002 + (bmi - 25) * 0.01
-    if smoker == 'yes':
-        hypertension_risk += 0.1
-    if np.random.random() < hypertension_risk:
-        years = max(1, int(np.random.uniform(1, age - 18)))
-        conditions.append({
-            'condition_type': 'hypertension',
-            'condition_name': 'Hypertension',
-            'severity': np.random.choice(['mild', 'moderate'], p=[0.7, 0.3]),
-            'years_since_diagnosis': years,
-            'medication_controlled': np.random.random() > 0.2
-        })
-    
-    heart_disease_risk = 0.01 + (age - 40) * 0.002 if age > 40 else 0.001
-    if smoker == 'yes':
-        heart_disease_risk *= 2
-    if np.random.random() < heart_disease_risk:
-        years = max(1, int(np.random.uniform(1, max(1, age - 40))))
-        conditions.append({
-            'condition_type': 'heart_disease',
-            'condition_name': 'Coronary Artery Disease',
-            'severity': np.random.choice(['mild', 'moderate', 'severe'], p=[0.6, 0.3, 0.1]),
-            'years_since_diagnosis': years,
-            'medication_controlled': np.random.random() > 0.4
-        })
+            'medication_controlled': rng.random(count) > controlled_threshold,
+            'diagnosis_date': pd.Timestamp(now) - pd.to_timedelta(years * 365, unit='D'),
+            'created_at': now
+        }))
     
-    return conditions
-
-def generate_patients(num_records, dists, start_id=1):
-    """Generate patient records"""
-    print(f"\nGenerating {num_records} patient records...")
-    
-    patients = []
-    physical_measurements = []
-    lifestyle_records = []
-    socioeconomic_records = []
-    medical_history_records = []
-    lab_results_records = []
-    
-    sex_list = list(dists['sex'].keys())
-    sex_weights = list(dists['sex'].values())
-    
-    region_list = list(dists['region'].keys())
-    region_weights = list(dists['region'].values())
+    diabetes_risk = 0.01 + (age - 18) * 0.001 + (bmi - 25) * 0.01
+    add_conditions(rng.random(size) < diabetes_risk, 'diabetes', 'Type 2 Diabetes',
+                   ['mild', 'moderate', 'severe'], [0.5, 0.4, 0.1], age - 18, 0.3)
     
-    smoking_list = list(dists['smoking'].keys())
-    smoking_weights = list(dists['smoking'].values())
+    hypertension_risk = 0.05 + (age - 18) * 0.002 + (bmi - 25) * 0.01 + smoker * 0.1
+    add_conditions(rng.random(size) < hypertension_risk, 'hypertension', 'Hypertension',
+                   ['mild', 'moderate'], [0.7, 0.3], age - 18, 0.2)
     
-    children_list = list(dists['children'].keys())
-    children_weights = list(dists['children'].values())
+    heart_disease_risk = np.where(age > 40, 0.01 + (age - 40) * 0.002, 0.001)
+    heart_disease_risk = heart_disease_risk * np.where(smoker, 2, 1)
+    add_conditions(rng.random(size) < heart_disease_risk, 'heart_disease', 'Coronary Artery Disease',
+                   ['mild', 'moderate', 'severe'], [0.6, 0.3, 0.1], np.maximum(1, age - 40), 0.4)
     
-    for idx in range(num_records):
-        patient_id = start_id + idx
-        
-        # Generate basic demographics
-        age = generate_age(dists['age'])
-        sex = np.random.choice(sex_list, p=sex_weights)
-        region = np.random.choice(region_list, p=region_weights)
-        children = int(np.random.choice(children_list, p=children_weights))
-        smoker_status = np.random.choice(smoking_list, p=smoking_weights)
-        smoker = 'yes' if smoker_status == 'current' else 'no'
-        
-        # Generate derived data
-        bmi = generate_bmi(dists['bmi'], age, sex)
-        insurance_cost = generate_insurance_cost(dists['insurance_cost'], age, bmi, smoker, children)
-        
-        height_cm, weight_kg = generate_height_weight_from_bmi(bmi, age, sex)
-        systolic_bp, diastolic_bp = generate_blood_pressure(age, bmi, smoker)
-        lab_results = generate_lab_results(age, sex, bmi, smoker, region)
-        lifestyle = generate_lifestyle_data(age, sex, bmi, smoker, children, dists)
-        socioeconomic = generate_socioeconomic_data(age, region, children, dists)
-        medical_history = generate_medical_history(age, bmi, smoker)
-        
-        heart_rate = generate_heart_rate(age, lifestyle['physical_activity_level'])
-        
-        # Patient record
-        patients.append({
-            'institution_id': 1,
-            'created_by': 1,
-            'first_name': fake.first_name(),
-            'last_name': fake.last_name(),
-            'date_of_birth': calculate_date_of_birth(age),
-            'sex': sex,
-            'marital_status': 'single' if children == 0 else 'married',
-            'number_of_dependents': children,
-            'insurance_cost': insurance_cost,
-            'created_at': datetime.now(),
-            'updated_at': datetime.now()
-        })
-        
-        # Physical measurements
-        physical_measurements.append({
-            'patient_id': patient_id,
-            'height_cm': height_cm,
-            'weight_kg': weight_kg,
-            'bmi': bmi,
-            'body_fat_percentage': round(1.2 * bmi + 0.23 * age - 10.8 - 5.4 if sex == 'male' else 1.2 * bmi + 0.23 * age - 5.4, 2),
-            'waist_circumference': round(0.5 * height_cm + np.random.normal(0, 5), 2),
-            'hip_circumference': round(0.6 * height_cm + np.random.normal(0, 5), 2),
-            'systolic_bp': systolic_bp,
-            'diastolic_bp': diastolic_bp,
-            'resting_heart_rate': heart_rate,
-            'max_heart_rate': 220 - age,
-            'measured_at': datetime.now(),
-            'updated_at': datetime.now()
-        })
-        
-        # Lifestyle
-        lifestyle_records.append({
-            'patient_id': patient_id,
-            'smoking_status': smoker_status,
-            'years_smoking': lifestyle['years_smoking'],
-            'cigarettes_per_day': lifestyle['cigarettes_per_day'],
-            'pack_years': lifestyle['pack_years'],
-            'alcohol_consumption': lifestyle['alcohol_consumption'],
-            'drinks_per_week': lifestyle['drinks_per_week'],
-            'drinking_frequency': 'weekly' if lifestyle['drinks_per_week'] > 0 else 'never',
-            'physical_activity_level': lifestyle['physical_activity_level'],
-            'exercise_hours_per_week': lifestyle['exercise_hours_per_week'],
-            'steps_per_day': lifestyle['steps_per_day'],
-            'diet_type': lifestyle['diet_type'],
-            'sleep_hours_per_night': lifestyle['sleep_hours_per_night'],
-            'sleep_quality': lifestyle['sleep_quality'],
-            'updated_at': datetime.now()
-        })
-        
-        # Socioeconomic
-        socioeconomic_records.append({
-            'patient_id': patient_id,
-            **socioeconomic,
-            'updated_at': datetime.now()
-        })
-        
-        # Medical history
-        for condition in medical_history:
-            medical_history_records.append({
-                'patient_id': patient_id,
-                **condition,
-                'diagnosis_date': datetime.now() - timedelta(days=condition['years_since_diagnosis'] * 365),
-                'created_at': datetime.now()
-            })
-        
-        # Lab results
-        lab_results_records.append({
-            'patient_id': patient_id,
-            'test_date': datetime.now() - timedelta(days=np.random.randint(0, 365)),
-            'test_type': 'comprehensive',
-            **lab_results,
-            'created_at': datetime.now()
-        })
-        
-        if (idx + 1) % 1000 == 0:
-            print(f"  Generated {idx + 1}/{num_records} records...")
+    # Conditions of a patient stay together, in the order they were generated
+    return pd.concat(frames, ignore_index=True).sort_values('patient_id', kind='stable', ignore_index=True)
+
+def generate_patients(num_records, dists, start_id=1, seed=RANDOM_SEED, name_pool=None, verbose=True):
+    """Generate patient records
+    
+    Every column is drawn as a whole NumPy array and the DataFrames are built
+    column-wise, so generation cost is dominated by vectorized NumPy/pandas
+    operations rather than per-record Python code.
+    
+    Args:
+        num_records: Number of patients to generate
+        dists: Distributions from analyze_distributions()
+        start_id: patient_id of the first generated patient
+        seed: Seed or SeedSequence for np.random.Generator (same seed and arguments give the same data)
+        name_pool: (first_names, last_names) arrays; created with Faker if not given
+        verbose: Print progress
+    
+    Returns:
+        Tuple of patients, physical measurements, lifestyle, socioeconomic,
+        medical history and lab results DataFrames
+    """
+    if verbose:
+        print(f"\nGenerating {num_records} patient records...")
+    
+    rng = np.random.default_rng(seed)
+    if name_pool is None:
+        name_pool = create_name_pool(seed=seed)
+    first_names, last_names = name_pool
+    now = datetime.now()
+    
+    patient_ids = np.arange(start_id, start_id + num_records)
+    
+    # Generate basic demographics
+    age = generate_age(dists['age'], rng, num_records)
+    sex = choice(rng, dists['sex'].keys(), dists['sex'].values(), num_records)
+    region = choice(rng, dists['region'].keys(), dists['region'].values(), num_records)
+    children = choice(rng, dists['children'].keys(), dists['children'].values(), num_records).astype(int)
+    smoker_status = choice(rng, dists['smoking'].keys(), dists['smoking'].values(), num_records)
+    smoker = smoker_status == 'current'
+    male = sex == 'male'
+    
+    # Generate derived data
+    bmi = generate_bmi(dists['bmi'], rng, age, male)
+    insurance_cost = generate_insurance_cost(dists['insurance_cost'], rng, age, bmi, smoker, children)
+    
+    height_cm, weight_kg = generate_height_weight_from_bmi(rng, bmi, age, male)
+    systolic_bp, diastolic_bp = generate_blood_pressure(rng, age, bmi, smoker)
+    lab_results = generate_lab_results(rng, age, male, bmi, smoker)
+    lifestyle = generate_lifestyle_data(rng, age, smoker, dists)
+    socioeconomic = generate_socioeconomic_data(rng, age, region, children, dists)
+    medical_history_df = generate_medical_history(rng, patient_ids, age, bmi, smoker, now)
+    
+    heart_rate = generate_heart_rate(rng, age, lifestyle['physical_activity_level'])
+    
+    # Patient records
+    patients_df = pd.DataFrame({
+        'institution_id': 1,
+        'created_by': 1,
+        'first_name': first_names[rng.integers(0, len(first_names), num_records)],
+        'last_name': last_names[rng.integers(0, len(last_names), num_records)],
+        'date_of_birth': calculate_date_of_birth(age, now),
+        'sex': sex,
+        'marital_status': np.where(children == 0, 'single', 'married'),
+        'number_of_dependents': children,
+        'insurance_cost': insurance_cost,
+        'created_at': now,
+        'updated_at': now
+    })
+    
+    # Physical measurements
+    body_fat = 1.2 * bmi + 0.23 * age - 5.4 - np.where(male, 10.8, 0)
+    physical_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        'height_cm': height_cm,
+        'weight_kg': weight_kg,
+        'bmi': bmi,
+        'body_fat_percentage': body_fat.round(2),
+        'waist_circumference': (0.5 * height_cm + rng.normal(0, 5, num_records)).round(2),
+        'hip_circumference': (0.6 * height_cm + rng.normal(0, 5, num_records)).round(2),
+        'systolic_bp': systolic_bp,
+        'diastolic_bp': diastolic_bp,
+        'resting_heart_rate': heart_rate,
+        'max_heart_rate': 220 - age,
+        'measured_at': now,
+        'updated_at': now
+    })
+    
+    # Lifestyle
+    lifestyle_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        'smoking_status': smoker_status,
+        'years_smoking': lifestyle['years_smoking'],
+        'cigarettes_per_day': lifestyle['cigarettes_per_day'],
+        'pack_years': lifestyle['pack_years'],
+        'alcohol_consumption': lifestyle['alcohol_consumption'],
+        'drinks_per_week': lifestyle['drinks_per_week'],
+        'drinking_frequency': np.where(lifestyle['drinks_per_week'] > 0, 'weekly', 'never'),
+        'physical_activity_level': lifestyle['physical_activity_level'],
+        'exercise_hours_per_week': lifestyle['exercise_hours_per_week'],
+        'steps_per_day': lifestyle['steps_per_day'],
+        'diet_type': lifestyle['diet_type'],
+        'sleep_hours_per_night': lifestyle['sleep_hours_per_night'],
+        'sleep_quality': lifestyle['sleep_quality'],
+        'updated_at': now
+    })
+    
+    # Socioeconomic
+    socioeconomic_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        **socioeconomic,
+        'updated_at': now
+    })
+    
+    # Lab results
+    lab_results_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        'test_date': pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 365, num_records), unit='D'),
+        'test_type': 'comprehensive',
+        **lab_results,
+        'created_at': now
+    })
     
     return (
-        pd.DataFrame(patients),
-        pd.DataFrame(physical_measurements),
-        pd.DataFrame(lifestyle_records),
-        pd.DataFrame(socioeconomic_records),
-        pd.DataFrame(medical_history_records),
-        pd.DataFrame(lab_results_records)
+        patients_df,
+        physical_df,
+        lifestyle_df,
+        socioeconomic_df,
+        medical_history_df,
+        lab_results_df
     )
 
 def save_to_csv(patients_df, physical_df, lifestyle_df, 
-                socioeconomic_df, medical_history_df, lab_results_df, append=False):
+                socioeconomic_df, medical_history_df, lab_results_df, append=False,
+                output_dir=None):
     """Save data to CSV files"""
     print("\nSaving data to CSV files...")
     
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    output_dir = output_dir or OUTPUT_DIR
+    
+    os.makedirs(output_dir, exist_ok=True)
     
     # File paths
-    patients_file = os.path.join(OUTPUT_DIR, 'patients.csv')
-    physical_file = os.path.join(OUTPUT_DIR, 'patient_physical_measurements.csv')
-    lifestyle_file = os.path.join(OUTPUT_DIR, 'patient_lifestyle.csv')
-    socioeconomic_file = os.path.join(OUTPUT_DIR, 'patient_socioeconomic.csv')
-    medical_history_file = os.path.join(OUTPUT_DIR, 'patient_medical_history.csv')
-    lab_results_file = os.path.join(OUTPUT_DIR, 'patient_lab_results.csv')
+    patients_file = os.path.join(output_dir, 'patients.csv')
+    physical_file = os.path.join(output_dir, 'patient_physical_measurements.csv')
+    lifestyle_file = os.path.join(output_dir, 'patient_lifestyle.csv')
+    socioeconomic_file = os.path.join(output_dir, 'patient_socioeconomic.csv')
+    medical_history_file = os.path.join(output_dir, 'patient_medical_history.csv')
+    lab_results_file = os.path.join(output_dir, 'patient_lab_results.csv')
     
     if append:
         # Append mode
@@ -633,7 +599,145 @@ def save_to_csv(patients_df, physical_df, lifestyle_df,
         print(f"Saving {len(lab_results_df)} lab results...")
         lab_results_df.to_csv(lab_results_file, index=False)
     
-    print(f"\nData saved successfully to '{OUTPUT_DIR}' directory!")
+    print(f"\nData saved successfully to '{output_dir}' directory!")
+
+def _init_stream_worker(dists, name_pool):
+    """Process pool initializer: keep distributions and names in the worker"""
+    _stream_worker_state['dists'] = dists
+    _stream_worker_state['name_pool'] = name_pool
+
+def _generate_chunk(start_id, num_records, seed_sequence, file_format):
+    """Generate one chunk in a worker process
+    
+    CSV chunks are formatted in the worker (as column names and rows without
+    header) so that the parent only writes text; Parquet chunks are returned
+    as DataFrames.
+    """
+    dataframes = generate_patients(
+        num_records, _stream_worker_state['dists'], start_id=start_id, seed=seed_sequence,
+        name_pool=_stream_worker_state['name_pool'], verbose=False
+    )
+    if file_format == 'csv':
+        return [(list(df.columns), df.to_csv(header=False, index=False)) for df in dataframes]
+    return list(dataframes)
+
+class CsvChunkWriter:
+    """Writes generated chunks to the CSV files in order"""
+    
+    def __init__(self, output_dir, append=False):
+        os.makedirs(output_dir, exist_ok=True)
+        paths = [os.path.join(output_dir, f'{name}.csv') for name in TABLE_NAMES]
+        # Files that are created or empty get a header before the first chunk
+        self.needs_header = [
+            not append or not os.path.exists(path) or os.path.getsize(path) == 0 for path in paths
+        ]
+        self.files = [open(path, 'a' if append else 'w', newline='') for path in paths]
+    
+    def write(self, chunk):
+        for i, (columns, text) in enumerate(chunk):
+            if self.needs_header[i]:
+                self.files[i].write(','.join(columns) + os.linesep)
+                self.needs_header[i] = False
+            self.files[i].write(text)
+    
+    def close(self):
+        for f in self.files:
+            f.close()
+
+class ParquetChunkWriter:
+    """Writes generated chunks as row groups of one Parquet file per table"""
+    
+    def __init__(self, output_dir):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+        os.makedirs(output_dir, exist_ok=True)
+        self.pa = pa
+        self.pq = pq
+        self.paths = [os.path.join(output_dir, f'{name}.parquet') for name in TABLE_NAMES]
+        self.writers = [None] * len(TABLE_NAMES)
+    
+    def write(self, chunk):
+        for i, df in enumerate(chunk):
+            if len(df) == 0:
+                continue
+            table = self.pa.Table.from_pandas(df, preserve_index=False)
+            if self.writers[i] is None:
+                self.writers[i] = self.pq.ParquetWriter(self.paths[i], table.schema)
+            else:
+                # Columns that are entirely null in a chunk are inferred with a different type
+                table = table.cast(self.writers[i].schema)
+            self.writers[i].write_table(table)
+    
+    def close(self):
+        for writer in self.writers:
+            if writer is not None:
+                writer.close()
+
+def stream_patients(num_records, dists, output_dir, start_id=1, append=False,
+                    chunk_size=STREAM_CHUNK_SIZE, workers=None, file_format='csv', seed=RANDOM_SEED):
+    """Generate patients in chunks across a process pool and stream them to disk
+    
+    Each chunk gets an independent RNG stream spawned from ``seed`` and a
+    contiguous patient_id range. Chunks are written in order as they finish,
+    with at most two chunks per worker in flight, so memory use does not
+    grow with ``num_records``.
+    
+    Args:
+        num_records: Number of patients to generate
+        dists: Distributions from analyze_distributions()
+        output_dir: Directory for the output files
+        start_id: patient_id of the first generated patient
+        append: Append to existing CSV files
+        chunk_size: Patients per chunk
+        workers: Number of worker processes (default: CPU count)
+        file_format: 'csv' or 'parquet'
+        seed: Root seed; the same seed, chunk size and arguments give the same data
+    
+    Returns:
+        Number of patients written
+    """
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown output format '{file_format}', expected 'csv' or 'parquet'")
+    if file_format == 'parquet' and append:
+        raise ValueError("Parquet output cannot be appended to existing files")
+    
+    workers = workers or os.cpu_count() or 1
+    num_chunks = (num_records + chunk_size - 1) // chunk_size
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_chunks)
+    name_pool = create_name_pool(seed=seed)
+    
+    print(f"\nStreaming {num_records} patient records to '{output_dir}' "
+          f"({num_chunks} chunks of {chunk_size}, {workers} workers, {file_format})...")
+    
+    writer = CsvChunkWriter(output_dir, append) if file_format == 'csv' else ParquetChunkWriter(output_dir)
+    written = 0
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_stream_worker,
+                                 initargs=(dists, name_pool)) as executor:
+            pending = deque()
+            for index in range(num_chunks):
+                chunk_records = min(chunk_size, num_records - index * chunk_size)
+                pending.append((chunk_records, executor.submit(
+                    _generate_chunk, start_id + index * chunk_size, chunk_records,
+                    seed_sequences[index], file_format
+                )))
+                
+                # Write finished chunks in order, bounding the chunks held in memory
+                while pending and (len(pending) >= 2 * workers or index == num_chunks - 1):
+                    chunk_records, future = pending.popleft()
+                    writer.write(future.result())
+                    written += chunk_records
+                    elapsed = time.perf_counter() - start_time
+                    print(f"  Written {written}/{num_records} records "
+                          f"({written / max(elapsed, 1e-6):,.0f} records/sec)")
+    finally:
+        writer.close()
+    
+    return written
 
 def display_statistics(patients_df, physical_df, lifestyle_df, 
                        socioeconomic_df, medical_history_df, lab_results_df):
@@ -680,8 +784,30 @@ def display_statistics(patients_df, physical_df, lifestyle_df,
 
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Generate extended synthetic patient dataset")
+    parser.add_argument("--target-count", type=int, default=50000,
+                        help="Total number of patients after generation (default: 50000)")
+    parser.add_argument("--num-records", type=int, default=None,
+                        help="Number of patients to generate (overrides --target-count)")
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED,
+                        help=f"Random seed (default: {RANDOM_SEED})")
+    parser.add_argument("--output-dir", type=str, default=None,
+                        help="Write a new dataset to this directory instead of appending to OUTPUT_DIR")
+    parser.add_argument("--stream", action="store_true",
+                        help="Generate in chunks across a process pool and write each chunk directly to disk")
+    parser.add_argument("--chunk-size", type=int, default=STREAM_CHUNK_SIZE,
+                        help=f"Patients per chunk in streaming mode (default: {STREAM_CHUNK_SIZE})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes in streaming mode (default: CPU count)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="Output format in streaming mode (parquet requires --output-dir)")
+    args = parser.parse_args()
+    
+    if args.format == "parquet" and (not args.stream or not args.output_dir):
+        parser.error("--format parquet requires --stream and --output-dir")
+    
     print("=" * 60)
-    print("Extended Dataset Generator (up to 50000 records)")
+    print(f"Extended Dataset Generator (up to {args.num_records or args.target_count} records)")
     print("=" * 60)
     
     # Load existing data
@@ -705,8 +831,17 @@ def main():
         return
     
     # Determine how many records to generate
-    existing_count = len(patients_df)
-    target_count = 50000
+    if args.output_dir:
+        # New dataset in a separate directory
+        existing_count = 0
+        target_count = args.num_records or args.target_count
+        output_dir = args.output_dir
+    else:
+        # Append to the existing dataset
+        existing_count = len(patients_df)
+        target_count = existing_count + args.num_records if args.num_records else args.target_count
+        output_dir = OUTPUT_DIR
+    append = existing_count > 0
     records_to_generate = target_count - existing_count
     
     if records_to_generate <= 0:
@@ -717,12 +852,32 @@ def main():
     print(f"Target records: {target_count}")
     print(f"Records to generate: {records_to_generate}")
     
+    if args.stream:
+        try:
+            start_time = time.perf_counter()
+            written = stream_patients(
+                records_to_generate, dists, output_dir, start_id=existing_count + 1, append=append,
+                chunk_size=args.chunk_size, workers=args.workers, file_format=args.format, seed=args.seed
+            )
+            duration = time.perf_counter() - start_time
+            print(f"\nStreamed {written} records to '{output_dir}' in {duration:.2f}s "
+                  f"({written / max(duration, 1e-6):,.0f} records/sec)")
+        except Exception as e:
+            print(f"Error generating data: {e}")
+            import traceback
+            traceback.print_exc()
+        return
+    
     # Generate new records
     try:
+        start_time = time.perf_counter()
         (new_patients_df, new_physical_df, new_lifestyle_df,
          new_socioeconomic_df, new_medical_history_df, new_lab_results_df) = generate_patients(
-            records_to_generate, dists, start_id=existing_count + 1
+            records_to_generate, dists, start_id=existing_count + 1, seed=args.seed
         )
+        duration = time.perf_counter() - start_time
+        print(f"Generated {records_to_generate} records in {duration:.2f}s "
+              f"({records_to_generate / max(duration, 1e-6):,.0f} records/sec)")
     except Exception as e:
         print(f"Error generating data: {e}")
         import traceback
@@ -733,7 +888,7 @@ def main():
     try:
         save_to_csv(new_patients_df, new_physical_df, new_lifestyle_df,
                    new_socioeconomic_df, new_medical_history_df, new_lab_results_df,
-                   append=True)
+                   append=append, output_dir=output_dir)
         display_statistics(new_patients_df, new_physical_df, new_lifestyle_df,
                           new_socioeconomic_df, new_medical_history_df, new_lab_results_df)
     except Exception as e:
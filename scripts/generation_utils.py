@@ -0,0 +1,38 @@
+"""
+Vectorized sampling helpers shared by the synthetic data generators
+(generate_extended_data.py and load_and_enrich_insurance_data.py)
+"""
+import numpy as np
+import pandas as pd
+
+
+def choice(rng, options, probabilities, size):
+    """Draw ``size`` values from ``options`` with the given probabilities"""
+    options = np.asarray(list(options))
+    return options[rng.choice(len(options), size=size, p=np.asarray(list(probabilities), dtype=float))]
+
+
+def choice_by_mask(rng, options, probabilities_by_mask, size):
+    """Draw values where each boolean mask selects its own probabilities
+
+    Rows not selected by any mask are left as None.
+    """
+    result = np.full(size, None, dtype=object)
+    for mask, probabilities in probabilities_by_mask:
+        result[mask] = choice(rng, options, probabilities, int(mask.sum()))
+    return result
+
+
+def uniform_by_level(rng, levels, ranges):
+    """Uniform draw per row from the (min, max) range of its level"""
+    low = np.array([ranges[level][0] for level in ranges], dtype=float)
+    high = np.array([ranges[level][1] for level in ranges], dtype=float)
+    index = pd.Categorical(levels, categories=list(ranges)).codes
+    return rng.uniform(low[index], high[index])
+
+
+def years_since_diagnosis(rng, max_years):
+    """Whole years since diagnosis, from 1 up to ``max_years`` (at least 1)"""
+    # Generator.uniform rejects high < low, e.g. diagnosis years for an 18-year-old
+    upper = np.maximum(max_years, 1)
+    return np.maximum(1, rng.uniform(1, upper, len(upper)).astype(int))
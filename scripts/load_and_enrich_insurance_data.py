@@ -9,7 +9,9 @@ from sqlalchemy import create_engine, text
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
-import random
+
+from bulk_loader import BulkLoader
+from generation_utils import choice, choice_by_mask, uniform_by_level, years_since_diagnosis
 
 load_dotenv()
 
@@ -20,8 +22,7 @@ DATABASE_URL = os.getenv(
 )
 
 # Random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+RANDOM_SEED = 42
 
 def download_dataset():
     """Download dataset using kagglehub"""
@@ -53,110 +54,84 @@ def load_insurance_data(path):
     print(f"Loaded {len(df)} records from {csv_file}")
     return df
 
-def calculate_date_of_birth(age):
-    """Calculate date of birth from age"""
-    return datetime.now() - timedelta(days=int(age * 365.25))
+def calculate_date_of_birth(age, now):
+    """Calculate dates of birth from ages"""
+    return pd.Timestamp(now) - pd.to_timedelta((age * 365.25).astype(int), unit='D')
 
-def generate_height_weight_from_bmi(bmi, age, sex):
+def generate_height_weight_from_bmi(rng, bmi, age, male):
     """Generate realistic height and weight from BMI"""
-    # Average heights by age and sex (in cm)
-    if sex == 'male':
-        base_height = 175 + (age - 30) * 0.1  # Slight decrease with age
-        base_height = max(160, min(190, base_height))
-    else:
-        base_height = 162 + (age - 30) * 0.1
-        base_height = max(150, min(180, base_height))
+    # Average heights by age and sex (in cm), slight decrease with age
+    base_height = np.where(
+        male,
+        np.clip(175 + (age - 30) * 0.1, 160, 190),
+        np.clip(162 + (age - 30) * 0.1, 150, 180)
+    )
     
     # Add some variation
-    height_cm = base_height + np.random.normal(0, 5)
-    height_cm = max(140, min(210, height_cm))
+    height_cm = np.clip(base_height + rng.normal(0, 5, len(bmi)), 140, 210)
     
     # Calculate weight from BMI and height
     height_m = height_cm / 100
-    weight_kg = bmi * (height_m ** 2)
-    weight_kg = max(40, min(200, weight_kg))
+    weight_kg = np.clip(bmi * (height_m ** 2), 40, 200)
     
-    return round(height_cm, 2), round(weight_kg, 2)
+    return height_cm.round(2), weight_kg.round(2)
 
-def generate_blood_pressure(age, bmi, smoker):
+def generate_blood_pressure(rng, age, bmi, smoker):
     """Generate realistic blood pressure based on age, BMI, and smoking"""
-    # Base systolic BP increases with age
-    base_systolic = 110 + (age - 18) * 0.5
-    # Higher BMI increases BP
-    base_systolic += (bmi - 25) * 0.8
-    # Smoking increases BP
-    if smoker == 'yes':
-        base_systolic += 5
+    # Base systolic BP increases with age and BMI, smoking increases BP
+    base_systolic = 110 + (age - 18) * 0.5 + (bmi - 25) * 0.8 + smoker * 5
     
-    systolic = base_systolic + np.random.normal(0, 8)
-    systolic = max(90, min(180, int(systolic)))
+    systolic = np.clip(np.trunc(base_systolic + rng.normal(0, 8, len(age))), 90, 180).astype(int)
     
     # Diastolic is typically 60-80% of systolic
-    diastolic = systolic * 0.65 + np.random.normal(0, 5)
-    diastolic = max(60, min(120, int(diastolic)))
+    diastolic = np.clip(np.trunc(systolic * 0.65 + rng.normal(0, 5, len(age))), 60, 120).astype(int)
     
     return systolic, diastolic
 
-def generate_heart_rate(age, physical_activity):
+def generate_heart_rate(rng, age, physical_activity):
     """Generate resting heart rate"""
     # Base heart rate decreases with age
     base_hr = 75 - (age - 18) * 0.1
     # Physical activity lowers resting HR
-    if physical_activity in ['active', 'very_active']:
-        base_hr -= 10
-    elif physical_activity == 'moderate':
-        base_hr -= 5
-    
-    hr = base_hr + np.random.normal(0, 5)
-    hr = max(50, min(100, int(hr)))
-    return hr
+    base_hr = base_hr - np.where(np.isin(physical_activity, ['active', 'very_active']), 10, 0)
+    base_hr = base_hr - np.where(physical_activity == 'moderate', 5, 0)
+    
+    hr = np.trunc(base_hr + rng.normal(0, 5, len(age)))
+    return np.clip(hr, 50, 100).astype(int)
 
-def generate_lab_results(age, sex, bmi, smoker, region):
+def generate_lab_results(rng, age, male, bmi, smoker):
     """Generate realistic laboratory results"""
+    size = len(age)
+    
     # Cholesterol - higher with age, BMI, smoking
-    base_cholesterol = 180 + (age - 18) * 0.5 + (bmi - 25) * 2
-    if smoker == 'yes':
-        base_cholesterol += 15
-    total_cholesterol = base_cholesterol + np.random.normal(0, 20)
-    total_cholesterol = max(100, min(300, round(total_cholesterol, 2)))
+    base_cholesterol = 180 + (age - 18) * 0.5 + (bmi - 25) * 2 + smoker * 15
+    total_cholesterol = np.clip((base_cholesterol + rng.normal(0, 20, size)).round(2), 100, 300)
     
     # LDL (bad cholesterol) - typically 60-70% of total
-    ldl = total_cholesterol * 0.65 + np.random.normal(0, 15)
-    ldl = max(50, min(250, round(ldl, 2)))
+    ldl = np.clip((total_cholesterol * 0.65 + rng.normal(0, 15, size)).round(2), 50, 250)
     
     # HDL (good cholesterol) - higher in women, lower with smoking
-    base_hdl = 50 if sex == 'male' else 60
-    if smoker == 'yes':
-        base_hdl -= 5
-    hdl = base_hdl + np.random.normal(0, 8)
-    hdl = max(30, min(100, round(hdl, 2)))
+    base_hdl = np.where(male, 50, 60) - smoker * 5
+    hdl = np.clip((base_hdl + rng.normal(0, 8, size)).round(2), 30, 100)
     
     # Triglycerides - higher with BMI, smoking
-    base_trig = 100 + (bmi - 25) * 5
-    if smoker == 'yes':
-        base_trig += 20
-    triglycerides = base_trig + np.random.normal(0, 30)
-    triglycerides = max(50, min(400, round(triglycerides, 2)))
+    base_trig = 100 + (bmi - 25) * 5 + smoker * 20
+    triglycerides = np.clip((base_trig + rng.normal(0, 30, size)).round(2), 50, 400)
     
     # Glucose - higher with age, BMI
     base_glucose = 85 + (age - 18) * 0.3 + (bmi - 25) * 0.5
-    glucose = base_glucose + np.random.normal(0, 8)
-    glucose = max(70, min(120, round(glucose, 2)))
+    glucose = np.clip((base_glucose + rng.normal(0, 8, size)).round(2), 70, 120)
     
     # HbA1c - correlates with glucose
-    hba1c = (glucose + 46.7) / 28.7 + np.random.normal(0, 0.2)
-    hba1c = max(4.0, min(6.5, round(hba1c, 2)))
+    hba1c = np.clip(((glucose + 46.7) / 28.7 + rng.normal(0, 0.2, size)).round(2), 4.0, 6.5)
     
     # Creatinine - higher in men, with age
-    base_creatinine = 0.9 if sex == 'male' else 0.7
-    base_creatinine += (age - 18) * 0.005
-    creatinine = base_creatinine + np.random.normal(0, 0.1)
-    creatinine = max(0.5, min(1.5, round(creatinine, 2)))
+    base_creatinine = np.where(male, 0.9, 0.7) + (age - 18) * 0.005
+    creatinine = np.clip((base_creatinine + rng.normal(0, 0.1, size)).round(2), 0.5, 1.5)
     
     # eGFR - decreases with age
     base_egfr = 120 - (age - 18) * 0.8
-    egfr = base_egfr + np.random.normal(0, 10)
-    egfr = max(60, min(120, round(egfr, 2)))
+    egfr = np.clip((base_egfr + rng.normal(0, 10, size)).round(2), 60, 120)
     
     return {
         'total_cholesterol': total_cholesterol,
@@ -169,18 +144,17 @@ def generate_lab_results(age, sex, bmi, smoker, region):
         'egfr': egfr
     }
 
-def generate_lifestyle_data(age, sex, bmi, smoker, children):
+def generate_lifestyle_data(rng, age, bmi, smoker):
     """Generate additional lifestyle data"""
-    # Physical activity - inversely related to BMI, age
-    activity_levels = ['sedentary', 'light', 'moderate', 'active', 'very_active']
-    if bmi > 30:
-        weights = [0.4, 0.3, 0.2, 0.08, 0.02]  # More sedentary
-    elif bmi > 25:
-        weights = [0.2, 0.3, 0.3, 0.15, 0.05]
-    else:
-        weights = [0.1, 0.2, 0.3, 0.3, 0.1]  # More active
+    size = len(age)
     
-    physical_activity = np.random.choice(activity_levels, p=weights)
+    # Physical activity - inversely related to BMI
+    activity_levels = ['sedentary', 'light', 'moderate', 'active', 'very_active']
+    physical_activity = choice_by_mask(rng, activity_levels, [
+        (bmi > 30, [0.4, 0.3, 0.2, 0.08, 0.02]),  # More sedentary
+        ((bmi > 25) & (bmi <= 30), [0.2, 0.3, 0.3, 0.15, 0.05]),
+        (bmi <= 25, [0.1, 0.2, 0.3, 0.3, 0.1])  # More active
+    ], size)
     
     # Exercise hours - based on activity level
     exercise_hours_map = {
@@ -190,8 +164,7 @@ def generate_lifestyle_data(age, sex, bmi, smoker, children):
         'active': (5, 8),
         'very_active': (8, 15)
     }
-    min_hours, max_hours = exercise_hours_map[physical_activity]
-    exercise_hours = round(np.random.uniform(min_hours, max_hours), 2)
+    exercise_hours = uniform_by_level(rng, physical_activity, exercise_hours_map).round(2)
     
     # Steps per day
     steps_map = {
@@ -201,52 +174,38 @@ def generate_lifestyle_data(age, sex, bmi, smoker, children):
         'active': (10000, 15000),
         'very_active': (15000, 25000)
     }
-    min_steps, max_steps = steps_map[physical_activity]
-    steps_per_day = int(np.random.uniform(min_steps, max_steps))
+    steps_per_day = uniform_by_level(rng, physical_activity, steps_map).astype(int)
     
-    # Alcohol consumption
+    # Alcohol consumption - smokers more likely to drink
     alcohol_levels = ['none', 'occasional', 'moderate', 'heavy']
-    if smoker == 'yes':
-        # Smokers more likely to drink
-        weights = [0.2, 0.3, 0.4, 0.1]
-    else:
-        weights = [0.3, 0.4, 0.25, 0.05]
-    alcohol_consumption = np.random.choice(alcohol_levels, p=weights)
+    alcohol_consumption = choice_by_mask(rng, alcohol_levels, [
+        (smoker, [0.2, 0.3, 0.4, 0.1]),
+        (~smoker, [0.3, 0.4, 0.25, 0.05])
+    ], size)
     
     drinks_per_week = {
-        'none': 0,
+        'none': (0, 0),
         'occasional': (1, 3),
         'moderate': (4, 7),
         'heavy': (8, 20)
     }
-    if alcohol_consumption == 'none':
-        drinks = 0
-    else:
-        min_drinks, max_drinks = drinks_per_week[alcohol_consumption]
-        drinks = int(np.random.uniform(min_drinks, max_drinks))
+    drinks = uniform_by_level(rng, alcohol_consumption, drinks_per_week).astype(int)
     
     # Diet type
     diet_types = ['omnivore', 'vegetarian', 'vegan', 'pescatarian', 'mediterranean']
-    weights = [0.7, 0.15, 0.05, 0.05, 0.05]
-    diet_type = np.random.choice(diet_types, p=weights)
+    diet_type = choice(rng, diet_types, [0.7, 0.15, 0.05, 0.05, 0.05], size)
     
     # Sleep hours - 7-9 is normal, varies slightly
-    sleep_hours = round(np.random.normal(7.5, 1.0), 1)
-    sleep_hours = max(5, min(10, sleep_hours))
+    sleep_hours = np.clip(rng.normal(7.5, 1.0, size).round(1), 5, 10)
     
     # Sleep quality
-    sleep_quality = np.random.choice(['poor', 'fair', 'good', 'excellent'], 
-                                     p=[0.15, 0.25, 0.45, 0.15])
+    sleep_quality = choice(rng, ['poor', 'fair', 'good', 'excellent'],
+                            [0.15, 0.25, 0.45, 0.15], size)
     
     # Smoking details if smoker
-    if smoker == 'yes':
-        years_smoking = max(1, age - 18 - np.random.randint(0, 5))
-        cigarettes_per_day = int(np.random.uniform(5, 30))
-        pack_years = round((cigarettes_per_day / 20) * years_smoking, 2)
-    else:
-        years_smoking = 0
-        cigarettes_per_day = 0
-        pack_years = 0.0
+    years_smoking = np.where(smoker, np.maximum(1, age - 18 - rng.integers(0, 5, size)), 0)
+    cigarettes_per_day = np.where(smoker, rng.uniform(5, 30, size).astype(int), 0)
+    pack_years = ((cigarettes_per_day / 20) * years_smoking).round(2)
     
     return {
         'physical_activity_level': physical_activity,
@@ -262,34 +221,28 @@ def generate_lifestyle_data(age, sex, bmi, smoker, children):
         'pack_years': pack_years
     }
 
-def generate_socioeconomic_data(age, region, children):
+def generate_socioeconomic_data(rng, age, children):
     """Generate socioeconomic data"""
+    size = len(age)
+    
     # Employment status
-    if age < 18:
-        employment_status = 'student'
-    elif age < 65:
-        employment_status = np.random.choice(
-            ['employed', 'unemployed', 'student'],
-            p=[0.85, 0.1, 0.05]
-        )
-    else:
-        employment_status = np.random.choice(
-            ['retired', 'employed'],
-            p=[0.9, 0.1]
-        )
+    employment_status = choice_by_mask(rng, ['employed', 'unemployed', 'student', 'retired'], [
+        ((age >= 18) & (age < 65), [0.85, 0.1, 0.05, 0]),
+        (age >= 65, [0.1, 0, 0, 0.9])
+    ], size)
+    employment_status[age < 18] = 'student'
     
     # Education level
     education_levels = [
         'less_than_high_school', 'high_school', 'some_college',
         'bachelor', 'master', 'doctorate'
     ]
-    if age < 25:
-        weights = [0.1, 0.3, 0.4, 0.15, 0.04, 0.01]
-    else:
-        weights = [0.15, 0.25, 0.25, 0.25, 0.08, 0.02]
-    education_level = np.random.choice(education_levels, p=weights)
+    education_level = choice_by_mask(rng, education_levels, [
+        (age < 25, [0.1, 0.3, 0.4, 0.15, 0.04, 0.01]),
+        (age >= 25, [0.15, 0.25, 0.25, 0.25, 0.08, 0.02])
+    ], size)
     
-    # Income - correlates with education and age
+    # Income - correlates with education and age (increases up to 50)
     income_base = {
         'less_than_high_school': 25000,
         'high_school': 35000,
@@ -298,67 +251,50 @@ def generate_socioeconomic_data(age, region, children):
         'master': 85000,
         'doctorate': 120000
     }
-    base_income = income_base[education_level]
-    # Income increases with age (up to 50)
-    if age < 50:
-        age_multiplier = 1 + (age - 25) * 0.02
-    else:
-        age_multiplier = 1.5
-    annual_income = base_income * age_multiplier * np.random.uniform(0.8, 1.3)
-    annual_income = max(10000, round(annual_income, 2))
+    base_income = pd.Series(education_level).map(income_base).to_numpy(dtype=float)
+    age_multiplier = np.where(age < 50, 1 + (age - 25) * 0.02, 1.5)
+    annual_income = base_income * age_multiplier * rng.uniform(0.8, 1.3, size)
+    annual_income = np.maximum(10000, annual_income.round(2))
     
     # Housing type
-    if annual_income > 50000:
-        housing_weights = [0.7, 0.25, 0.05]  # More owned
-    else:
-        housing_weights = [0.3, 0.6, 0.1]  # More rented
-    housing_type = np.random.choice(['owned', 'rented', 'other'], p=housing_weights)
+    high_income = annual_income > 50000
+    housing_type = choice_by_mask(rng, ['owned', 'rented', 'other'], [
+        (high_income, [0.7, 0.25, 0.05]),  # More owned
+        (~high_income, [0.3, 0.6, 0.1])  # More rented
+    ], size)
     
-    # Household size
-    household_size = 1 + children + (1 if np.random.random() > 0.3 else 0)  # Partner
-    household_size = max(1, min(8, household_size))
+    # Household size (partner with probability 0.7)
+    household_size = np.clip(1 + children + (rng.random(size) > 0.3), 1, 8)
     
     # Insurance type
-    if employment_status == 'employed':
-        insurance_type = np.random.choice(
-            ['employer', 'individual'],
-            p=[0.8, 0.2]
-        )
-    else:
-        insurance_type = np.random.choice(
-            ['individual', 'medicare', 'medicaid', 'uninsured'],
-            p=[0.3, 0.2, 0.3, 0.2]
-        )
+    employed = employment_status == 'employed'
+    insurance_type = choice_by_mask(rng, ['employer', 'individual', 'medicare', 'medicaid', 'uninsured'], [
+        (employed, [0.8, 0.2, 0, 0, 0]),
+        (~employed, [0, 0.3, 0.2, 0.3, 0.2])
+    ], size)
     
     # Insurance plan details
-    if insurance_type != 'uninsured':
-        plan_types = ['HMO', 'PPO', 'EPO', 'POS', 'HDHP']
-        insurance_plan_type = np.random.choice(plan_types, p=[0.3, 0.4, 0.1, 0.1, 0.1])
-        
-        # Deductible based on plan type
-        deductible_map = {
-            'HMO': (500, 2000),
-            'PPO': (1000, 5000),
-            'EPO': (1000, 4000),
-            'POS': (1500, 6000),
-            'HDHP': (2000, 7000)
-        }
-        min_ded, max_ded = deductible_map[insurance_plan_type]
-        deductible = round(np.random.uniform(min_ded, max_ded), 2)
-        
-        copay_amount = round(np.random.uniform(20, 50), 2)
-        out_of_pocket_max = round(deductible * 2.5, 2)
-    else:
-        insurance_plan_type = None
-        deductible = None
-        copay_amount = None
-        out_of_pocket_max = None
+    insured = insurance_type != 'uninsured'
+    plan_types = ['HMO', 'PPO', 'EPO', 'POS', 'HDHP']
+    insurance_plan_type = choice_by_mask(rng, plan_types, [
+        (insured, [0.3, 0.4, 0.1, 0.1, 0.1])
+    ], size)
+    
+    # Deductible based on plan type
+    deductible_map = {
+        'HMO': (500, 2000),
+        'PPO': (1000, 5000),
+        'EPO': (1000, 4000),
+        'POS': (1500, 6000),
+        'HDHP': (2000, 7000)
+    }
+    deductible = np.full(size, np.nan)
+    deductible[insured] = uniform_by_level(rng, insurance_plan_type[insured], deductible_map).round(2)
+    copay_amount = np.where(insured, rng.uniform(20, 50, size).round(2), np.nan)
+    out_of_pocket_max = (deductible * 2.5).round(2)
     
     # Residential area
-    residential_area = np.random.choice(
-        ['urban', 'suburban', 'rural'],
-        p=[0.4, 0.45, 0.15]
-    )
+    residential_area = choice(rng, ['urban', 'suburban', 'rural'], [0.4, 0.45, 0.15], size)
     
     return {
         'employment_status': employment_status,
@@ -372,176 +308,167 @@ def generate_socioeconomic_data(age, region, children):
         'copay_amount': copay_amount,
         'out_of_pocket_max': out_of_pocket_max,
         'residential_area': residential_area,
-        'years_with_insurance': max(1, int(np.random.uniform(1, 20))),
-        'coverage_gaps': int(np.random.exponential(0.5)),
-        'total_days_without_insurance': int(np.random.exponential(30))
+        'years_with_insurance': np.maximum(1, rng.uniform(1, 20, size).astype(int)),
+        'coverage_gaps': rng.exponential(0.5, size).astype(int),
+        'total_days_without_insurance': rng.exponential(30, size).astype(int)
     }
 
-def generate_medical_history(age, bmi, smoker):
-    """Generate medical history based on risk factors"""
-    conditions = []
+def generate_medical_history(rng, patient_ids, age, bmi, smoker, now):
+    """Generate medical history based on risk factors (zero or more conditions per patient)"""
+    size = len(age)
+    frames = []
+    
+    def add_conditions(risk, condition_type, condition_name, severities, severity_weights,
+                       max_years, controlled_threshold):
+        has_condition = rng.random(size) < risk
+        count = int(has_condition.sum())
+        years = years_since_diagnosis(rng, max_years[has_condition])
+        frames.append(pd.DataFrame({
+            'patient_id': patient_ids[has_condition],
+            'condition_type': condition_type,
+            'condition_name': condition_name,
+            'severity': choice(rng, severities, severity_weights, count),
+            'years_since_diagnosis': years,
+            'medication_controlled': rng.random(count) > controlled_threshold,
+            'diagnosis_date': pd.Timestamp(now) - pd.to_timedelta(years * 365, unit='D'),
+            'created_at': now
+        }))
     
     # Diabetes risk increases with age, BMI
     diabetes_risk = 0.01 + (age - 18) * 0.001 + (bmi - 25) * 0.01
-    if np.random.random() < diabetes_risk:
-        years = max(1, int(np.random.uniform(1, age - 18)))
-        conditions.append({
-            'condition_type': 'diabetes',
-            'condition_name': 'Type 2 Diabetes',
-            'severity': np.random.choice(['mild', 'moderate', 'severe'], p=[0.5, 0.4, 0.1]),
-            'years_since_diagnosis': years,
-            'medication_controlled': np.random.random() > 0.3
-        })
+    add_conditions(diabetes_risk, 'diabetes', 'Type 2 Diabetes',
+                   ['mild', 'moderate', 'severe'], [0.5, 0.4, 0.1], age - 18, 0.3)
     
     # Hypertension risk
-    hypertension_risk = 0.05 + (age - 18) * 0.002 + (bmi - 25) * 0.01
-    if smoker == 'yes':
-        hypertension_risk += 0.1
-    if np.random.random() < hypertension_risk:
-        years = max(1, int(np.random.uniform(1, age - 18)))
-        conditions.append({
-            'condition_type': 'hypertension',
-            'condition_name': 'Hypertension',
-            'severity': np.random.choice(['mild', 'moderate'], p=[0.7, 0.3]),
-            'years_since_diagnosis': years,
-            'medication_controlled': np.random.random() > 0.2
-        })
+    hypertension_risk = 0.05 + (age - 18) * 0.002 + (bmi - 25) * 0.01 + smoker * 0.1
+    add_conditions(hypertension_risk, 'hypertension', 'Hypertension',
+                   ['mild', 'moderate'], [0.7, 0.3], age - 18, 0.2)
     
     # Heart disease (lower probability)
-    heart_disease_risk = 0.01 + (age - 40) * 0.002 if age > 40 else 0.001
-    if smoker == 'yes':
-        heart_disease_risk *= 2
-    if np.random.random() < heart_disease_risk:
-        years = max(1, int(np.random.uniform(1, max(1, age - 40))))
-        conditions.append({
-            'condition_type': 'heart_disease',
-            'condition_name': 'Coronary Artery Disease',
-            'severity': np.random.choice(['mild', 'moderate', 'severe'], p=[0.6, 0.3, 0.1]),
-            'years_since_diagnosis': years,
-            'medication_controlled': np.random.random() > 0.4
-        })
+    heart_disease_risk = np.where(age > 40, 0.01 + (age - 40) * 0.002, 0.001) * np.where(smoker, 2, 1)
+    add_conditions(heart_disease_risk, 'heart_disease', 'Coronary Artery Disease',
+                   ['mild', 'moderate', 'severe'], [0.6, 0.3, 0.1], np.maximum(1, age - 40), 0.4)
     
-    return conditions
+    # Conditions of a patient stay together, in the order they were generated
+    return pd.concat(frames, ignore_index=True).sort_values('patient_id', kind='stable', ignore_index=True)
 
-def transform_data(df):
-    """Transform and enrich dataset"""
+def transform_data(df, seed=RANDOM_SEED):
+    """Transform and enrich dataset
+    
+    Each derived table is computed column-wise with array operations on a
+    seeded np.random.Generator, so the cost grows linearly with the number
+    of rows and the same input and seed give the same output.
+    
+    Args:
+        df: Kaggle insurance rows (age, sex, bmi, children, smoker, region, charges)
+        seed: Random seed
+    
+    Returns:
+        Tuple of patients, physical measurements, lifestyle, socioeconomic,
+        medical history and lab results DataFrames. patient_id is the row
+        number (1-based) and is replaced with database IDs on insert.
+    """
     print("\nTransforming and enriching data...")
     
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    size = len(df)
+    patient_ids = np.arange(1, size + 1)
+    
+    age = df['age'].to_numpy().astype(int)
+    sex = df['sex'].str.lower().to_numpy()
+    bmi = df['bmi'].to_numpy(dtype=float)
+    smoker = (df['smoker'] == 'yes').to_numpy()
+    children = df['children'].to_numpy().astype(int)
+    charges = df['charges'].to_numpy(dtype=float)
+    male = sex == 'male'
+    
+    # Generate additional data
+    height_cm, weight_kg = generate_height_weight_from_bmi(rng, bmi, age, male)
+    systolic_bp, diastolic_bp = generate_blood_pressure(rng, age, bmi, smoker)
+    lab_results = generate_lab_results(rng, age, male, bmi, smoker)
+    lifestyle = generate_lifestyle_data(rng, age, bmi, smoker)
+    socioeconomic = generate_socioeconomic_data(rng, age, children)
+    medical_history_df = generate_medical_history(rng, patient_ids, age, bmi, smoker, now)
+    heart_rate = generate_heart_rate(rng, age, lifestyle['physical_activity_level'])
+    
     # Patients table
-    patients = []
-    physical_measurements = []
-    lifestyle_records = []
-    socioeconomic_records = []
-    medical_history_records = []
-    lab_results_records = []
-    
-    for idx, row in df.iterrows():
-        age = int(row['age'])
-        sex = row['sex'].lower()
-        bmi = float(row['bmi'])
-        smoker = row['smoker']
-        children = int(row['children'])
-        region = row['region'].lower()
-        charges = float(row['charges'])
-        
-        # Generate additional data
-        height_cm, weight_kg = generate_height_weight_from_bmi(bmi, age, sex)
-        systolic_bp, diastolic_bp = generate_blood_pressure(age, bmi, smoker)
-        heart_rate = generate_heart_rate(age, 'moderate')  # Will be updated with lifestyle
-        lab_results = generate_lab_results(age, sex, bmi, smoker, region)
-        lifestyle = generate_lifestyle_data(age, sex, bmi, smoker, children)
-        socioeconomic = generate_socioeconomic_data(age, region, children)
-        medical_history = generate_medical_history(age, bmi, smoker)
-        
-        # Update heart rate based on actual activity level
-        heart_rate = generate_heart_rate(age, lifestyle['physical_activity_level'])
-        
-        # Patient record
-        patients.append({
-            'institution_id': 1,
-            'created_by': 1,
-            'first_name': 'Patient',
-            'last_name': f"{idx + 1:04d}",
-            'date_of_birth': calculate_date_of_birth(age),
-            'sex': sex,
-            'marital_status': 'single' if children == 0 else 'married',
-            'number_of_dependents': children,
-            'insurance_cost': charges,
-            'created_at': datetime.now(),
-            'updated_at': datetime.now()
-        })
-        
-        # Physical measurements
-        physical_measurements.append({
-            'patient_id': idx + 1,  # Will be updated after insert
-            'height_cm': height_cm,
-            'weight_kg': weight_kg,
-            'bmi': bmi,
-            'body_fat_percentage': round(1.2 * bmi + 0.23 * age - 10.8 - 5.4 if sex == 'male' else 1.2 * bmi + 0.23 * age - 5.4, 2),
-            'waist_circumference': round(0.5 * height_cm + np.random.normal(0, 5), 2),
-            'hip_circumference': round(0.6 * height_cm + np.random.normal(0, 5), 2),
-            'systolic_bp': systolic_bp,
-            'diastolic_bp': diastolic_bp,
-            'resting_heart_rate': heart_rate,
-            'max_heart_rate': 220 - age,
-            'measured_at': datetime.now(),
-            'updated_at': datetime.now()
-        })
-        
-        # Lifestyle
-        lifestyle_records.append({
-            'patient_id': idx + 1,
-            'smoking_status': 'current' if smoker == 'yes' else 'never',
-            'years_smoking': lifestyle['years_smoking'],
-            'cigarettes_per_day': lifestyle['cigarettes_per_day'],
-            'pack_years': lifestyle['pack_years'],
-            'alcohol_consumption': lifestyle['alcohol_consumption'],
-            'drinks_per_week': lifestyle['drinks_per_week'],
-            'drinking_frequency': 'weekly' if lifestyle['drinks_per_week'] > 0 else 'never',
-            'physical_activity_level': lifestyle['physical_activity_level'],
-            'exercise_hours_per_week': lifestyle['exercise_hours_per_week'],
-            'steps_per_day': lifestyle['steps_per_day'],
-            'diet_type': lifestyle['diet_type'],
-            'sleep_hours_per_night': lifestyle['sleep_hours_per_night'],
-            'sleep_quality': lifestyle['sleep_quality'],
-            'updated_at': datetime.now()
-        })
-        
-        # Socioeconomic
-        socioeconomic_records.append({
-            'patient_id': idx + 1,
-            **socioeconomic,
-            'updated_at': datetime.now()
-        })
-        
-        # Medical history
-        for condition in medical_history:
-            medical_history_records.append({
-                'patient_id': idx + 1,
-                **condition,
-                'diagnosis_date': datetime.now() - timedelta(days=condition['years_since_diagnosis'] * 365),
-                'created_at': datetime.now()
-            })
-        
-        # Lab results
-        lab_results_records.append({
-            'patient_id': idx + 1,
-            'test_date': datetime.now() - timedelta(days=np.random.randint(0, 365)),
-            'test_type': 'comprehensive',
-            **lab_results,
-            'created_at': datetime.now()
-        })
-        
-        if (idx + 1) % 100 == 0:
-            print(f"  Processed {idx + 1}/{len(df)} records...")
+    patients_df = pd.DataFrame({
+        'institution_id': 1,
+        'created_by': 1,
+        'first_name': 'Patient',
+        'last_name': pd.Series(patient_ids).map('{:04d}'.format).to_numpy(),
+        'date_of_birth': calculate_date_of_birth(age, now),
+        'sex': sex,
+        'marital_status': np.where(children == 0, 'single', 'married'),
+        'number_of_dependents': children,
+        'insurance_cost': charges,
+        'created_at': now,
+        'updated_at': now
+    })
+    
+    # Physical measurements
+    body_fat = 1.2 * bmi + 0.23 * age - 5.4 - np.where(male, 10.8, 0)
+    physical_df = pd.DataFrame({
+        'patient_id': patient_ids,  # Will be updated after insert
+        'height_cm': height_cm,
+        'weight_kg': weight_kg,
+        'bmi': bmi,
+        'body_fat_percentage': body_fat.round(2),
+        'waist_circumference': (0.5 * height_cm + rng.normal(0, 5, size)).round(2),
+        'hip_circumference': (0.6 * height_cm + rng.normal(0, 5, size)).round(2),
+        'systolic_bp': systolic_bp,
+        'diastolic_bp': diastolic_bp,
+        'resting_heart_rate': heart_rate,
+        'max_heart_rate': 220 - age,
+        'measured_at': now,
+        'updated_at': now
+    })
+    
+    # Lifestyle
+    lifestyle_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        'smoking_status': np.where(smoker, 'current', 'never'),
+        'years_smoking': lifestyle['years_smoking'],
+        'cigarettes_per_day': lifestyle['cigarettes_per_day'],
+        'pack_years': lifestyle['pack_years'],
+        'alcohol_consumption': lifestyle['alcohol_consumption'],
+        'drinks_per_week': lifestyle['drinks_per_week'],
+        'drinking_frequency': np.where(lifestyle['drinks_per_week'] > 0, 'weekly', 'never'),
+        'physical_activity_level': lifestyle['physical_activity_level'],
+        'exercise_hours_per_week': lifestyle['exercise_hours_per_week'],
+        'steps_per_day': lifestyle['steps_per_day'],
+        'diet_type': lifestyle['diet_type'],
+        'sleep_hours_per_night': lifestyle['sleep_hours_per_night'],
+        'sleep_quality': lifestyle['sleep_quality'],
+        'updated_at': now
+    })
+    
+    # Socioeconomic
+    socioeconomic_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        **socioeconomic,
+        'updated_at': now
+    })
+    
+    # Lab results
+    lab_results_df = pd.DataFrame({
+        'patient_id': patient_ids,
+        'test_date': pd.Timestamp(now) - pd.to_timedelta(rng.integers(0, 365, size), unit='D'),
+        'test_type': 'comprehensive',
+        **lab_results,
+        'created_at': now
+    })
+    
+    print(f"  Processed {size} records")
     
     return (
-        pd.DataFrame(patients),
-        pd.DataFrame(physical_measurements),
-        pd.DataFrame(lifestyle_records),
-        pd.DataFrame(socioeconomic_records),
-        pd.DataFrame(medical_history_records),
-        pd.DataFrame(lab_results_records)
+        patients_df,
+        physical_df,
+        lifestyle_df,
+        socioeconomic_df,
+        medical_history_df,
+        lab_results_df
     )
 
 def insert_data(engine, patients_df, physical_df, lifestyle_df, 
@@ -549,54 +476,21 @@ def insert_data(engine, patients_df, physical_df, lifestyle_df,
     """Insert data into database"""
     print("\nInserting data into database...")
     
-    # Insert patients
-    print(f"Inserting {len(patients_df)} patients...")
-    patients_df.to_sql('patients', engine, if_exists='append', index=False, method='multi')
-    
-    # Get inserted patient IDs
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT id FROM patients 
-            ORDER BY id DESC 
-            LIMIT :limit
-        """), {'limit': len(patients_df)})
-        patient_ids = [row[0] for row in result]
-        patient_ids.reverse()
-    
-    print(f"Got patient IDs: {patient_ids[0]} to {patient_ids[-1]}")
-    
-    # Update dataframes with patient IDs
-    physical_df['patient_id'] = patient_ids
-    lifestyle_df['patient_id'] = patient_ids
-    socioeconomic_df['patient_id'] = patient_ids
-    medical_history_df['patient_id'] = patient_ids
-    lab_results_df['patient_id'] = patient_ids
-    
-    # Insert physical measurements
-    print(f"Inserting {len(physical_df)} physical measurements...")
-    physical_df.to_sql('patient_physical_measurements', engine, if_exists='append', 
-                       index=False, method='multi')
-    
-    # Insert lifestyle
-    print(f"Inserting {len(lifestyle_df)} lifestyle records...")
-    lifestyle_df.to_sql('patient_lifestyle', engine, if_exists='append', 
-                        index=False, method='multi')
-    
-    # Insert socioeconomic
-    print(f"Inserting {len(socioeconomic_df)} socioeconomic records...")
-    socioeconomic_df.to_sql('patient_socioeconomic', engine, if_exists='append', 
-                            index=False, method='multi')
-    
-    # Insert medical history
-    if len(medical_history_df) > 0:
-        print(f"Inserting {len(medical_history_df)} medical history records...")
-        medical_history_df.to_sql('patient_medical_history', engine, if_exists='append', 
-                                   index=False, method='multi')
-    
-    # Insert lab results
-    print(f"Inserting {len(lab_results_df)} lab results...")
-    lab_results_df.to_sql('patient_lab_results', engine, if_exists='append', 
-                          index=False, method='multi')
+    # Patients and child tables are loaded in batches with COPY; child rows
+    # get the patient IDs reserved for their batch
+    loader = BulkLoader(engine)
+    patient_ids = loader.load(patients_df, [
+        ('patient_physical_measurements', physical_df),
+        ('patient_lifestyle', lifestyle_df),
+        ('patient_socioeconomic', socioeconomic_df),
+        ('patient_medical_history', medical_history_df),
+        ('patient_lab_results', lab_results_df)
+    ])
+    
+    print(f"Got patient IDs: {patient_ids.min()} to {patient_ids.max()}")
+    print(f"  {len(physical_df)} physical measurements, {len(lifestyle_df)} lifestyle records, "
+          f"{len(socioeconomic_df)} socioeconomic records, {len(medical_history_df)} medical history records, "
+          f"{len(lab_results_df)} lab results")
     
     print("\nData insertion completed successfully!")
 
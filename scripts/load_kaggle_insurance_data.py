@@ -9,6 +9,8 @@ from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 
+from bulk_loader import BulkLoader
+
 load_dotenv()
 
 # Database connection
@@ -117,37 +119,16 @@ def insert_data(engine, patients_df, physical_df, lifestyle_df, socioeconomic_df
     """Insert data into database"""
     print("\nInserting data into database...")
     
-    # Insert patients
-    print(f"Inserting {len(patients_df)} patients...")
-    patients_df.to_sql('patients', engine, if_exists='append', index=False, method='multi')
-    
-    # Get inserted patient IDs
-    with engine.connect() as conn:
-        result = conn.execute(text("""
-            SELECT id FROM patients 
-            ORDER BY id DESC 
-            LIMIT :limit
-        """), {'limit': len(patients_df)})
-        patient_ids = [row[0] for row in result]
-        patient_ids.reverse()  # Reverse to match order
-    
-    # Update dataframes with patient IDs
-    physical_df['patient_id'] = patient_ids
-    lifestyle_df['patient_id'] = patient_ids
-    socioeconomic_df['patient_id'] = patient_ids
-    
-    # Insert physical measurements
-    print(f"Inserting {len(physical_df)} physical measurements...")
-    physical_df.to_sql('patient_physical_measurements', engine, if_exists='append', index=False, method='multi')
-    
-    # Insert lifestyle
-    print(f"Inserting {len(lifestyle_df)} lifestyle records...")
-    lifestyle_df.to_sql('patient_lifestyle', engine, if_exists='append', index=False, method='multi')
-    
-    # Insert socioeconomic
-    print(f"Inserting {len(socioeconomic_df)} socioeconomic records...")
-    socioeconomic_df.to_sql('patient_socioeconomic', engine, if_exists='append', index=False, method='multi')
+    # Patients and child tables are loaded in batches with COPY; child rows
+    # get the patient IDs reserved for their batch
+    loader = BulkLoader(engine)
+    patient_ids = loader.load(patients_df, [
+        ('patient_physical_measurements', physical_df),
+        ('patient_lifestyle', lifestyle_df),
+        ('patient_socioeconomic', socioeconomic_df)
+    ])
     
+    print(f"Got patient IDs: {patient_ids.min()} to {patient_ids.max()}")
     print("\nData insertion completed successfully!")
 
 def main():